@@ -0,0 +1,291 @@
+"""
+Shared - Approval Dispatcher
+Single consumer of Approved/ that claims each approval once and routes it to a registered handler
+"""
+import time
+import sqlite3
+import threading
+from pathlib import Path
+from datetime import datetime
+from audit_log import get_audit_log
+from approval_schema import parse_approval, route_channels
+from metadata_cache import get_metadata_cache
+from task_intake import TaskIntake, DEFAULT_SETTLE_DELAY
+
+DEFAULT_RETRY_DELAY = 300  # Seconds before a failed approval goes back to Approved/
+DEFAULT_MAX_ATTEMPTS = 5  # Failures before an approval is moved to Failed/ for manual review
+
+
+class ApprovalDispatcher:
+    """Watches Approved/ once and hands each approval to exactly one handler.
+
+    Handlers are registered per channel ('email', 'odoo', 'facebook', ...;
+    see approval_schema.CHANNEL_KEYWORDS) and called as handler(approval),
+    returning True on success. A file is claimed by renaming it into
+    In_Progress/approvals before its handler runs, so two dispatchers (or
+    two MCP processes) can never execute the same approval. Successful
+    approvals move to Done/; failed ones wait retry_delay seconds and then
+    go back to Approved/, until an approval has failed max_attempts times
+    and is moved to Failed/ instead. Failure counts are kept in the vault's
+    .cache folder so they survive restarts. Files whose channel has no
+    handler are left in Approved/ for whoever handles that channel.
+    """
+
+    def __init__(self, vault_path, index=None, retry_delay=DEFAULT_RETRY_DELAY,
+                 max_attempts=DEFAULT_MAX_ATTEMPTS, reconcile_interval=300, actor='approval-dispatcher',
+                 settle_delay=DEFAULT_SETTLE_DELAY):
+        self.vault = Path(vault_path)
+        self.approved_dir = self.vault / 'Approved'
+        self.claimed_dir = self.vault / 'In_Progress' / 'approvals'
+        self.done_dir = self.vault / 'Done'
+        self.failed_dir = self.vault / 'Failed'
+        for directory in (self.approved_dir, self.claimed_dir, self.done_dir, self.failed_dir):
+            directory.mkdir(parents=True, exist_ok=True)
+        self.index = index
+        self.retry_delay = retry_delay
+        self.max_attempts = max_attempts
+        self.actor = actor
+        self.handlers = {}
+        self.batch_handlers = {}
+        self.default_handler = None
+        self.audit_log = get_audit_log(self.vault / 'Logs')
+        self.metadata = get_metadata_cache(self.vault)
+        self.intake = TaskIntake([self.approved_dir], reconcile_interval=reconcile_interval,
+                                 settle_delay=settle_delay)
+        self._failed = {}  # claimed path -> monotonic time it may be retried
+        self._lock = threading.Lock()
+        cache_dir = self.vault / '.cache'
+        cache_dir.mkdir(exist_ok=True)
+        self.db = sqlite3.connect(str(cache_dir / 'approvals.sqlite3'), timeout=30, check_same_thread=False)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS failures (
+                name TEXT PRIMARY KEY,
+                attempts INTEGER NOT NULL,
+                last_error TEXT,
+                failed_at REAL NOT NULL
+            )
+        """)
+        self.db.commit()
+
+        interrupted = sorted(self.claimed_dir.glob('*.md'))
+        if interrupted:
+            # Never re-run these automatically: the handler may already have acted
+            print(f"[APPROVALS] {len(interrupted)} approval(s) were interrupted mid-execution "
+                  f"and need manual review in {self.claimed_dir}")
+
+    def register(self, channel, handler):
+        """Route approvals for `channel` to handler(approval)"""
+        with self._lock:
+            self.handlers[channel] = handler
+
+    def register_batch(self, channel, handler):
+        """Route approvals for `channel` to handler([approval, ...]) -> [success, ...]
+
+        Used by senders that are cheaper per item in bulk (e.g. email over a
+        pooled SMTP session); every approval that arrived in one poll() is
+        passed in a single call.
+        """
+        with self._lock:
+            self.batch_handlers[channel] = handler
+
+    def register_default(self, handler):
+        """Handler for approvals whose channel has no handler of its own"""
+        with self._lock:
+            self.default_handler = handler
+
+    def start(self):
+        """Start watching Approved/"""
+        self.intake.start()
+        return self
+
+    def stop(self):
+        self.intake.stop()
+
+    def wait(self, timeout):
+        """Block until a new approval arrives or `timeout` seconds pass"""
+        return self.intake.wait(timeout)
+
+    def _move(self, source, destination):
+        if self.index is not None:
+            return self.index.move(source, destination)
+        return source.rename(destination)
+
+    def _handler_for(self, channel):
+        """Return (handler, is_batch) for a channel"""
+        with self._lock:
+            if channel in self.batch_handlers:
+                return self.batch_handlers[channel], True
+            if channel in self.handlers:
+                return self.handlers[channel], False
+            return self.default_handler, False
+
+    @staticmethod
+    def _free_name(directory, name):
+        """`name` in `directory`, or name_1, name_2, ... if a file already has it"""
+        candidate = directory / name
+        stem, suffix = candidate.stem, candidate.suffix
+        number = 0
+        while candidate.exists():
+            number += 1
+            candidate = directory / f'{stem}_{number}{suffix}'
+        return candidate
+
+    def claim(self, path):
+        """Atomically take an approval out of Approved/; returns the claimed path or None
+
+        An interrupted approval of the same name waiting in In_Progress/approvals
+        for manual review is never overwritten: the new one is claimed under a
+        numbered name instead.
+        """
+        claimed = self._free_name(self.claimed_dir, path.name)
+        try:
+            self._move(path, claimed)
+        except FileNotFoundError:
+            self.intake.forget(path)
+            return None  # Another dispatcher got there first
+        except OSError as e:
+            print(f"[APPROVALS] Could not claim {path.name}, leaving it in Approved/ for manual review: {e}")
+            self.intake.release(path)
+            return None
+        self.intake.forget(path)  # A retry moved back later is a new arrival
+        if claimed.name != path.name:
+            print(f"[APPROVALS] {path.name} is already in {self.claimed_dir.name}/, claimed as {claimed.name}")
+        return claimed
+
+    def _claim_for_handler(self, path):
+        """Claim an approval if some handler takes it; returns (approval, handler, is_batch)"""
+        path = Path(path)
+        # Routing needs only the frontmatter, answered from the shared metadata cache;
+        # the full file is parsed once, after the claim succeeds
+        meta = self.metadata.get(path)
+        if meta is None:
+            return None
+        channels = route_channels(meta, path)
+        handler, is_batch = self._handler_for(channels[0] if channels else None)
+        if handler is None:
+            self.intake.release(path)  # Offer it again once a handler registers
+            return None
+        claimed = self.claim(path)
+        if claimed is None:
+            return None
+        return parse_approval(claimed), handler, is_batch
+
+    def _count_failure(self, name, error):
+        """Record one more failed attempt of an approval; returns its failure count"""
+        with self._lock:
+            self.db.execute("""
+                INSERT INTO failures VALUES (?, 1, ?, ?)
+                ON CONFLICT(name) DO UPDATE SET attempts = attempts + 1, last_error = excluded.last_error,
+                                                failed_at = excluded.failed_at
+            """, (name, error, time.time()))
+            self.db.commit()
+            return self.db.execute('SELECT attempts FROM failures WHERE name = ?', (name,)).fetchone()[0]
+
+    def _clear_failures(self, name):
+        with self._lock:
+            self.db.execute('DELETE FROM failures WHERE name = ?', (name,))
+            self.db.commit()
+
+    def _finish(self, approval, success, error=None):
+        """File a claimed approval in Done/, Failed/ or schedule its retry, and record the outcome"""
+        name = approval.path.name
+        if success:
+            self._move(approval.path, self._free_name(self.done_dir, name))
+            self._clear_failures(name)
+        else:
+            attempts = self._count_failure(name, error)
+            if attempts >= self.max_attempts:
+                self._move(approval.path, self._free_name(self.failed_dir, name))
+                self._clear_failures(name)  # A copy moved back to Approved/ by hand starts afresh
+                print(f"[APPROVALS] {name} failed {attempts} times; moved to Failed/ for manual review")
+            else:
+                with self._lock:
+                    self._failed[approval.path] = time.monotonic() + self.retry_delay
+        self.record(approval, success, error)
+
+    @staticmethod
+    def _run(handler, argument):
+        """Call a handler, turning an exception into a failure"""
+        try:
+            return handler(argument), None
+        except Exception as e:
+            print(f"[APPROVALS] Approval handler raised: {e}")
+            return None, str(e)
+
+    def dispatch(self, path):
+        """Claim, execute and file one approval; returns True, False, or None if not ours"""
+        claimed = self._claim_for_handler(path)
+        if claimed is None:
+            return None
+        approval, handler, is_batch = claimed
+        result, error = self._run(handler, [approval] if is_batch else approval)
+        success = bool(result[0] if is_batch and result else result)
+        self._finish(approval, success, error)
+        return success
+
+    def record(self, approval, success, error=None):
+        """Append the outcome of an approval to the audit log"""
+        entry = {
+            'timestamp': datetime.now().isoformat(),
+            'action_type': 'approval_dispatch',
+            'actor': self.actor,
+            'target': approval.path.name,
+            'parameters': {'action': approval.action, 'channel': approval.channel},
+            'approval_status': 'approved',
+            'result': 'success' if success else 'failed'
+        }
+        if error:
+            entry['error'] = error
+        self.audit_log.append(entry)
+
+    def _requeue_failed(self):
+        """Move failed approvals whose retry delay has passed back to Approved/"""
+        now = time.monotonic()
+        with self._lock:
+            due = [path for path, retry_at in self._failed.items() if retry_at <= now]
+            for path in due:
+                del self._failed[path]
+        for path in due:
+            if path.exists():
+                self._move(path, self._free_name(self.approved_dir, path.name))
+
+    def poll(self):
+        """Dispatch every approval that arrived since the last call; returns [(name, success)]"""
+        self._requeue_failed()
+        results = []
+        batches = {}
+        for path in self.intake.get_tasks():
+            claimed = self._claim_for_handler(path)
+            if claimed is None:
+                continue
+            approval, handler, is_batch = claimed
+            if is_batch:
+                batches.setdefault(handler, []).append(approval)
+                continue
+            result, error = self._run(handler, approval)
+            self._finish(approval, bool(result), error)
+            results.append((approval.path.name, bool(result)))
+
+        for handler, approvals in batches.items():
+            outcomes, error = self._run(handler, approvals)
+            outcomes = list(outcomes or [])
+            for position, approval in enumerate(approvals):
+                success = bool(outcomes[position]) if position < len(outcomes) else False
+                self._finish(approval, success, error)
+                results.append((approval.path.name, success))
+        return results
+
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def get_approval_dispatcher(vault_path):
+    """Return the started, shared ApprovalDispatcher for a vault"""
+    key = Path(vault_path).resolve()
+    with _registry_lock:
+        if key not in _registry:
+            _registry[key] = ApprovalDispatcher(vault_path).start()
+        return _registry[key]
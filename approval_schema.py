@@ -0,0 +1,285 @@
+"""
+Shared - Approval Schema
+Frontmatter schema and cached one-pass parser for approval files read by every MCP server
+"""
+import os
+import re
+import threading
+from pathlib import Path
+from collections import OrderedDict
+
+DEFAULT_CACHE_SIZE = 1024  # Parsed approval files kept in memory
+
+# An approval file is Markdown with a YAML frontmatter block:
+#
+#   ---
+#   type: approval_request
+#   action: send_email            # routes the file to a channel (see CHANNEL_KEYWORDS)
+#   target: client@example.com    # recipient, account or partner (also read from `to:`)
+#   subject: Re: Your inquiry     # optional
+#   payload: |                    # optional; otherwise the first draft section is used
+#     Text to send or post
+#   ---
+#
+# Older files without `target`/`payload` keep working: the target and subject
+# come from "- **To**: ..." style bullet fields and the payload from the first
+# draft section ("## Post Draft", "## Email Body", ...).
+
+# Channel -> keywords that may appear as a word in the action (or, for files
+# without an action, in the file name). Checked in order.
+CHANNEL_KEYWORDS = (
+    ('odoo', ('odoo',)),
+    ('email', ('email', 'mail', 'gmail')),
+    ('facebook', ('facebook', 'fb')),
+    ('instagram', ('instagram', 'insta', 'ig')),
+    ('twitter', ('twitter', 'tweet', 'x')),
+    ('linkedin', ('linkedin',)),
+    ('whatsapp', ('whatsapp',)),
+)
+# Words that name what an approval is about rather than where it goes: they
+# route to a channel only after every channel named in CHANNEL_KEYWORDS, so
+# `email_invoice` is emailed while `create_invoice` still goes to Odoo.
+TOPIC_KEYWORDS = (
+    ('odoo', ('invoice', 'payment', 'accounting')),
+)
+DRAFT_SECTIONS = ('payload', 'post draft', 'post content', 'email body', 'response draft',
+                  'email response draft', 'message', 'caption', 'draft')
+TARGET_KEYS = ('target', 'to', 'recipient', 'customer', 'client', 'user')
+
+_KEY_RE = re.compile(r'^([A-Za-z_][\w-]*)\s*:\s*(.*)$')
+_LIST_ITEM_RE = re.compile(r'^\s+-\s+(.*)$')
+_HEADING_RE = re.compile(r'^(#{1,6})\s+(.*?)\s*#*\s*$')
+_FIELD_RE = re.compile(r'^\s*[-*]\s+(?:\*\*)?([^:*\n]{1,40}?)(?:\*\*)?\s*:\s*(?:\*\*\s*)?(.*)$')
+_SUBJECT_LINE_RE = re.compile(r'^Subject:\s*(.+)$', re.IGNORECASE)
+_WORD_RE = re.compile(r'[a-z0-9]+')
+
+
+def _scalar(value):
+    """Convert a frontmatter scalar to bool/int/float/None/str"""
+    value = value.strip()
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in '"\'':
+        return value[1:-1]
+    lowered = value.lower()
+    if lowered in ('true', 'yes'):
+        return True
+    if lowered in ('false', 'no'):
+        return False
+    if lowered in ('', 'null', '~'):
+        return None
+    for cast in (int, float):
+        try:
+            return cast(value)
+        except ValueError:
+            pass
+    return value
+
+
+def channels_for(text):
+    """Channels whose keywords appear as words in an action or file name, in priority order"""
+    words = set(_WORD_RE.findall(text.lower()))
+    channels = [channel for channel, keywords in CHANNEL_KEYWORDS if words.intersection(keywords)]
+    for channel, keywords in TOPIC_KEYWORDS:
+        if channel not in channels and words.intersection(keywords):
+            channels.append(channel)
+    return channels
+
+
+def route_channels(meta, path):
+    """Channels for an approval from its frontmatter `action`, falling back to the file name
+
+    A file name's first word (the EMAIL_ in EMAIL_payment_reminder.md) is its
+    channel prefix, so channels it names come before any named later.
+    """
+    channels = channels_for(str(meta.get('action') or ''))
+    if channels:
+        return channels
+    stem = Path(path).stem
+    channels = channels_for(stem.split('_', 1)[0])
+    return channels + [channel for channel in channels_for(stem) if channel not in channels]
+
+
+class Approval:
+    """One parsed approval file"""
+
+    def __init__(self, path, meta, sections, fields):
+        self.path = Path(path)
+        self.meta = meta
+        self.sections = sections
+        self.fields = fields
+        self.action = str(meta.get('action') or '')
+        self.channels = route_channels(meta, self.path)
+        self.channel = self.channels[0] if self.channels else None
+
+        self.target = next((str(source[key]) for source in (meta, fields) for key in TARGET_KEYS
+                            if source.get(key)), None)
+        self.subject = meta.get('subject') or fields.get('subject')
+
+        payload = meta.get('payload')
+        if payload is None:
+            payload = next((sections[name] for name in DRAFT_SECTIONS if sections.get(name)), '')
+        payload = str(payload).strip()
+        lines = payload.split('\n', 1)
+        match = _SUBJECT_LINE_RE.match(lines[0])
+        if match:
+            # Drafts often start with "Subject: ..." followed by the body
+            self.subject = self.subject or match.group(1).strip()
+            payload = lines[1].strip() if len(lines) > 1 else ''
+        if len(payload) >= 2 and payload[0] == payload[-1] == '"':
+            payload = payload[1:-1].strip()
+        self.payload = payload
+
+    def __repr__(self):
+        return f"Approval({self.path.name!r}, action={self.action!r}, channel={self.channel!r})"
+
+
+def parse_frontmatter(lines):
+    """Parse the frontmatter block at the start of `lines` (any iterable of lines).
+
+    Stops at the closing `---`, so a file object is read no further than the
+    frontmatter. Returns (meta, number of lines consumed).
+    """
+    meta = {}
+    lines = iter(lines)
+    first = next(lines, None)
+    if first is None or first.strip() != '---':
+        return meta, 0
+
+    consumed = 1
+    block_key = None  # Key of an open `key: |` block or `key:` list
+    block = []
+    for line in lines:
+        consumed += 1
+        line = line.rstrip('\r\n')
+        if line.strip() == '---':
+            break
+        if block_key is not None:
+            if line.startswith((' ', '\t')) or not line.strip():
+                block.append(line)
+                continue
+            meta[block_key] = _close_block(block)
+            block_key = None
+        match = _KEY_RE.match(line)
+        if match:
+            key, value = match.group(1).lower(), match.group(2)
+            if value.strip() in ('|', '>', '|-', '>-', ''):
+                block_key, block = key, []
+            else:
+                meta[key] = _scalar(value)
+    if block_key is not None:
+        meta[block_key] = _close_block(block)
+    return meta, consumed
+
+
+def read_frontmatter(path):
+    """Parse only the frontmatter of a file, without reading its body"""
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        return parse_frontmatter(f)[0]
+
+
+def parse_approval_text(text, path):
+    """Parse approval Markdown in a single pass over its lines"""
+    sections = {}
+    fields = {}
+    lines = text.splitlines()
+    meta, index = parse_frontmatter(lines)
+
+    current = None
+    body = []
+    for line in lines[index:]:
+        heading = _HEADING_RE.match(line)
+        if heading:
+            if current is not None:
+                sections.setdefault(current, '\n'.join(body).strip())
+            current = heading.group(2).strip().lower()
+            body = []
+            continue
+        if current is not None:
+            body.append(line)
+        field = _FIELD_RE.match(line)
+        if field:
+            fields.setdefault(field.group(1).strip().lower(), field.group(2).strip())
+    if current is not None:
+        sections.setdefault(current, '\n'.join(body).strip())
+
+    return Approval(path, meta, sections, fields)
+
+
+def _close_block(block):
+    """Turn indented frontmatter lines into a list (`- item` lines) or a block string"""
+    lines = [line for line in block if line.strip()]
+    if not lines:
+        return None
+    items = [_LIST_ITEM_RE.match(line) for line in lines]
+    if all(items):
+        return [_scalar(item.group(1)) for item in items]
+    indent = min(len(line) - len(line.lstrip()) for line in lines)
+    return '\n'.join(line[indent:] for line in block).strip('\n')
+
+
+class ApprovalParser:
+    """Parses approval files, caching results by (path, mtime, size).
+
+    An unchanged file is parsed once per process no matter how many times
+    the Approved/ folder is scanned.
+    """
+
+    def __init__(self, cache_size=DEFAULT_CACHE_SIZE):
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def parse(self, path):
+        """Return the Approval for a file, or None if it no longer exists"""
+        path = Path(path)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        key = str(path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None and cached[0] == signature:
+                self._cache.move_to_end(key)
+                return cached[1]
+
+        try:
+            text = path.read_text(encoding='utf-8', errors='replace')
+        except FileNotFoundError:
+            return None
+        approval = parse_approval_text(text, path)
+
+        with self._lock:
+            self._cache[key] = (signature, approval)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return approval
+
+    def scan(self, directory, channel=None):
+        """Parse every approval in a folder, optionally keeping one channel"""
+        directory = Path(directory)
+        if not directory.is_dir():
+            return []
+        with os.scandir(directory) as entries:
+            names = sorted(entry.name for entry in entries
+                           if entry.name.endswith('.md') and entry.is_file())
+        approvals = []
+        for name in names:
+            approval = self.parse(directory / name)
+            if approval is not None and (channel is None or approval.channel == channel):
+                approvals.append(approval)
+        return approvals
+
+
+_default_parser = ApprovalParser()
+
+
+def parse_approval(path):
+    """Parse an approval file through the shared cache"""
+    return _default_parser.parse(path)
+
+
+def scan_approvals(directory, channel=None):
+    """Parse the approvals in a folder through the shared cache"""
+    return _default_parser.scan(directory, channel)
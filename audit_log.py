@@ -0,0 +1,222 @@
+"""
+Shared - Audit Log
+Append-only JSON Lines audit log used by every orchestrator tier and MCP server
+"""
+import os
+import json
+import time
+import atexit
+import threading
+from pathlib import Path
+from datetime import datetime
+
+DEFAULT_MAX_SEGMENT_BYTES = 16 * 1024 * 1024  # Rotate segments at 16 MB
+DEFAULT_FSYNC_INTERVAL = 1.0  # Seconds between forced fsyncs
+DEFAULT_FSYNC_BATCH = 64  # Entries written before a forced fsync
+
+
+class AuditLog:
+    """Append-only writer for Logs/<date>[_<stream>].jsonl segments.
+
+    Each entry is one JSON line written with a single O_APPEND write, so the
+    cost of logging stays constant no matter how many entries the day already
+    has. Segments rotate on date change and when they exceed max_segment_bytes
+    (<date>.jsonl, <date>.1.jsonl, <date>.2.jsonl, ...). fsync is batched by
+    entry count and elapsed time.
+    """
+
+    def __init__(self, logs_dir, stream=None, max_segment_bytes=DEFAULT_MAX_SEGMENT_BYTES,
+                 fsync_interval=DEFAULT_FSYNC_INTERVAL, fsync_batch=DEFAULT_FSYNC_BATCH):
+        self.logs_dir = Path(logs_dir)
+        self.logs_dir.mkdir(parents=True, exist_ok=True)
+        self.stream = stream
+        self.max_segment_bytes = max_segment_bytes
+        self.fsync_interval = fsync_interval
+        self.fsync_batch = fsync_batch
+        self._lock = threading.Lock()
+        self._fd = None
+        self._date = None
+        self._segment = None
+        self._unsynced = 0
+        self._last_fsync = time.monotonic()
+
+    def _prefix(self, date):
+        """File name prefix for a given day"""
+        return f'{date}_{self.stream}' if self.stream else date
+
+    def _segment_path(self, date, index):
+        """Path of segment number `index` for a given day"""
+        suffix = f'.{index}' if index else ''
+        return self.logs_dir / f'{self._prefix(date)}{suffix}.jsonl'
+
+    def _segment_index(self, path, date):
+        """Return the segment number encoded in a file name, or None"""
+        stem = path.name[:-len('.jsonl')]
+        prefix = self._prefix(date)
+        if stem == prefix:
+            return 0
+        head, _, index = stem.rpartition('.')
+        if head == prefix and index.isdigit():
+            return int(index)
+        return None
+
+    def segments(self, date=None):
+        """List the segments written for a day, oldest first"""
+        date = date or datetime.now().strftime('%Y-%m-%d')
+        found = []
+        for path in self.logs_dir.glob(f'{self._prefix(date)}*.jsonl'):
+            index = self._segment_index(path, date)
+            if index is not None:
+                found.append((index, path))
+        return [path for _, path in sorted(found)]
+
+    def _open_segment(self, date):
+        """Open the newest segment for `date`, rotating if it is already full"""
+        self._close_fd()
+        existing = self.segments(date)
+        index = self._segment_index(existing[-1], date) if existing else 0
+        path = self._segment_path(date, index)
+        if path.exists() and path.stat().st_size >= self.max_segment_bytes:
+            index += 1
+            path = self._segment_path(date, index)
+        self._fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._date = date
+        self._segment = index
+
+    def _close_fd(self):
+        """Sync and close the current segment"""
+        if self._fd is not None:
+            if self._unsynced:
+                os.fsync(self._fd)
+                self._unsynced = 0
+            os.close(self._fd)
+            self._fd = None
+
+    def append(self, entry):
+        """Append a single entry to today's segment"""
+        line = (json.dumps(entry, default=str, ensure_ascii=False) + '\n').encode('utf-8')
+        today = datetime.now().strftime('%Y-%m-%d')
+
+        with self._lock:
+            if self._fd is None or self._date != today:
+                self._open_segment(today)
+            elif os.fstat(self._fd).st_size + len(line) > self.max_segment_bytes:
+                self._close_fd()
+                self._fd = os.open(self._segment_path(today, self._segment + 1),
+                                   os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                self._segment += 1
+
+            os.write(self._fd, line)
+            self._unsynced += 1
+
+            now = time.monotonic()
+            if self._unsynced >= self.fsync_batch or now - self._last_fsync >= self.fsync_interval:
+                os.fsync(self._fd)
+                self._unsynced = 0
+                self._last_fsync = now
+
+    def flush(self):
+        """Force pending entries to disk"""
+        with self._lock:
+            if self._fd is not None and self._unsynced:
+                os.fsync(self._fd)
+                self._unsynced = 0
+                self._last_fsync = time.monotonic()
+
+    def close(self):
+        """Flush and close the writer"""
+        with self._lock:
+            self._close_fd()
+
+    def read_day(self, date=None):
+        """Return every entry for a day as a list (the legacy <date>.json array view)"""
+        date = date or datetime.now().strftime('%Y-%m-%d')
+        entries = []
+
+        # Entries written before the switch to JSON Lines
+        legacy_file = self.logs_dir / f'{self._prefix(date)}.json'
+        if legacy_file.exists():
+            try:
+                with open(legacy_file, 'r') as f:
+                    entries.extend(json.load(f))
+            except (OSError, ValueError):
+                pass
+
+        for segment in self.segments(date):
+            with open(segment, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        try:
+                            entries.append(json.loads(line))
+                        except ValueError:
+                            continue  # Torn write from a crashed process
+        return entries
+
+    def tail(self, count=5, date=None):
+        """Return the last `count` entries for a day without reading the whole day"""
+        date = date or datetime.now().strftime('%Y-%m-%d')
+        entries = []
+        for segment in reversed(self.segments(date)):
+            lines = _tail_lines(segment, count - len(entries))
+            entries = [json.loads(line) for line in lines if _is_json(line)] + entries
+            if len(entries) >= count:
+                return entries[-count:]
+
+        if len(entries) < count:
+            legacy_file = self.logs_dir / f'{self._prefix(date)}.json'
+            if legacy_file.exists():
+                try:
+                    with open(legacy_file, 'r') as f:
+                        entries = json.load(f)[-(count - len(entries)):] + entries
+                except (OSError, ValueError):
+                    pass
+        return entries
+
+
+def _is_json(line):
+    """Check that a line is a complete JSON document"""
+    try:
+        json.loads(line)
+        return True
+    except ValueError:
+        return False
+
+
+def _tail_lines(path, count, block_size=8192):
+    """Read the last `count` non-empty lines of a file by seeking from the end"""
+    if count <= 0:
+        return []
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        data = b''
+        while position > 0 and data.count(b'\n') <= count:
+            read_size = min(block_size, position)
+            position -= read_size
+            f.seek(position)
+            data = f.read(read_size) + data
+    lines = [line for line in data.decode('utf-8', errors='replace').splitlines() if line.strip()]
+    return lines[-count:]
+
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def get_audit_log(logs_dir, stream=None):
+    """Return the shared AuditLog for a logs directory and stream"""
+    key = (str(Path(logs_dir).resolve()), stream)
+    with _registry_lock:
+        if key not in _registry:
+            _registry[key] = AuditLog(logs_dir, stream)
+        return _registry[key]
+
+
+@atexit.register
+def _close_all():
+    for audit_log in list(_registry.values()):
+        try:
+            audit_log.close()
+        except OSError:
+            pass
@@ -3,18 +3,54 @@ Platinum Tier - Cloud Agent Orchestrator
 Handles non-sensitive operations 24/7 on cloud infrastructure
 """
 import os
+import sys
 import time
 import json
 import subprocess
 from pathlib import Path
 from datetime import datetime
+from audit_log import get_audit_log
+from vault_index import VaultIndex
+from task_intake import TaskIntake
+from task_queue import get_task_queue, DEFAULT_RETRY_DELAY
+from worker_pool import ClaudeWorkerPool
+from prompt_templates import get_prompt_template
+from plan_cache import get_plan_cache
+from heartbeat import Heartbeat, heartbeat_path, DEFAULT_GRACE
+from signal_channel import SignalChannel
+from task_lease import LeaseManager, DEFAULT_LEASE_DURATION, DEFAULT_RECLAIM_GRACE
+from worker_ring import WorkerRing
 
 class CloudAgentOrchestrator:
-    def __init__(self, vault_path):
+    def __init__(self, vault_path, worker_id=None):
         self.vault = Path(vault_path)
-        self.agent_name = "cloud"
         self.setup_directories()
         self.load_config()
+        # Each cloud worker needs its own id; a single worker keeps the original "cloud"
+        self.agent_name = (worker_id or os.environ.get('CLOUD_WORKER_ID')
+                           or self.config.get('workers', {}).get('id') or "cloud")
+        self.audit_log = get_audit_log(self.vault / 'Logs')
+        self.index = VaultIndex.from_config(self.vault, self.config)
+        self.intake = TaskIntake(
+            self.get_watcher_dirs(),
+            reconcile_interval=self.config.get('reconcile_interval', 300),
+            queue=get_task_queue(self.vault, self.agent_name, self.config)
+        )
+        self.worker_pool = ClaudeWorkerPool.from_config(self.config)
+        self.plan_cache = get_plan_cache(self.vault, self.config)
+        self.prompt_template = get_prompt_template('Platinum', self.vault, 'cloud_task')
+        # A task is claimed right before its Claude run, so a lease only has to outlast one run
+        lease_duration = max(self.config.get('lease_duration', DEFAULT_LEASE_DURATION),
+                             self.worker_pool.task_timeout + self.config['check_interval'])
+        self.leases = LeaseManager(self.vault, self.agent_name, index=self.index, duration=lease_duration,
+                                   grace=self.config.get('lease_grace', DEFAULT_RECLAIM_GRACE))
+        self.retry_delay = self.config.get('retry_delay', DEFAULT_RETRY_DELAY)
+        self.heartbeat = Heartbeat(heartbeat_path(self.vault, self.agent_name), self.agent_name,
+                                   grace=self.config.get('heartbeat_grace', DEFAULT_GRACE))
+        self.ring = WorkerRing.from_config(self.vault, self.agent_name, self.config)
+        # One channel per worker so workers on different machines never edit the same file
+        self.signals = SignalChannel.from_config(self.vault / 'Signals', f'{self.agent_name}_signal', self.config)
+        self.signals.compact_legacy()
         self.iteration_count = 0
         self.max_iterations = 100  # Higher for continuous operation
 
@@ -41,11 +77,12 @@ class CloudAgentOrchestrator:
                 "max_iterations": 100,
                 "tier": "platinum_cloud",
                 "agent_role": "cloud",
-                "dry_run": True
+                "dry_run": True,
+                "worker_pool": {"max_workers": 4, "task_timeout": 600}
             }
 
-    def check_all_watchers(self):
-        """Check all watcher directories for new items (non-sensitive operations)"""
+    def get_watcher_dirs(self):
+        """Directories the task intake watches for new items (non-sensitive operations)"""
         watcher_dirs = [
             self.vault / 'Watchers' / 'Gmail',
             self.vault / 'Watchers' / 'LinkedIn', 
@@ -55,52 +92,107 @@ class CloudAgentOrchestrator:
             self.vault / 'Watchers' / 'File_System',
             self.vault / 'Drop_Folder'
         ]
-        
-        all_items = []
-        for watcher_dir in watcher_dirs:
-            if watcher_dir.exists():
-                items = list(watcher_dir.glob('*.md'))
-                all_items.extend(items)
-        
-        # Also check domain-specific Needs_Action folders for cloud operations
+
+        # Also watch domain-specific Needs_Action folders for cloud operations
         cloud_domains = ['email', 'social', 'accounting']  # Cloud handles these
         for domain in cloud_domains:
-            domain_dir = self.vault / 'Needs_Action' / domain
-            if domain_dir.exists():
-                items = list(domain_dir.glob('*.md'))
-                all_items.extend(items)
-        
-        return all_items
+            watcher_dirs.append(self.vault / 'Needs_Action' / domain)
+
+        return watcher_dirs
+
+    def check_all_watchers(self):
+        """Return new items delivered from all watcher directories"""
+        return self.intake.get_tasks()
+
+    def rebalance(self):
+        """Refresh ring membership; when workers join or leave, rescan for tasks that changed owner"""
+        joined, left = self.ring.refresh()
+        if joined or left:
+            print(f"[CLOUD_AGENT] Workers now {sorted(self.ring.ring.workers)} "
+                  f"(joined: {sorted(joined) or '-'}, left: {sorted(left) or '-'})")
+            self.intake.reconcile()
+
+    def owned_tasks(self, tasks):
+        """Keep the tasks this worker owns on the ring; the rest are left for their owners"""
+        owned = []
+        for task in tasks:
+            if self.ring.owns(task):
+                owned.append(task)
+            else:
+                # Dropped from the queue; the next reconcile offers it again in case ownership moves here
+                self.intake.forget(task)
+        return owned
 
     def claim_task(self, task_file):
-        """Claim a task using the claim-by-move rule"""
-        in_progress_dir = self.vault / 'In_Progress' / self.agent_name
-        in_progress_dir.mkdir(exist_ok=True)
-        
-        # Move task to in-progress with agent prefix
-        claimed_name = f"{self.agent_name}_{task_file.name}"
-        claimed_file = in_progress_dir / claimed_name
-        task_file.rename(claimed_file)
+        """Claim a task using the claim-by-move rule; returns its lease, or None if another agent holds it"""
+        lease = self.leases.claim(task_file)
+        self.intake.forget(task_file)
+        if lease is None:
+            return None
         
-        print(f"[CLOUD_AGENT] Claimed task: {claimed_name}")
-        return claimed_file
-
-    def process_with_claude(self, task_file):
-        """Process a task using Claude Code"""
+        print(f"[CLOUD_AGENT] Claimed task: {Path(lease.claimed).name} (lease token {lease.token})")
+        return lease
+
+    def handle_task(self, task_file):
+        """Claim, process and file one task on a worker thread; returns True, False, or None if not claimed"""
+        lease = self.claim_task(task_file)
+        if lease is None:
+            return None
+        claimed_task = self.vault / lease.claimed
+        if not self.process_with_claude(claimed_task, Path(lease.origin).name):
+            # Stay claimed for retry_delay so a failing task is not retried every loop
+            self.leases.defer(lease, self.retry_delay)
+            print(f"  [CROSS MARK] Cloud Agent failed: {claimed_task.name} (retrying in {self.retry_delay}s)")
+            return False
+        # Fencing check: only the winning, unexpired claim files the task
+        if self.leases.complete(lease, self.vault / 'Done') is None:
+            return False
+        print(f"  [CHECK] Cloud Agent processed: {claimed_task.name}")
+        return True
+
+    def maintain_leases(self, recover_own=False):
+        """Settle claims that collided during sync and return expired ones to their folders"""
+        self.leases.resolve_conflicts()
+        self.leases.reclaim_expired(recover_own=recover_own)
+
+    def process_with_claude(self, task_file, task_type=None):
+        """Process a task using Claude Code; task_type is the domain folder it came from"""
+        # A claimed task sits in In_Progress/<agent>, so its folder names the agent, not the domain
+        task_type = task_type or task_file.parent.name
         try:
+            content = task_file.read_text(encoding='utf-8', errors='replace')
+            output = self.vault / 'Plans' / task_type / f'plan_{task_file.stem}.md'
+
+            # An identical task (ignoring timestamps and ids) already has a plan: reuse it
+            cache_key = self.plan_cache.key(f'Platinum/{task_type}', self.prompt_template.version, content)
+            if self.plan_cache.fetch(cache_key, output):
+                print(f"  [PLAN_CACHE] Reused cached plan for {task_file.name}")
+                self.log_action({
+                    'timestamp': datetime.now().isoformat(),
+                    'action_type': 'claude_processing',
+                    'actor': f'claude-cloud-{self.agent_name}',
+                    'target': task_file.name,
+                    'parameters': {'task_type': task_type, 'plan_cache': cache_key[:12]},
+                    'approval_status': 'not_required_yet',
+                    'result': 'success',
+                    'error': None
+                })
+                return True
+
             # Create a prompt for Claude
-            prompt = self.create_claude_prompt(task_file)
+            prompt = self.create_claude_prompt(task_file, content, task_type)
 
             # Run Claude Code
             cmd = [
                 self.config['claude_path'],
                 "process-task",
-                "--prompt", prompt,
                 "--vault", str(self.vault),
-                "--output", str(self.vault / 'Plans' / task_file.parent.name / f'plan_{task_file.stem}.md')
+                "--output", str(output)
             ]
 
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            # The prompt goes in on stdin: a large email would overflow the argv limit
+            result = subprocess.run(cmd, input=prompt, capture_output=True, text=True,
+                                    timeout=self.worker_pool.task_timeout)
 
             # Log the result
             self.log_action({
@@ -108,80 +200,33 @@ class CloudAgentOrchestrator:
                 'action_type': 'claude_processing',
                 'actor': f'claude-cloud-{self.agent_name}',
                 'target': task_file.name,
-                'parameters': {'task_type': task_file.parent.name},
+                'parameters': {'task_type': task_type},
                 'approval_status': 'not_required_yet',
                 'result': 'success' if result.returncode == 0 else 'fail',
                 'error': result.stderr if result.returncode != 0 else None
             })
 
+            if result.returncode == 0:
+                self.plan_cache.store(cache_key, output)
             return result.returncode == 0
 
+        except subprocess.TimeoutExpired:
+            self.log_error(f"Claude processing timed out after {self.worker_pool.task_timeout}s: {task_file.name}")
+            return False
         except Exception as e:
             self.log_error(f"Claude processing failed: {e}")
             return False
 
-    def create_claude_prompt(self, task_file):
-        """Create prompt for Claude based on task file"""
-        content = task_file.read_text()
-
-        prompt = f"""You are my AI Employee (Platinum Tier - Cloud Agent). Process this task from {task_file.parent.name}:
-
-{content}
-
-## Instructions:
-1. Read the task carefully
-2. Cross-reference with Business_Goals.md and past tasks
-3. Create a step-by-step plan in /Plans/{task_file.parent.name}/ folder
-4. If action is needed, create approval request in /Pending_Approval/{task_file.parent.name}/
-5. For social media (FB, IG, X/Twitter): Draft content → approval → MCP posting
-6. For email: Draft response → approval → MCP sending
-7. For accounting: Draft entries → approval → MCP execution in Odoo
-8. Update Updates/ folder with status (Dashboard.md is for Local Agent only)
-9. Use appropriate skills if needed
-
-## Available Skills (from C:\\Users\\manal\\OneDrive\\Desktop\\Hacakthon 0\\.claude\\skills):
-- file_processor: Read/write files
-- text_analyzer: Analyze text content
-- task_planner: Create task plans
-- email_drafter: Draft email responses
-- data_extractor: Extract data from files
-- linkedin-poster: Create LinkedIn posts
-- gmail-watcher: Monitor Gmail
-- odoo-invoice-creator: Create invoices in Odoo (draft only)
-- social-poster-meta: Post to Facebook/Instagram
-- social-poster-x: Post to Twitter/X
-- social-summarizer: Generate social media summaries
-- audit-logger: Log all actions
-
-## Rules from Company_Handbook.md:
-- You are the CLOUD AGENT - handle non-sensitive operations only
-- Draft all responses/posts but do not execute final actions
-- All actions require approval by Local Agent
-- Do not handle WhatsApp, payments, or sensitive credentials
-- For social media, create drafts but do not post without approval
-- For emails, draft but do not send without approval
-- For accounting, create draft entries but do not post without approval
-
-Create a detailed plan now."""
-        return prompt
+    def create_claude_prompt(self, task_file, content=None, task_type=None):
+        """Create prompt for Claude from the Platinum template and the task file"""
+        if content is None:
+            content = task_file.read_text(encoding='utf-8', errors='replace')
+        # Instructions, skills and the handbook are pre-rendered; only the task is filled in
+        return self.prompt_template.render(content=content, task_type=task_type or task_file.parent.name)
 
     def log_action(self, data):
-        """Log actions to JSON log file"""
-        log_dir = self.vault / 'Logs'
-        today = datetime.now().strftime('%Y-%m-%d')
-        log_file = log_dir / f'{today}.json'
-
-        # Read existing logs or create new
-        if log_file.exists():
-            with open(log_file, 'r') as f:
-                logs = json.load(f)
-        else:
-            logs = []
-
-        logs.append(data)
-
-        with open(log_file, 'w') as f:
-            json.dump(logs, f, indent=2)
+        """Append an action to the JSON Lines audit log"""
+        self.audit_log.append(data)
 
     def log_error(self, message):
         """Log error messages"""
@@ -192,23 +237,16 @@ Create a detailed plan now."""
 
     def update_signals(self):
         """Update signals for Local Agent (since Dashboard.md is Local Agent's responsibility)"""
-        signals_dir = self.vault / 'Signals'
-        signals_dir.mkdir(exist_ok=True)
-        
         # Count tasks
-        needs_action = len(list((self.vault / 'Needs_Action' / 'email').glob('*.md'))) + \
-                      len(list((self.vault / 'Needs_Action' / 'social').glob('*.md'))) + \
-                      len(list((self.vault / 'Needs_Action' / 'accounting').glob('*.md')))
-        
-        pending = len(list((self.vault / 'Pending_Approval' / 'email').glob('*.md'))) + \
-                 len(list((self.vault / 'Pending_Approval' / 'social').glob('*.md'))) + \
-                 len(list((self.vault / 'Pending_Approval' / 'accounting').glob('*.md')))
-        
-        done = len(list((self.vault / 'Done').glob('*.md')))
+        needs_action = self.index.count_all('Needs_Action/email', 'Needs_Action/social', 'Needs_Action/accounting')
+        pending = self.index.count_all('Pending_Approval/email', 'Pending_Approval/social', 'Pending_Approval/accounting')
+        done = self.index.count('Done')
+        plan_cache = self.plan_cache.stats()
 
         signal_content = f"""---
 type: system_signal
 generated_by: cloud_agent
+worker: {self.agent_name}
 timestamp: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 ---
 
@@ -218,6 +256,7 @@ timestamp: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 - **Needs Action**: {needs_action}
 - **Pending Approval**: {pending}
 - **Completed Tasks**: {done}
+- **Plan Cache**: {plan_cache['hits']} hit(s), {plan_cache['misses']} miss(es), {plan_cache['entries']} cached plan(s)
 
 ## Cloud Agent Status
 - Active and monitoring non-sensitive operations
@@ -231,21 +270,15 @@ timestamp: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 *Signal generated by Cloud Agent*
 """
         
-        signal_file = signals_dir / f'cloud_signal_{int(datetime.now().timestamp())}.md'
-        signal_file.write_text(signal_content)
+        # Overwrites the latest signal in place; history is a bounded ring
+        self.signals.publish(signal_content)
 
     def get_recent_cloud_activities(self):
         """Get recent activities from cloud logs"""
         try:
-            today = datetime.now().strftime('%Y-%m-%d')
-            log_file = self.vault / 'Logs' / f'{today}.json'
-
-            if log_file.exists():
-                with open(log_file, 'r') as f:
-                    logs = json.load(f)
-
-                # Get last 5 cloud activities
-                recent = logs[-5:] if len(logs) > 5 else logs
+            # Get last 5 cloud activities
+            recent = self.audit_log.tail(5)
+            if recent:
                 activities = []
 
                 for log in recent:
@@ -260,20 +293,13 @@ timestamp: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 
         return "- No activities logged yet"
 
-    def health_monitor(self):
-        """Perform health checks and monitoring"""
-        # Log health status
-        health_log = self.vault / 'Logs' / 'health_monitor.log'
-        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        with open(health_log, 'a') as f:
-            f.write(f"[{timestamp}] CLOUD_AGENT HEALTH: Running normally\n")
-        
-        # In a real implementation, this would check:
-        # - API connectivity
-        # - Resource usage
-        # - Error rates
-        # - Task processing rates
-        print(f"[HEALTH_MONITOR] Cloud Agent running normally at {timestamp}")
+    def health_monitor(self, loop_latency=None):
+        """Publish a heartbeat before waiting for the next task"""
+        # The health monitor reads this to tell a waiting loop from a wedged one
+        self.heartbeat.beat('waiting', self.config['check_interval'],
+                            queue_depth=len(self.intake), loop_latency=loop_latency)
+        if loop_latency is not None and loop_latency > self.config['check_interval']:
+            print(f"[HEALTH_MONITOR] Cloud Agent loop took {loop_latency:.1f}s")
 
     def run(self):
         """Main orchestration loop for cloud agent"""
@@ -285,28 +311,34 @@ timestamp: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
         print("=" * 50)
 
         self._start_time = datetime.now()
+        self.intake.start()
+        self.heartbeat.beat('starting', self.config['check_interval'])
+        self.rebalance()
+        # Claims left by a previous run of this agent are nobody's work any more
+        self.maintain_leases(recover_own=True)
 
         try:
             while True:  # Continuous operation for cloud agent
-                # Perform health monitoring
-                self.health_monitor()
+                loop_started = time.monotonic()
+                self.rebalance()
+                self.maintain_leases()
                 
-                # Check for new tasks from all watchers
-                tasks = self.check_all_watchers()
+                # Check for new tasks from all watchers, keeping this worker's shard
+                tasks = self.owned_tasks(self.check_all_watchers())
 
                 if tasks:
                     print(f"[CLIPBOARD] Cloud Agent found {len(tasks)} task(s) to process")
+                    # Each finished task extends the deadline; a hung one lets it lapse
+                    self.heartbeat.beat('processing', self.worker_pool.task_timeout,
+                                        queue_depth=len(tasks) + len(self.intake))
 
+                    # Each worker claims its task (claim-by-move) right before processing it, so
+                    # tasks queued behind slow Claude runs are not holding leases that can lapse
                     for task in tasks:
                         print(f"  Cloud Agent processing: {task.name}")
-                        
-                        # Claim the task using claim-by-move rule
-                        claimed_task = self.claim_task(task)
-                        
-                        success = self.process_with_claude(claimed_task)
-
-                        if success:
-                            print(f"  [CHECK] Cloud Agent processed: {claimed_task.name}")
+                    for task, outcome in self.worker_pool.map(self.handle_task, tasks):
+                        if outcome is not None:
+                            self.heartbeat.task_done(task.name)
 
                 # Update signals for Local Agent
                 self.update_signals()
@@ -314,16 +346,27 @@ timestamp: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
                 # Increment iteration counter
                 self.iteration_count += 1
                 
-                # Wait before next check
-                time.sleep(self.config['check_interval'])
+                # Perform health monitoring
+                self.health_monitor(time.monotonic() - loop_started)
+                
+                # Wait for the next task or the check interval, whichever comes first
+                self.intake.wait(self.config['check_interval'])
 
         except KeyboardInterrupt:
             print("\n[STOP SIGN] Cloud Agent Orchestrator stopped by user")
         except Exception as e:
             print(f"[CROSS MARK] Error in Cloud Agent orchestrator: {e}")
             self.log_error(f"Cloud Agent Orchestrator crashed: {e}")
+        finally:
+            self.intake.stop()
+            self.worker_pool.shutdown()
+            print(f"[PLAN_CACHE] {self.plan_cache.stats()}")
+            self.ring.leave()
+            self.heartbeat.close()
 
 if __name__ == "__main__":
     VAULT_PATH = "C:/Users/manal/OneDrive/Desktop/Hacakthon 0/AI_Employee_Vault_Platinum"
-    orchestrator = CloudAgentOrchestrator(VAULT_PATH)
+    # Optional worker id for running several cloud workers: cloud_orchestrator.py --worker-id cloud-2
+    worker_id = sys.argv[sys.argv.index('--worker-id') + 1] if '--worker-id' in sys.argv[:-1] else None
+    orchestrator = CloudAgentOrchestrator(VAULT_PATH, worker_id)
     orchestrator.run()
\ No newline at end of file
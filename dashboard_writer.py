@@ -0,0 +1,72 @@
+"""
+Shared - Dashboard Writer
+Dirty-checked, debounced, atomic writer for Dashboard.md used by every tier
+"""
+import os
+import json
+import time
+import hashlib
+import threading
+from pathlib import Path
+
+DEFAULT_DEBOUNCE = 5.0  # Minimum seconds between two dashboard writes
+
+
+class DashboardWriter:
+    """Writes Dashboard.md only when the data behind it changes.
+
+    Callers pass the inputs the dashboard is rendered from (counts, recent
+    activities, ...) but not the timestamp. The writer fingerprints the
+    inputs and skips the write when they match what is already on disk.
+    Changes that arrive within `debounce` seconds of the last write are
+    coalesced and written by the next update() or flush() call. Writes go
+    to a temp file that is renamed over Dashboard.md so Obsidian and
+    VaultSync never see a half-written file.
+    """
+
+    def __init__(self, path, debounce=DEFAULT_DEBOUNCE):
+        self.path = Path(path)
+        self.debounce = debounce
+        self._lock = threading.Lock()
+        self._written_fingerprint = None
+        self._last_write = 0.0
+        self._pending = None
+
+    @staticmethod
+    def fingerprint(inputs):
+        """Stable hash of the dashboard inputs"""
+        encoded = json.dumps(inputs, sort_keys=True, default=str).encode('utf-8')
+        return hashlib.sha256(encoded).hexdigest()
+
+    def update(self, inputs, render):
+        """Queue a render of `inputs`; returns True if Dashboard.md was written"""
+        fingerprint = self.fingerprint(inputs)
+        with self._lock:
+            if fingerprint == self._written_fingerprint:
+                self._pending = None
+                return False
+            self._pending = (fingerprint, inputs, render)
+            if time.monotonic() - self._last_write < self.debounce:
+                return False  # Coalesce with whatever else changes in this window
+        return self.flush()
+
+    def flush(self):
+        """Write the pending render, if any"""
+        with self._lock:
+            if self._pending is None:
+                return False
+            fingerprint, inputs, render = self._pending
+            self._write_atomic(render(inputs))
+            self._written_fingerprint = fingerprint
+            self._last_write = time.monotonic()
+            self._pending = None
+            return True
+
+    def _write_atomic(self, content):
+        """Write to a temp file in the same folder and rename it into place"""
+        temp_path = self.path.with_name(f'.{self.path.name}.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
@@ -0,0 +1,131 @@
+"""
+Shared - Dedup Store
+Persistent record of external items already turned into tasks, shared by every watcher
+"""
+import time
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+from collections import OrderedDict
+
+DEFAULT_LRU_SIZE = 4096  # Recently seen keys answered without touching SQLite
+DEFAULT_RETENTION = 90 * 24 * 3600  # Seconds a key is remembered before prune() drops it
+DEFAULT_PRUNE_INTERVAL = 24 * 3600  # Seconds between prunes while watchers keep adding keys
+
+
+def stable_digest(identity, length=16):
+    """Process-independent short hash of an item's identity (unlike the builtin hash())"""
+    return hashlib.sha256(str(identity).encode('utf-8')).hexdigest()[:length]
+
+
+def task_id(source, identity):
+    """Deterministic task id for an external item, e.g. 'gmail_3f2a9c0d1e4b5a67'"""
+    return f"{source}_{stable_digest(identity)}"
+
+
+class DedupStore:
+    """Remembers which external items (emails, messages, dropped files) became tasks.
+
+    Keys are (source, identity) pairs where identity is something stable
+    about the item itself: Message-ID or UIDVALIDITY:UID for mail, message
+    id or content hash for WhatsApp, path+size+mtime for file drops. The
+    SQLite file lives in the vault's .cache folder and is shared by the
+    watcher processes; a bounded LRU in front of it keeps repeat lookups
+    for recent items off the disk. Keys older than `retention` seconds are
+    pruned when the store is opened and then at most every `prune_interval`
+    seconds as new keys are added.
+    """
+
+    def __init__(self, db_path, lru_size=DEFAULT_LRU_SIZE, retention=DEFAULT_RETENTION,
+                 prune_interval=DEFAULT_PRUNE_INTERVAL):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.lru_size = lru_size
+        self.retention = retention
+        self.prune_interval = prune_interval
+        self._recent = OrderedDict()
+        self._lock = threading.Lock()
+        self.db = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS seen (
+                source TEXT NOT NULL,
+                identity TEXT NOT NULL,
+                task TEXT,
+                first_seen REAL NOT NULL,
+                PRIMARY KEY (source, identity)
+            )
+        """)
+        self.db.commit()
+        self.prune()
+
+    def _remember(self, key):
+        """Move a key to the front of the LRU, evicting the oldest if full"""
+        self._recent[key] = True
+        self._recent.move_to_end(key)
+        if len(self._recent) > self.lru_size:
+            self._recent.popitem(last=False)
+
+    def seen(self, source, identity):
+        """Check whether an item has already become a task"""
+        key = (source, str(identity))
+        with self._lock:
+            if key in self._recent:
+                self._recent.move_to_end(key)
+                return True
+            row = self.db.execute('SELECT 1 FROM seen WHERE source = ? AND identity = ?',
+                                  key).fetchone()
+            if row:
+                self._remember(key)
+            return row is not None
+
+    def add(self, source, identity, task=None):
+        """Record an item; returns False if it was already recorded"""
+        key = (source, str(identity))
+        with self._lock:
+            cursor = self.db.execute('INSERT OR IGNORE INTO seen VALUES (?, ?, ?, ?)',
+                                     (*key, task, time.time()))
+            self.db.commit()
+            self._remember(key)
+            added = cursor.rowcount == 1
+        if time.monotonic() - self._pruned_at >= self.prune_interval:
+            self.prune()
+        return added
+
+    def task_for(self, source, identity):
+        """Name of the task an item was turned into, or None"""
+        with self._lock:
+            row = self.db.execute('SELECT task FROM seen WHERE source = ? AND identity = ?',
+                                  (source, str(identity))).fetchone()
+        return row[0] if row else None
+
+    def prune(self, max_age=None):
+        """Forget items first seen more than max_age seconds (retention by default) ago"""
+        max_age = self.retention if max_age is None else max_age
+        with self._lock:
+            cursor = self.db.execute('DELETE FROM seen WHERE first_seen < ?',
+                                     (time.time() - max_age,))
+            self.db.commit()
+            self._pruned_at = time.monotonic()
+            if cursor.rowcount:
+                self._recent.clear()
+            return cursor.rowcount
+
+    def close(self):
+        with self._lock:
+            self.db.close()
+
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def get_dedup_store(vault_path):
+    """Return the shared DedupStore kept in a vault's .cache folder"""
+    db_path = (Path(vault_path) / '.cache' / 'dedup.sqlite3').resolve()
+    with _registry_lock:
+        if db_path not in _registry:
+            _registry[db_path] = DedupStore(db_path)
+        return _registry[db_path]
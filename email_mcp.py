@@ -5,15 +5,138 @@ Handles external email actions via SMTP
 import os
 import smtplib
 import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import datetime
-import json
+from audit_log import get_audit_log
+from approval_dispatcher import get_approval_dispatcher
+from rate_limiter import TokenBucket
+
+DEFAULT_POOL_SIZE = 2  # Authenticated connections kept per account
+DEFAULT_IDLE_TIMEOUT = 60  # Seconds before an idle connection is probed with NOOP
+DEFAULT_MAX_MESSAGES = 100  # Messages sent on one connection before it is recycled
+DEFAULT_SEND_RATE = (1.0, 10)  # Messages per second and burst, per account
+
+
+class SmtpPool:
+    """Authenticated SMTP connections reused across messages for one account.
+
+    A connection is opened (connect, STARTTLS, login) only when no idle one
+    is available, then returned to the pool after each message, so a batch
+    of replies pays for one handshake per pooled connection instead of one
+    per message. Idle connections are probed with NOOP before reuse and a
+    send that hits SMTPServerDisconnected is retried once on a fresh
+    connection. Every send waits on the account's token bucket.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.size = max(1, int(config.get('smtp_pool_size', DEFAULT_POOL_SIZE)))
+        self.idle_timeout = config.get('smtp_idle_timeout', DEFAULT_IDLE_TIMEOUT)
+        self.max_messages = config.get('smtp_max_messages', DEFAULT_MAX_MESSAGES)
+        rate, burst = config.get('send_rate', DEFAULT_SEND_RATE)
+        self.bucket = TokenBucket(rate, burst)
+        self._idle = deque()  # (server, sent_count, last_used)
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._lock = threading.Lock()
+        self.connections_opened = 0
+
+    def _connect(self):
+        """Open, secure and authenticate a new connection"""
+        server = smtplib.SMTP(self.config['smtp_server'], self.config['smtp_port'],
+                              timeout=self.config.get('smtp_timeout', 30))
+        if self.config.get('smtp_starttls', True):
+            server.starttls()  # Enable security
+        server.login(self.config['username'], self.config['password'])
+        with self._lock:
+            self.connections_opened += 1
+        return server, 0, time.monotonic()
+
+    @staticmethod
+    def _close(server):
+        try:
+            server.quit()
+        except (smtplib.SMTPException, OSError):
+            server.close()
+
+    def _checkout(self):
+        """Take an idle connection that is still alive, or open a new one"""
+        while True:
+            with self._lock:
+                entry = self._idle.pop() if self._idle else None
+            if entry is None:
+                return self._connect()
+            server, sent, last_used = entry
+            if time.monotonic() - last_used < self.idle_timeout:
+                return entry
+            try:
+                if server.noop()[0] == 250:
+                    return entry
+            except (smtplib.SMTPException, OSError):
+                pass
+            server.close()
+
+    def _checkin(self, server, sent):
+        if sent >= self.max_messages:
+            self._close(server)
+            return
+        with self._lock:
+            self._idle.append((server, sent, time.monotonic()))
+
+    def send(self, from_addr, recipients, message):
+        """Send one message on a pooled connection"""
+        self.bucket.acquire()
+        with self._slots:
+            server, sent, _ = self._checkout()
+            try:
+                server.sendmail(from_addr, recipients, message)
+            except smtplib.SMTPServerDisconnected:
+                # The server dropped an idle session; resend once on a fresh one
+                server.close()
+                server, sent, _ = self._connect()
+                try:
+                    server.sendmail(from_addr, recipients, message)
+                except Exception:
+                    server.close()
+                    raise
+            except smtplib.SMTPRecipientsRefused:
+                self._checkin(server, sent)  # The session itself is still fine
+                raise
+            except Exception:
+                server.close()
+                raise
+            self._checkin(server, sent + 1)
+
+    def close(self):
+        """Quit every idle connection"""
+        with self._lock:
+            idle, self._idle = list(self._idle), deque()
+        for server, _, _ in idle:
+            self._close(server)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_smtp_pool(config):
+    """Return the shared SmtpPool (and rate limit) for an SMTP account"""
+    key = (config['smtp_server'], config['smtp_port'], config['username'])
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = SmtpPool(config)
+        return _pools[key]
+
 
 class EmailMCP:
     def __init__(self, config):
         self.config = config
+        self.pool = get_smtp_pool(config)
+        self.outbox = deque()
         self.running = True
         
     def send_email(self, to_email, subject, body, cc=None, bcc=None):
@@ -31,11 +154,6 @@ class EmailMCP:
             # Add body to email
             msg.attach(MIMEText(body, 'plain'))
             
-            # Create SMTP session
-            server = smtplib.SMTP(self.config['smtp_server'], self.config['smtp_port'])
-            server.starttls()  # Enable security
-            server.login(self.config['username'], self.config['password'])
-            
             # Get all recipients
             recipients = [to_email]
             if cc:
@@ -45,8 +163,7 @@ class EmailMCP:
             
             # Send email
             text = msg.as_string()
-            server.sendmail(self.config['username'], recipients, text)
-            server.quit()
+            self.pool.send(self.config['username'], recipients, text)
             
             print(f"[EMAIL_MCP] Email sent successfully to {to_email}")
             
@@ -74,105 +191,84 @@ class EmailMCP:
             }
             
             return False, log_entry
-    
-    def monitor_approvals(self, vault_path):
-        """Monitor the Approved folder for email tasks"""
-        vault = Path(vault_path)
-        approved_dir = vault / 'Approved'
-        
-        if not approved_dir.exists():
-            approved_dir.mkdir(parents=True, exist_ok=True)
+
+    def queue_email(self, to_email, subject, body, cc=None, bcc=None, context=None):
+        """Add an email to the outbox; drain_outbox() sends it"""
+        self.outbox.append((context, (to_email, subject, body, cc, bcc)))
+
+    def drain_outbox(self):
+        """Send every queued email over the pool; returns (context, success, log_entry) in order"""
+        batch = []
+        while self.outbox:
+            batch.append(self.outbox.popleft())
+        if not batch:
             return []
-        
-        # Find email approval files
-        email_approvals = []
-        for file in approved_dir.glob('*email*'):
-            if file.suffix == '.md':
-                email_approvals.append(file)
-        
-        return email_approvals
+        with ThreadPoolExecutor(max_workers=self.pool.size) as executor:
+            results = list(executor.map(lambda item: self.send_email(*item[1]), batch))
+        return [(context, success, log_entry)
+                for (context, _), (success, log_entry) in zip(batch, results)]
     
-    def process_email_approvals(self, vault_path):
-        """Process approved email tasks"""
-        approvals = self.monitor_approvals(vault_path)
-        
-        for approval_file in approvals:
-            # Read the approval file to extract email details
-            content = approval_file.read_text()
-            
-            # Extract email details (this is simplified parsing)
-            lines = content.split('\n')
-            to_email = None
-            subject = None
-            body = []
-            collecting_body = False
-            
-            for line in lines:
-                if line.startswith('- To:'):
-                    to_email = line.replace('- To:', '').strip()
-                elif line.startswith('- Subject:'):
-                    subject = line.replace('- Subject:', '').strip()
-                elif line.startswith('## Email Body'):
-                    collecting_body = True
-                elif collecting_body and line.startswith('- '):
-                    body.append(line.replace('- ', ''))
-                elif collecting_body and line.strip() == '':
-                    collecting_body = False
-            
-            body_text = '\n'.join(body)
+    def register_approvals(self, vault_path):
+        """Register the email handler with the vault's shared approval dispatcher, once at startup"""
+        dispatcher = get_approval_dispatcher(vault_path)
+        dispatcher.register_batch('email', lambda approvals: self.handle_approvals(approvals, vault_path))
+        return dispatcher
+
+    def handle_approvals(self, approvals, vault_path):
+        """Send a batch of approved emails over pooled connections; returns a success flag per approval"""
+        outcomes = {}
+        for approval in approvals:
+            to_email = approval.target
+            subject = approval.subject
+            body_text = approval.payload
             
             if to_email and subject and body_text:
-                # Send the email
-                success, log_entry = self.send_email(to_email, subject, body_text)
-                
-                # Log the result
-                logs_dir = Path(vault_path) / 'Logs'
-                logs_dir.mkdir(exist_ok=True)
-                today = datetime.now().strftime('%Y-%m-%d')
-                log_file = logs_dir / f'{today}_mcp.json'
-                
-                # Read existing logs or create new
-                if log_file.exists():
-                    with open(log_file, 'r') as f:
-                        logs = json.load(f)
-                else:
-                    logs = []
-                
-                logs.append(log_entry)
-                
-                with open(log_file, 'w') as f:
-                    json.dump(logs, f, indent=2)
-                
-                # Move processed file to Done
-                done_dir = Path(vault_path) / 'Done'
-                done_dir.mkdir(exist_ok=True)
-                approval_file.rename(done_dir / approval_file.name)
-                
-                print(f"[EMAIL_MCP] Processed email approval: {approval_file.name}")
+                # Queue the email; the whole batch is sent over pooled connections below
+                self.queue_email(to_email, subject, body_text, context=approval.path)
+            else:
+                print(f"[EMAIL_MCP] Missing recipient, subject or body in: {approval.path.name}")
+                outcomes[approval.path] = False
+
+        for approval_file, success, log_entry in self.drain_outbox():
+            # Log the result
+            get_audit_log(Path(vault_path) / 'Logs', 'mcp').append(log_entry)
+            outcomes[approval_file] = success
+            
+            print(f"[EMAIL_MCP] Processed email approval: {approval_file.name}")
+
+        return [outcomes.get(approval.path, False) for approval in approvals]
     
     def run(self, vault_path):
         """Main MCP server loop"""
         print(f"[EMAIL_MCP] Email MCP Server started.")
         print(f"[EMAIL_MCP] Monitoring for approved email tasks...")
         
+        dispatcher = self.register_approvals(vault_path)
         try:
             while self.running:
-                self.process_email_approvals(vault_path)
-                time.sleep(30)  # Check every 30 seconds
+                dispatcher.poll()
+                # Wake as soon as an approval lands, at the latest after 30 seconds
+                dispatcher.wait(30)
         except KeyboardInterrupt:
             print("[EMAIL_MCP] Email MCP Server stopped by user")
+        finally:
+            self.pool.close()
 
-if __name__ == "__main__":
-    # Load email configuration from environment
+def config_from_env():
+    """Read the Email MCP configuration from the environment (.env)"""
     import dotenv
     dotenv.load_dotenv()
-    
-    config = {
+
+    return {
         'username': os.getenv('GMAIL_USERNAME', ''),
         'password': os.getenv('GMAIL_PASSWORD', ''),  # Use app password
         'smtp_server': 'smtp.gmail.com',
         'smtp_port': 587
     }
+
+if __name__ == "__main__":
+    # Load email configuration from environment
+    config = config_from_env()
     
     if not config['username'] or not config['password']:
         print("[WARNING] Gmail credentials not found in .env file. Please configure GMAIL_USERNAME and GMAIL_PASSWORD.")
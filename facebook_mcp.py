@@ -3,11 +3,11 @@ Gold Tier - Facebook MCP Server
 Handles Facebook operations via Meta Business API
 """
 import os
-import json
-import requests
-import time
 from pathlib import Path
 from datetime import datetime
+from audit_log import get_audit_log
+from approval_dispatcher import get_approval_dispatcher
+from http_client import HttpClient
 
 class FacebookMCP:
     def __init__(self, config):
@@ -19,6 +19,7 @@ class FacebookMCP:
             'Authorization': f'Bearer {self.access_token}',
             'Content-Type': 'application/json'
         }
+        self.http = HttpClient.from_config('facebook', config, headers=self.headers)
         self.running = True
         
     def post_message(self, message, attachment_url=None):
@@ -32,7 +33,7 @@ class FacebookMCP:
             data['link'] = attachment_url
         
         try:
-            response = requests.post(url, headers=self.headers, data=data)
+            response = self.http.post(url, data=data)
             result = response.json()
             
             if 'id' in result:
@@ -54,7 +55,7 @@ class FacebookMCP:
         }
         
         try:
-            response = requests.post(url, headers=self.headers, data=data)
+            response = self.http.post(url, data=data)
             result = response.json()
             
             if 'success' in result and result['success']:
@@ -72,7 +73,7 @@ class FacebookMCP:
         url = f"{self.base_url}?fields=name,fan_count,overall_star_rating"
         
         try:
-            response = requests.get(url, headers=self.headers)
+            response = self.http.get(url)
             result = response.json()
             
             if 'name' in result:
@@ -85,100 +86,53 @@ class FacebookMCP:
             print(f"[FACEBOOK_MCP] Error getting page info: {e}")
             return None
     
-    def monitor_approvals(self, vault_path):
-        """Monitor the Approved folder for Facebook tasks"""
-        vault = Path(vault_path)
-        approved_dir = vault / 'Approved'
+    def register_approvals(self, vault_path):
+        """Register the Facebook handler with the vault's shared approval dispatcher, once at startup"""
+        dispatcher = get_approval_dispatcher(vault_path)
+        dispatcher.register('facebook', lambda approval: self.handle_approval(approval, vault_path))
+        return dispatcher
+
+    def handle_approval(self, approval, vault_path):
+        """Post one approved Facebook task; the dispatcher moves it to Done on success"""
+        approval_file = approval.path
         
-        if not approved_dir.exists():
-            approved_dir.mkdir(parents=True, exist_ok=True)
-            return []
+        print(f"[FACEBOOK_MCP] Processing Facebook approval: {approval_file.name}")
         
-        # Find Facebook approval files
-        facebook_approvals = []
-        for file in approved_dir.glob('*facebook*'):
-            if file.suffix == '.md':
-                facebook_approvals.append(file)
+        message = approval.payload
         
-        for file in approved_dir.glob('*fb*'):
-            if file.suffix == '.md':
-                facebook_approvals.append(file)
+        if message.strip():
+            # Post the message to Facebook
+            post_id = self.post_message(message.strip())
         
-        return facebook_approvals
-    
-    def process_facebook_approvals(self, vault_path):
-        """Process approved Facebook tasks"""
-        approvals = self.monitor_approvals(vault_path)
+            if post_id:
+                result = {
+                    'status': 'success',
+                    'operation': 'post_created',
+                    'post_id': post_id,
+                    'file_processed': approval_file.name
+                }
         
-        for approval_file in approvals:
-            # Read the approval file to extract details
-            content = approval_file.read_text()
-            
-            print(f"[FACEBOOK_MCP] Processing Facebook approval: {approval_file.name}")
-            
-            # Extract message from the approval file (simplified parsing)
-            lines = content.split('\n')
-            message = ""
-            collecting_message = False
-            
-            for line in lines:
-                if 'Post Draft' in line:
-                    collecting_message = True
-                elif collecting_message and line.startswith('#'):
-                    collecting_message = False
-                elif collecting_message and not line.startswith('##'):
-                    message += line + "\n"
-            
-            if message.strip():
-                # Post the message to Facebook
-                post_id = self.post_message(message.strip())
-                
-                if post_id:
-                    result = {
-                        'status': 'success',
-                        'operation': 'post_created',
-                        'post_id': post_id,
-                        'file_processed': approval_file.name
-                    }
-                    
-                    # Log the result
-                    self.log_operation(result, vault_path)
-                    
-                    # Move processed file to Done
-                    done_dir = Path(vault_path) / 'Done'
-                    done_dir.mkdir(exist_ok=True)
-                    approval_file.rename(done_dir / approval_file.name)
-                    
-                    print(f"[FACEBOOK_MCP] Posted to Facebook: {post_id}")
-                else:
-                    print(f"[FACEBOOK_MCP] Failed to post to Facebook")
+                # Log the result
+                self.log_operation(result, vault_path)
+
+                print(f"[FACEBOOK_MCP] Posted to Facebook: {post_id}")
+                return True
             else:
-                print(f"[FACEBOOK_MCP] No message found in approval file: {approval_file.name}")
+                print(f"[FACEBOOK_MCP] Failed to post to Facebook")
+        else:
+            print(f"[FACEBOOK_MCP] No message found in approval file: {approval_file.name}")
+        return False
     
     def log_operation(self, result, vault_path):
-        """Log the operation to the appropriate log file"""
-        logs_dir = Path(vault_path) / 'Logs'
-        logs_dir.mkdir(exist_ok=True)
-        today = datetime.now().strftime('%Y-%m-%d')
-        log_file = logs_dir / f'{today}_facebook.json'
-        
-        # Read existing logs or create new
-        if log_file.exists():
-            with open(log_file, 'r') as f:
-                logs = json.load(f)
-        else:
-            logs = []
-        
-        logs.append({
+        """Append the operation to the facebook audit log stream"""
+        audit_log = get_audit_log(Path(vault_path) / 'Logs', 'facebook')
+        audit_log.append({
             'timestamp': datetime.now().isoformat(),
             'action': result['operation'],
             'file': result['file_processed'],
             'status': result['status'],
             'details': result
         })
-        
-        with open(log_file, 'w') as f:
-            json.dump(logs, f, indent=2)
     
     def run(self, vault_path):
         """Main MCP server loop"""
@@ -191,22 +145,28 @@ class FacebookMCP:
             print("[FACEBOOK_MCP] Cannot proceed without valid page connection")
             return
         
+        dispatcher = self.register_approvals(vault_path)
         try:
             while self.running:
-                self.process_facebook_approvals(vault_path)
-                time.sleep(30)  # Check every 30 seconds
+                dispatcher.poll()
+                # Wake as soon as an approval lands, at the latest after 30 seconds
+                dispatcher.wait(30)
         except KeyboardInterrupt:
             print("[FACEBOOK_MCP] Facebook MCP Server stopped by user")
 
-if __name__ == "__main__":
-    # Load Facebook configuration from environment
+def config_from_env():
+    """Read the Facebook MCP configuration from the environment (.env)"""
     import dotenv
     dotenv.load_dotenv()
-    
-    config = {
+
+    return {
         'access_token': os.getenv('FACEBOOK_ACCESS_TOKEN', 'your_access_token_here'),
         'page_id': os.getenv('FACEBOOK_PAGE_ID', 'your_page_id_here'),
     }
+
+if __name__ == "__main__":
+    # Load Facebook configuration from environment
+    config = config_from_env()
     
     if not config['access_token'] or config['access_token'] == 'your_access_token_here':
         print("[WARNING] Facebook access token not found in .env file. Please configure FACEBOOK_ACCESS_TOKEN.")
@@ -6,31 +6,151 @@ import os
 import time
 import shutil
 import logging
+import threading
 from pathlib import Path
+from datetime import datetime
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
+from audit_log import get_audit_log
+from dedup_store import get_dedup_store
+from file_copy import file_digest, transfer
+
+SUPPORTED_SUFFIXES = ('.txt', '.pdf', '.doc', '.docx', '.md')
+SETTLE_INTERVAL = 1.0  # Seconds between size checks of a file that is still being written
+SETTLE_CHECKS = 2  # Unchanged checks in a row before a file counts as complete
 
 class FileDropHandler(FileSystemEventHandler):
-    def __init__(self, vault_path):
+    """Turns files dropped into the watch folder into tasks once they are completely written.
+
+    A file is ingested on its close-after-write event (inotify) or, where
+    the platform has none, once its size and mtime stop changing for
+    SETTLE_CHECKS checks. It is then hashed and copied into Needs_Action
+    once, as a copy-on-write clone where the filesystem supports reflinks
+    and a plain copy otherwise, and only then is the task file written. The
+    dropped file itself is never linked or modified. Drops are deduplicated
+    by content hash; a skipped duplicate is logged and recorded in the
+    audit log.
+    """
+
+    def __init__(self, vault_path, settle_interval=SETTLE_INTERVAL, settle_checks=SETTLE_CHECKS):
         self.vault_path = Path(vault_path)
         self.needs_action = self.vault_path / 'Needs_Action'
         self.needs_action.mkdir(exist_ok=True)
         logging.basicConfig(level=logging.INFO)
         self.logger = logging.getLogger('FileWatcher')
+        self.dedup = get_dedup_store(self.vault_path)
+        self.audit_log = get_audit_log(self.vault_path / 'Logs')
+        # Content stored by earlier versions of this watcher; no task refers to it
+        shutil.rmtree(self.vault_path / '.cache' / 'blobs', ignore_errors=True)
+        self.settle_interval = settle_interval
+        self.settle_checks = settle_checks
+        self._pending = {}  # path -> (last (size, mtime_ns), unchanged checks)
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._settler = threading.Thread(target=self._settle_loop, name='file-drop-settle', daemon=True)
+        self._settler.start()
+
+    @staticmethod
+    def _signature(source):
+        try:
+            stat = source.stat()
+        except FileNotFoundError:
+            return None
+        return (stat.st_size, stat.st_mtime_ns)
+
+    def _track(self, source):
+        """Start (or restart) waiting for a file to finish being written"""
+        if source.suffix in SUPPORTED_SUFFIXES and not source.name.startswith('.'):
+            with self._lock:
+                self._pending[source] = (self._signature(source), 0)
 
     def on_created(self, event):
         if not event.is_directory:
-            source = Path(event.src_path)
-            if source.suffix in ['.txt', '.pdf', '.doc', '.docx', '.md']:
-                # Create task file
-                task_id = f"FILE_{int(time.time())}_{source.name}"
-                task_file = self.needs_action / f"{task_id}.md"
+            self._track(Path(event.src_path))
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self._track(Path(event.src_path))
+
+    def on_moved(self, event):
+        # Browsers and sync clients write to a temporary name, then rename
+        if not event.is_directory:
+            with self._lock:
+                self._pending.pop(Path(event.src_path), None)
+            self._track(Path(event.dest_path))
 
-                content = f"""---
+    def on_closed(self, event):
+        # Close-after-write (inotify): the writer is done, no need to wait for the size to settle
+        source = Path(event.src_path)
+        with self._lock:
+            tracked = self._pending.pop(source, None)
+        if tracked is not None:
+            self.ingest(source)
+
+    def _settle_loop(self):
+        """Ingest tracked files whose size and mtime have stopped changing"""
+        while not self._stopping.wait(self.settle_interval):
+            ready = []
+            with self._lock:
+                for source, (last, unchanged) in list(self._pending.items()):
+                    current = self._signature(source)
+                    if current is None:
+                        del self._pending[source]  # Deleted or renamed before it settled
+                    elif current == last and unchanged + 1 >= self.settle_checks:
+                        del self._pending[source]
+                        ready.append(source)
+                    else:
+                        self._pending[source] = (current, unchanged + 1 if current == last else 0)
+            for source in ready:
+                self.ingest(source)
+
+    def stop(self):
+        self._stopping.set()
+
+    def ingest(self, source):
+        """Copy a complete file into the vault and create its task; returns the task file or None"""
+        try:
+            stat = source.stat()
+            digest = file_digest(source)
+        except FileNotFoundError:
+            return None
+        except PermissionError:
+            self._track(source)  # Still locked by its writer (Windows); try again once it settles
+            return None
+
+        if self.dedup.seen('file_drop', digest):
+            earlier = self.dedup.task_for('file_drop', digest)
+            self.logger.warning(f"Skipped duplicate file: {source.name} (same content as {earlier})")
+            self.audit_log.append({
+                'timestamp': datetime.now().isoformat(),
+                'action_type': 'file_drop_duplicate',
+                'actor': 'file-watcher',
+                'target': source.name,
+                'parameters': {'sha256': digest, 'existing_task': earlier},
+                'result': 'skipped'
+            })
+            return None
+
+        # The only copy the vault keeps: a writable clone, written under a temporary name first
+        vault_copy = self.needs_action / source.name
+        temp = vault_copy.with_name(f'.{vault_copy.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+        try:
+            method = transfer(source, temp)
+        except FileNotFoundError:
+            temp.unlink(missing_ok=True)
+            return None
+        os.replace(temp, vault_copy)
+
+        # Create task file
+        task_id = f"FILE_{digest[:12]}_{source.name}"
+        task_file = self.needs_action / f"{task_id}.md"
+
+        content = f"""---
 type: file_drop
 original_name: {source.name}
 source_path: {str(source)}
-size: {source.stat().st_size} bytes
+size: {stat.st_size} bytes
+sha256: {digest}
 detected: {time.strftime('%Y-%m-%d %H:%M:%S')}
 priority: medium
 status: pending
@@ -41,8 +161,9 @@ status: pending
 ## File Information
 - **Name**: {source.name}
 - **Type**: {source.suffix}
-- **Size**: {source.stat().st_size} bytes
+- **Size**: {stat.st_size} bytes
 - **Location**: {str(source)}
+- **Vault Copy**: {vault_copy}
 
 ## Suggested Actions
 - [ ] Review file content
@@ -56,12 +177,10 @@ status: pending
 3. Decide appropriate action
 4. Create a plan in /Plans/ folder
 """
-                task_file.write_text(content)
-                self.logger.info(f"Created task for new file: {source.name}")
-
-                # Copy file to vault for processing
-                vault_copy = self.needs_action / source.name
-                shutil.copy2(source, vault_copy)
+        task_file.write_text(content)
+        self.dedup.add('file_drop', digest, task_file.name)
+        self.logger.info(f"Created task for new file: {source.name} ({stat.st_size} bytes, copied by {method})")
+        return task_file
 
 def start_file_watcher(vault_path, watch_folder):
     """Start watching a folder for new files"""
@@ -76,6 +195,7 @@ def start_file_watcher(vault_path, watch_folder):
             time.sleep(1)
     except KeyboardInterrupt:
         observer.stop()
+        event_handler.stop()
     observer.join()
 
 if __name__ == "__main__":
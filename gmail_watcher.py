@@ -3,13 +3,246 @@ Silver Tier - Gmail Watcher
 Monitors Gmail inbox for new emails and creates tasks
 """
 import os
+import re
+import json
 import time
+import base64
+import quopri
+import random
+import select
 import imaplib
-import email
 from pathlib import Path
+from email import policy
+from email.parser import BytesParser
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import datetime
+from dedup_store import get_dedup_store, task_id
+
+STATE_FILE_NAME = 'gmail_imap_state.json'
+HEADER_FIELDS = 'SUBJECT FROM DATE MESSAGE-ID'
+DEFAULT_PAGE_SIZE = 200  # UIDs per FETCH round-trip
+DEFAULT_MAX_BODY_BYTES = 64 * 1024  # Largest slice of a text part pulled per message
+
+_TOKEN_RE = re.compile(
+    rb'\s*(?:(?P<section>BODY\[[^\]]*\](?:<\d+>)?)'
+    rb'|(?P<open>\()|(?P<close>\))'
+    rb'|"(?P<quoted>(?:[^"\\]|\\.)*)"'
+    rb'|(?P<literal>\{\d+\}$)'
+    rb'|(?P<atom>[^\s()"]+))'
+)
+
+
+def compress_uid_set(uids):
+    """Turn sorted UIDs into an IMAP sequence set such as '1:200,305,307:310'"""
+    ranges = []
+    start = prev = uids[0]
+    for uid in uids[1:]:
+        if uid != prev + 1:
+            ranges.append((start, prev))
+            start = uid
+        prev = uid
+    ranges.append((start, prev))
+    return ','.join(str(a) if a == b else f'{a}:{b}' for a, b in ranges)
+
+
+def _tokenize(data):
+    """Flatten imaplib FETCH data into tokens, with literals as raw bytes"""
+    tokens = []
+    for chunk in data:
+        if chunk is None:
+            continue
+        head, literal = chunk if isinstance(chunk, tuple) else (chunk, None)
+        position = 0
+        while position < len(head):
+            match = _TOKEN_RE.match(head, position)
+            if not match or match.end() == position:
+                break
+            position = match.end()
+            kind = match.lastgroup
+            if kind == 'literal':
+                continue  # The literal's bytes follow as the tuple's second element
+            tokens.append((kind, match.group(kind)))
+        if literal is not None:
+            tokens.append(('literal', literal))
+    return tokens
+
+
+def _parse_list(tokens, index):
+    """Parse a parenthesised list starting after '('; returns (list, next_index)"""
+    items = []
+    while index < len(tokens):
+        kind, value = tokens[index]
+        index += 1
+        if kind == 'close':
+            return items, index
+        if kind == 'open':
+            value, index = _parse_list(tokens, index)
+        elif kind == 'atom' and value.upper() == b'NIL':
+            value = None
+        items.append(value)
+    return items, index
+
+
+def parse_fetch_response(data):
+    """Parse imaplib FETCH data into one {ITEM: value} dict per message"""
+    tokens = _tokenize(data)
+    messages = []
+    index = 0
+    while index < len(tokens):
+        kind, _ = tokens[index]
+        index += 1
+        if kind != 'open':
+            continue  # Message sequence number
+        items, index = _parse_list(tokens, index)
+        item = {}
+        for key, value in zip(items[0::2], items[1::2]):
+            item[key.decode().upper()] = value
+        messages.append(item)
+    return messages
+
+
+def _text(value):
+    return value.decode(errors='replace') if isinstance(value, bytes) else value
+
+
+def find_text_part(structure, path=()):
+    """Locate the first text/plain part in a BODYSTRUCTURE.
+
+    Returns (section, charset, encoding, size) or None.
+    """
+    if not structure:
+        return None
+    if isinstance(structure[0], list):  # multipart: children, then subtype
+        children = [child for child in structure if isinstance(child, list)]
+        for number, child in enumerate(children, 1):
+            found = find_text_part(child, path + (number,))
+            if found:
+                return found
+        return None
+
+    maintype, subtype = _text(structure[0]).lower(), _text(structure[1]).lower()
+    if (maintype, subtype) != ('text', 'plain'):
+        return None
+    params = structure[2] or []
+    params = {_text(k).lower(): _text(v) for k, v in zip(params[0::2], params[1::2])}
+    encoding = _text(structure[5] or '7bit').lower()
+    size = int(structure[6]) if len(structure) > 6 and structure[6] else 0
+    section = '.'.join(str(number) for number in path) or '1'
+    return section, params.get('charset', 'utf-8'), encoding, size
+
+
+def decode_body(raw, charset, encoding):
+    """Decode a (possibly truncated) text part"""
+    if encoding == 'base64':
+        compact = b''.join(raw.split())
+        raw = base64.b64decode(compact[:len(compact) // 4 * 4])
+    elif encoding == 'quoted-printable':
+        raw = quopri.decodestring(raw)
+    try:
+        return raw.decode(charset or 'utf-8', errors='replace')
+    except LookupError:
+        return raw.decode('utf-8', errors='replace')
+
+
+class ImapConnection:
+    """Long-lived IMAP session with IDLE push and reconnect backoff"""
+
+    def __init__(self, email_config, mailbox='INBOX'):
+        self.email_config = email_config
+        self.host = email_config.get('imap_server', 'imap.gmail.com')
+        self.port = email_config.get('imap_port', 993)
+        self.use_ssl = email_config.get('imap_ssl', True)
+        self.mailbox = mailbox
+        self.max_backoff = email_config.get('imap_max_backoff', 300)
+        self.mail = None
+        self.capabilities = ()
+        self.uidvalidity = None
+        self.uidnext = None
+        self._backoff = 1
+        self._next_attempt = 0
+
+    def connect(self):
+        """Return a logged-in session with the mailbox selected, reconnecting if needed"""
+        if self.mail is not None:
+            return self.mail
+
+        # Back off between failed attempts so a restart or outage doesn't cause a reconnect storm
+        wait = self._next_attempt - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+
+        try:
+            if self.use_ssl:
+                mail = imaplib.IMAP4_SSL(self.host, self.port)
+            else:
+                mail = imaplib.IMAP4(self.host, self.port)
+            mail.login(self.email_config['username'], self.email_config['password'])
+            mail.select(self.mailbox)
+            _, data = mail.response('UIDVALIDITY')
+            self.uidvalidity = int(data[0]) if data and data[0] else None
+            _, data = mail.response('UIDNEXT')
+            self.uidnext = int(data[0]) if data and data[0] else None
+            self.capabilities = mail.capabilities
+            self.mail = mail
+            self._backoff = 1
+            return mail
+        except Exception as e:
+            delay = min(self._backoff, self.max_backoff)
+            print(f"[ERROR] Could not connect to Gmail: {e} (retrying in {delay:.0f}s)")
+            self._next_attempt = time.monotonic() + delay + random.uniform(0, delay / 2)
+            self._backoff = min(self._backoff * 2, self.max_backoff)
+            self.mail = None
+            return None
+
+    def disconnect(self):
+        """Drop the session; the next connect() opens a fresh one"""
+        if self.mail is not None:
+            try:
+                self.mail.logout()
+            except Exception:
+                pass
+            self.mail = None
+
+    def idle(self, timeout):
+        """Wait up to `timeout` seconds for the server to announce new mail.
+
+        Uses IMAP IDLE (RFC 2177) when the server supports it and falls back
+        to sleeping otherwise. Returns True if new mail was announced.
+        """
+        mail = self.connect()
+        if mail is None or 'IDLE' not in self.capabilities:
+            time.sleep(timeout)
+            return False
+
+        new_mail = False
+        try:
+            tag = mail._new_tag()
+            mail.send(tag + b' IDLE\r\n')
+            if not mail.readline().startswith(b'+'):
+                raise imaplib.IMAP4.abort('server rejected IDLE')
+
+            # Wait on the socket (or data SSL already decrypted) for an untagged update
+            sock = mail.sock
+            pending = sock.pending() if hasattr(sock, 'pending') else 0
+            if pending or select.select([sock], [], [], timeout)[0]:
+                line = mail.readline()
+                new_mail = b'EXISTS' in line or b'RECENT' in line
+
+            mail.send(b'DONE\r\n')
+            while True:
+                line = mail.readline()
+                if not line:
+                    raise imaplib.IMAP4.abort('connection closed during IDLE')
+                if line.startswith(tag):
+                    break
+                if b'EXISTS' in line or b'RECENT' in line:
+                    new_mail = True
+        except (imaplib.IMAP4.abort, imaplib.IMAP4.error, OSError) as e:
+            print(f"[EMAIL] IDLE interrupted, reconnecting: {e}")
+            self.disconnect()
+        return new_mail
+
 
 class GmailWatcher:
     def __init__(self, vault_path, email_config):
@@ -17,72 +250,191 @@ class GmailWatcher:
         self.email_config = email_config
         self.gmail_dir = self.vault_path / 'Watchers' / 'Gmail'
         self.gmail_dir.mkdir(exist_ok=True)
-        self.last_check = None
-        
+        self.connection = ImapConnection(email_config)
+        self.page_size = email_config.get('fetch_page_size', DEFAULT_PAGE_SIZE)
+        self.max_body_bytes = email_config.get('max_body_bytes', DEFAULT_MAX_BODY_BYTES)
+        self.state_file = self.vault_path / '.cache' / STATE_FILE_NAME
+        self.dedup = get_dedup_store(self.vault_path)
+        self.state = self.load_state()
+
+    def load_state(self):
+        """Load UIDVALIDITY and the last processed UID from disk"""
+        if self.state_file.exists():
+            try:
+                with open(self.state_file, 'r') as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                pass
+        return {'uidvalidity': None, 'last_uid': 0}
+
+    def save_state(self):
+        """Persist the sync position atomically"""
+        self.state_file.parent.mkdir(exist_ok=True)
+        temp_file = self.state_file.with_suffix('.tmp')
+        with open(temp_file, 'w') as f:
+            json.dump(self.state, f)
+        os.replace(temp_file, self.state_file)
+
     def connect_to_gmail(self):
-        """Connect to Gmail using IMAP"""
-        try:
-            mail = imaplib.IMAP4_SSL('imap.gmail.com')
-            mail.login(self.email_config['username'], self.email_config['password'])
-            return mail
-        except Exception as e:
-            print(f"[ERROR] Could not connect to Gmail: {e}")
-            return None
-    
+        """Return the persistent IMAP session, connecting if needed"""
+        return self.connection.connect()
+
+    def highest_uid(self, mail):
+        """UID of the newest message when the mailbox was selected (UIDNEXT - 1), or 0 if it was empty"""
+        if self.connection.uidnext is not None:
+            return self.connection.uidnext - 1
+        # Server sent no UIDNEXT: "UID *" matches just the newest message
+        status, messages = mail.uid('search', None, 'UID *')
+        uids = messages[0].split() if status == 'OK' and messages else []
+        return max((int(uid) for uid in uids), default=0)
+
     def check_new_emails(self):
-        """Check for new emails since last check"""
+        """Drain every email whose UID is above the last one processed, a page at a time"""
         mail = self.connect_to_gmail()
         if not mail:
             return []
-            
+
+        new_emails = []
         try:
-            mail.select('inbox')
-            
-            # Search for emails since last check or all emails if first run
-            if self.last_check:
-                search_criteria = f'(SINCE {self.last_check.strftime("%d-%b-%Y")})'
+            # No saved position, or a new UIDVALIDITY that makes old UIDs meaningless:
+            # take only the unread mail instead of paging through the whole mailbox
+            seed_uid = None
+            if self.state['uidvalidity'] != self.connection.uidvalidity:
+                seed_uid = self.highest_uid(mail)
+                status, messages = mail.uid('search', None, 'UNSEEN')
+                uids = sorted(int(uid) for uid in messages[0].split())
+                print(f"[EMAIL] No sync position for this mailbox; starting after UID {seed_uid} "
+                      f"with {len(uids)} unread email(s)")
             else:
-                search_criteria = 'ALL'
-                
-            status, messages = mail.search(None, search_criteria)
-            email_ids = messages[0].split()
-            
-            new_emails = []
-            for email_id in email_ids[-10:]:  # Check last 10 emails to avoid overload
-                status, msg_data = mail.fetch(email_id, '(RFC822)')
-                msg = email.message_from_bytes(msg_data[0][1])
-                
-                # Extract email information
-                subject = msg.get('Subject', 'No Subject')
-                sender = msg.get('From', 'Unknown Sender')
-                date = msg.get('Date', '')
-                
-                # Create task file for the email
-                task_id = f"gmail_{int(time.time())}_{hash(subject) % 10000}"
-                task_file = self.gmail_dir / f"{task_id}.md"
-                
-                # Get email body
-                body = ""
-                if msg.is_multipart():
-                    for part in msg.walk():
-                        if part.get_content_type() == "text/plain":
-                            body = part.get_payload(decode=True).decode()
-                            break
-                else:
-                    body = msg.get_payload(decode=True).decode()
-                
-                # Determine priority based on keywords
-                priority_keywords = ['urgent', 'asap', 'immediate', 'critical', 'important']
-                priority = 'low'
-                email_lower = f"{subject} {body}".lower()
-                for keyword in priority_keywords:
-                    if keyword in email_lower:
-                        priority = 'high'
-                        break
-                elif 'meeting' in email_lower or 'schedule' in email_lower:
-                    priority = 'medium'
-                
-                content = f"""---
+                last_uid = self.state['last_uid']
+                status, messages = mail.uid('search', None, f'UID {last_uid + 1}:*')
+                # "n:*" always matches the newest message, even if its UID is below n
+                uids = sorted(int(uid) for uid in messages[0].split() if int(uid) > last_uid)
+
+            for start in range(0, len(uids), self.page_size):
+                page = uids[start:start + self.page_size]
+                for uid, headers, body in self.fetch_messages(mail, page):
+                    try:
+                        task_file = self.create_email_task(uid, headers, body)
+                    except Exception as e:
+                        # One bad message must not pin the sync position: log it and move on
+                        print(f"[ERROR] Skipping email UID {uid}: {e}")
+                        continue
+                    if task_file:
+                        new_emails.append(task_file)
+
+                # Persist progress after every page so a crash resumes mid-backlog; while
+                # seeding, a crash simply seeds again (the dedup store skips repeats)
+                if seed_uid is None:
+                    self.state['last_uid'] = page[-1]
+                    self.save_state()
+
+            if seed_uid is not None:
+                self.state = {'uidvalidity': self.connection.uidvalidity,
+                              'last_uid': max([seed_uid] + uids)}
+                self.save_state()
+            return new_emails
+
+        except (imaplib.IMAP4.abort, OSError) as e:
+            print(f"[ERROR] Connection lost while checking emails: {e}")
+            self.connection.disconnect()
+            return new_emails
+        except Exception as e:
+            print(f"[ERROR] Error checking emails: {e}")
+            return new_emails
+
+    def fetch_messages(self, mail, uids):
+        """Fetch a page of UIDs, falling back to one UID at a time if the page fails to parse"""
+        try:
+            return list(self.fetch_page(mail, uids))
+        except (imaplib.IMAP4.abort, OSError):
+            raise  # Connection trouble: retry the whole page on reconnect
+        except Exception as e:
+            print(f"[ERROR] Fetching UIDs {uids[0]}-{uids[-1]} failed ({e}); retrying one at a time")
+
+        messages = []
+        for uid in uids:
+            try:
+                messages.extend(self.fetch_page(mail, [uid]))
+            except (imaplib.IMAP4.abort, OSError):
+                raise
+            except Exception as e:
+                print(f"[ERROR] Skipping email UID {uid}: {e}")
+        return messages
+
+    def fetch_page(self, mail, uids):
+        """Fetch headers, then only the text/plain part, for a page of UIDs in two round-trips"""
+        uid_set = compress_uid_set(uids)
+        status, data = mail.uid('fetch', uid_set, f'(UID BODYSTRUCTURE BODY.PEEK[HEADER.FIELDS ({HEADER_FIELDS})])')
+        messages = {}
+        for item in parse_fetch_response(data):
+            uid = int(item['UID'])
+            header_bytes = next((value for key, value in item.items() if key.startswith('BODY[HEADER')), b'')
+            headers = BytesParser(policy=policy.default).parsebytes(header_bytes, headersonly=True)
+            messages[uid] = (headers, find_text_part(item.get('BODYSTRUCTURE')))
+
+        # Group the text parts by section so each group is a single partial FETCH
+        by_section = {}
+        for uid, (_, text_part) in messages.items():
+            if text_part:
+                by_section.setdefault(text_part[0], []).append(uid)
+
+        bodies = {}
+        for section, section_uids in by_section.items():
+            # <0.N> partial fetch: never pull more than max_body_bytes of a large message
+            status, data = mail.uid('fetch', compress_uid_set(sorted(section_uids)),
+                                    f'(UID BODY.PEEK[{section}]<0.{self.max_body_bytes}>)')
+            for item in parse_fetch_response(data):
+                raw = next((value for key, value in item.items() if key.startswith('BODY[')), b'')
+                bodies[int(item['UID'])] = raw
+
+        for uid in uids:
+            if uid not in messages:
+                continue  # Expunged between SEARCH and FETCH
+            headers, text_part = messages[uid]
+            body = ''
+            if text_part and uid in bodies:
+                section, charset, encoding, size = text_part
+                body = decode_body(bodies[uid], charset, encoding)
+                if size > self.max_body_bytes:
+                    body += "\n\n[... message truncated ...]"
+            yield uid, headers, body
+
+    def message_identity(self, uid, headers):
+        """Stable identity of a message: its Message-ID, else UIDVALIDITY:UID"""
+        message_id = str(headers.get('Message-ID', '')).strip()
+        return message_id or f"{self.connection.uidvalidity}:{uid}"
+
+    def create_email_task(self, uid, headers, body):
+        """Write a task file for one email message, or return None if it already has one"""
+        identity = self.message_identity(uid, headers)
+        if self.dedup.seen('gmail', identity):
+            return None
+
+        # Extract email information
+        subject = str(headers.get('Subject', 'No Subject'))
+        sender = str(headers.get('From', 'Unknown Sender'))
+        date = str(headers.get('Date', ''))
+
+        # Same message, same task file: a retry overwrites instead of duplicating
+        task_file = self.gmail_dir / f"{task_id('gmail', identity)}.md"
+
+        task_file.write_text(self.render_task(subject, sender, date, body), encoding='utf-8')
+        self.dedup.add('gmail', identity, task_file.name)
+        return task_file
+
+    def render_task(self, subject, sender, date, body):
+        """Build the task markdown for an email"""
+        # Determine priority based on keywords
+        priority_keywords = ['urgent', 'asap', 'immediate', 'critical', 'important']
+        priority = 'low'
+        email_lower = f"{subject} {body}".lower()
+        if any(keyword in email_lower for keyword in priority_keywords):
+            priority = 'high'
+        elif 'meeting' in email_lower or 'schedule' in email_lower:
+            priority = 'medium'
+
+        return f"""---
 type: gmail_message
 subject: {subject}
 sender: {sender}
@@ -107,48 +459,49 @@ priority: {priority}
 - [ ] Create plan in /Plans/ folder
 - [ ] Draft response if needed (with approval if external communication)
 """
-                task_file.write_text(content)
-                new_emails.append(task_file)
-                
-            # Update last check time
-            self.last_check = datetime.now()
-            mail.close()
-            mail.logout()
-            
-            return new_emails
-            
-        except Exception as e:
-            print(f"[ERROR] Error checking emails: {e}")
-            return []
+
+    def wait_for_new_mail(self, timeout):
+        """Block until the server pushes new mail or `timeout` seconds pass"""
+        return self.connection.idle(timeout)
 
 def start_gmail_watcher(vault_path, email_config):
     """Start watching Gmail for new emails"""
     watcher = GmailWatcher(vault_path, email_config)
-    
+    idle_timeout = email_config.get('idle_timeout', 300)  # Re-issue IDLE well inside the 29 minute limit
+
     print(f"[EMAIL] Gmail Watcher started. Monitoring: {email_config['username']}")
-    print("[INFO] Checking for new emails every 60 seconds...")
-    
+    print("[INFO] Waiting for new emails via IMAP IDLE...")
+
     try:
         while True:
             new_emails = watcher.check_new_emails()
             if new_emails:
                 print(f"[EMAIL] Found {len(new_emails)} new email(s)")
-            
-            time.sleep(60)  # Check every minute
+
+            watcher.wait_for_new_mail(idle_timeout)
     except KeyboardInterrupt:
         print("[STOP SIGN] Gmail Watcher stopped by user")
+    finally:
+        watcher.connection.disconnect()
 
-if __name__ == "__main__":
-    # Load email configuration from environment
+def config_from_env():
+    """Read the Gmail configuration from the environment (.env)"""
     import dotenv
     dotenv.load_dotenv()
-    
-    email_config = {
+
+    return {
         'username': os.getenv('GMAIL_USERNAME', ''),
         'password': os.getenv('GMAIL_PASSWORD', ''),  # Use app password
         'smtp_server': 'smtp.gmail.com',
-        'smtp_port': 587
+        'smtp_port': 587,
+        'imap_server': os.getenv('GMAIL_IMAP_SERVER', 'imap.gmail.com'),
+        'imap_port': int(os.getenv('GMAIL_IMAP_PORT', '993')),
+        'imap_ssl': os.getenv('GMAIL_IMAP_SSL', 'true').lower() != 'false'
     }
+
+if __name__ == "__main__":
+    # Load email configuration from environment
+    email_config = config_from_env()
     
     if not email_config['username'] or not email_config['password']:
         print("[WARNING] Gmail credentials not found in .env file. Please configure GMAIL_USERNAME and GMAIL_PASSWORD.")
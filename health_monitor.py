@@ -4,50 +4,86 @@ Monitors cloud agent and restarts if crashed
 """
 import os
 import time
-import subprocess
-import psutil
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from pathlib import Path
 from datetime import datetime
+from supervisor import Supervisor
+from heartbeat import heartbeat_path, read_heartbeat, is_stalled
+
+CLOUD_AGENT = 'Cloud Agent'
+STATUS_INTERVAL = 300  # Seconds between routine status log lines; failures are handled immediately
+HEARTBEAT_CHECK_INTERVAL = 5  # Seconds between heartbeat checks
+STARTUP_GRACE = 120  # Seconds a new process has to publish its first heartbeat
 
 class HealthMonitor:
-    def __init__(self, vault_path):
+    def __init__(self, vault_path, supervisor=None, heartbeats=None):
         self.vault = Path(vault_path)
-        self.cloud_process = None
+        (self.vault / 'Logs').mkdir(parents=True, exist_ok=True)
         self.monitoring = True
+        if supervisor is None:
+            supervisor = Supervisor().add(CLOUD_AGENT, 'cloud_orchestrator.py')
+        # Supervised component name -> agent whose heartbeat it publishes
+        self.heartbeats = heartbeats if heartbeats is not None else {CLOUD_AGENT: 'cloud'}
+        # The monitor owns the children: exits are reported by the supervisor as they happen
+        self.supervisor = supervisor
+        self.supervisor.on_event = self.handle_event
         
     def check_cloud_agent_status(self):
         """Check if cloud agent is running"""
-        try:
-            # Look for the cloud orchestrator process
-            for proc in psutil.process_iter(['pid', 'name', 'cmdline']):
-                if 'cloud_orchestrator.py' in ' '.join(proc.info['cmdline']) or 'python' in proc.info['name'] and 'cloud_orchestrator' in ' '.join(proc.info['cmdline']):
-                    return True, proc.info['pid']
-            return False, None
-        except Exception as e:
-            print(f"[HEALTH] Error checking process: {e}")
+        child = self.supervisor.children.get(CLOUD_AGENT)
+        if child is None:
             return False, None
+        return child.pid is not None, child.pid
     
     def start_cloud_agent(self):
-        """Start the cloud agent if it's not running"""
-        try:
-            print("[HEALTH] Starting Cloud Agent...")
-            self.cloud_process = subprocess.Popen(['python', 'cloud_orchestrator.py'])
-            print(f"[HEALTH] Cloud Agent started with PID: {self.cloud_process.pid}")
-            
-            # Log the restart
-            log_file = self.vault / 'Logs' / 'health_monitor.log'
-            timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            with open(log_file, 'a') as f:
-                f.write(f"[{timestamp}] HEALTH_MONITOR: Cloud Agent started with PID {self.cloud_process.pid}\n")
-            
-            return True
-        except Exception as e:
-            print(f"[HEALTH] Failed to start Cloud Agent: {e}")
-            self.send_alert(f"Failed to start Cloud Agent: {e}")
-            return False
+        """Start the supervised components"""
+        print("[HEALTH] Starting supervised components...")
+        self.supervisor.start()
+        return True
+
+    def check_heartbeats(self):
+        """Restart supervised components whose loop has stopped making progress"""
+        now = datetime.now().timestamp()
+        for name, agent in self.heartbeats.items():
+            child = self.supervisor.children.get(name)
+            if child is None or child.pid is None:
+                continue  # Not running; the supervisor is already handling it
+            heartbeat = read_heartbeat(heartbeat_path(self.vault, agent))
+            if heartbeat is None or heartbeat.get('pid') != child.pid:
+                # Nothing from this process yet; give it time to start up
+                if child.status()['uptime'] < STARTUP_GRACE:
+                    continue
+                reason = f"no heartbeat within {STARTUP_GRACE}s of starting"
+            elif is_stalled(heartbeat, now):
+                reason = (f"stalled in phase '{heartbeat.get('phase')}' for "
+                          f"{now - heartbeat['beat_at']:.0f}s (last task: {heartbeat.get('last_task')})")
+            else:
+                continue
+            print(f"[HEALTH] {name} {reason}; restarting")
+            self.log_status(f"{name} STALLED - {reason}")
+            self.send_alert(f"{name} {reason} and is being restarted")
+            self.supervisor.restart(name)
+
+    def heartbeat_summary(self, name):
+        """Loop latency, queue depth and last task from a component's heartbeat"""
+        heartbeat = read_heartbeat(heartbeat_path(self.vault, self.heartbeats[name])) \
+            if name in self.heartbeats else None
+        if not heartbeat:
+            return ""
+        return (f" phase {heartbeat.get('phase')} latency {heartbeat.get('loop_latency')}s "
+                f"queue {heartbeat.get('queue_depth')} last task {heartbeat.get('last_task')}")
+
+    def handle_event(self, name, event, detail):
+        """Log supervisor events and alert on failures"""
+        self.log_status(f"{name} {event.upper()}" + (f" - {detail}" if detail else ""))
+        if event == 'exited':
+            self.send_alert(f"{name} was down ({detail}) and is being restarted")
+        elif event == 'crash_loop':
+            self.send_alert(f"{name} is crash-looping and has been paused: {detail}")
+        elif event == 'failed':
+            self.send_alert(f"{name} could not be started: {detail}")
     
     def send_alert(self, message):
         """Send alert via email or create alert file"""
@@ -95,39 +131,21 @@ Monitoring continues
         print("[HEALTH] Monitoring Cloud Agent 24/7")
         print("=" * 50)
         
-        # Initial check
-        is_running, pid = self.check_cloud_agent_status()
-        if not is_running:
-            print("[HEALTH] Cloud Agent not running, starting it...")
-            self.start_cloud_agent()
-        else:
-            print(f"[HEALTH] Cloud Agent is running with PID: {pid}")
+        self.start_cloud_agent()
         
         try:
-            while self.monitoring:
-                # Check cloud agent status
-                is_running, pid = self.check_cloud_agent_status()
-                
-                if not is_running:
-                    print(f"[HEALTH] Cloud Agent is DOWN at {datetime.now()}")
-                    self.log_status("Cloud Agent DOWN - Attempting restart")
-                    
-                    # Attempt to restart
-                    success = self.start_cloud_agent()
-                    if success:
-                        print(f"[HEALTH] Cloud Agent restarted successfully")
-                        self.log_status("Cloud Agent RESTARTED")
-                        self.send_alert("Cloud Agent was down and has been restarted")
-                    else:
-                        print(f"[HEALTH] Failed to restart Cloud Agent")
-                        self.log_status("Cloud Agent FAILED to restart")
-                        self.send_alert("Cloud Agent is down and could not be restarted")
-                else:
-                    print(f"[HEALTH] Cloud Agent OK with PID {pid}")
-                    self.log_status(f"Cloud Agent OK with PID {pid}")
-                
-                # Wait before next check (every 5 minutes)
-                time.sleep(300)  # 5 minutes
+            # Deaths are handled by the supervisor; this loop catches stalls and records status
+            last_status = 0
+            while self.monitoring and not self.supervisor.wait(HEARTBEAT_CHECK_INTERVAL):
+                self.check_heartbeats()
+                if time.monotonic() - last_status < STATUS_INTERVAL:
+                    continue
+                last_status = time.monotonic()
+                for name, status in self.supervisor.status().items():
+                    summary = (f"{name} {status['state'].upper()} PID {status['pid']} "
+                               f"restarts {status['restarts']}" + self.heartbeat_summary(name))
+                    print(f"[HEALTH] {summary}")
+                    self.log_status(summary)
                 
         except KeyboardInterrupt:
             print("\n[HEALTH] Health Monitor stopped by user")
@@ -135,6 +153,8 @@ Monitoring continues
         except Exception as e:
             print(f"[HEALTH] Error in Health Monitor: {e}")
             self.send_alert(f"Health Monitor error: {e}")
+        finally:
+            self.supervisor.stop()
 
 if __name__ == "__main__":
     VAULT_PATH = "C:/Users/manal/OneDrive/Desktop/Hacakthon 0/AI_Employee_Vault_Platinum"
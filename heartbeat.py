@@ -0,0 +1,97 @@
+"""
+Shared - Heartbeat
+Liveness files published by orchestrator loops and read by the health monitor to detect stalls
+"""
+import os
+import json
+import time
+import threading
+from pathlib import Path
+
+DEFAULT_GRACE = 30  # Seconds a beat may be late before the loop counts as stalled
+
+
+def heartbeat_path(vault_path, agent):
+    """Where an agent's heartbeat lives: <vault>/.cache/heartbeats/<agent>.json"""
+    return Path(vault_path) / '.cache' / 'heartbeats' / f'{agent}.json'
+
+
+class Heartbeat:
+    """Publishes one loop's liveness as a small JSON file.
+
+    Every beat states what the loop is doing (`phase`) and how long that may
+    take (`expect_within`), so a loop parked in a 30 s wait and one running a
+    10 minute Claude task are both healthy while a loop wedged past its own
+    deadline is not. The file is replaced atomically, so readers never see a
+    partial write, and carries loop latency, queue depth and the last
+    finished task.
+    """
+
+    def __init__(self, path, agent, grace=DEFAULT_GRACE):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.grace = grace
+        self._state = {
+            'agent': agent,
+            'pid': os.getpid(),
+            'started_at': time.time(),
+            'seq': 0,
+            'phase': 'starting',
+            'beat_at': None,
+            'expect_within': None,
+            'deadline': None,
+            'loop_latency': None,
+            'queue_depth': 0,
+            'last_task': None,
+            'last_task_at': None
+        }
+        self._lock = threading.Lock()
+
+    def _publish(self):
+        """Write the current state; caller holds the lock"""
+        self._state['seq'] += 1
+        temp = self.path.with_name(f'.{self.path.name}.{os.getpid()}.tmp')
+        temp.write_text(json.dumps(self._state), encoding='utf-8')
+        os.replace(temp, self.path)
+
+    def beat(self, phase, expect_within, queue_depth=None, loop_latency=None):
+        """Report that the loop is alive and will beat again within `expect_within` seconds"""
+        now = time.time()
+        with self._lock:
+            self._state.update(phase=phase, beat_at=now, expect_within=expect_within,
+                               deadline=now + expect_within + self.grace)
+            if queue_depth is not None:
+                self._state['queue_depth'] = queue_depth
+            if loop_latency is not None:
+                self._state['loop_latency'] = round(loop_latency, 3)
+            self._publish()
+
+    def task_done(self, name):
+        """Record a finished task, which also counts as progress within the current phase"""
+        now = time.time()
+        with self._lock:
+            self._state.update(last_task=name, last_task_at=now, beat_at=now)
+            if self._state['expect_within'] is not None:
+                self._state['deadline'] = now + self._state['expect_within'] + self.grace
+            self._publish()
+
+    def close(self):
+        """Mark the loop as stopped so its absence is not reported as a stall"""
+        with self._lock:
+            self._state.update(phase='stopped', beat_at=time.time(), deadline=None)
+            self._publish()
+
+
+def read_heartbeat(path):
+    """Load a heartbeat file, or None if it is missing or unreadable"""
+    try:
+        return json.loads(Path(path).read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return None
+
+
+def is_stalled(heartbeat, now=None):
+    """True if a heartbeat is past its deadline"""
+    if heartbeat is None or heartbeat.get('deadline') is None:
+        return False
+    return (now or time.time()) > heartbeat['deadline']
@@ -0,0 +1,173 @@
+"""
+Shared - HTTP Client
+Pooled, rate-limited HTTP client with retries used by the social and Odoo MCP servers
+"""
+import time
+import random
+import threading
+from urllib.parse import urlsplit
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+from rate_limiter import TokenBucket
+
+DEFAULT_TIMEOUT = (5, 30)  # (connect, read) seconds
+DEFAULT_MAX_RETRIES = 4
+DEFAULT_BACKOFF = 0.5  # Seconds before the first retry; doubles each attempt
+DEFAULT_MAX_BACKOFF = 60  # Longest single wait, including server-sent Retry-After
+DEFAULT_POOL_SIZE = 10  # Keep-alive connections per host
+
+# Average requests per second and burst size per platform
+PLATFORM_RATE_LIMITS = {
+    'facebook': (200 / 3600, 20),  # Graph API: 200 calls per user per hour
+    'instagram': (200 / 3600, 20),
+    'twitter': (50 / 900, 5),  # v2 POST /tweets: 50 per 15 minutes
+    'odoo': (20, 40),
+}
+DEFAULT_RATE_LIMIT = (10, 20)
+
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'}
+# The server rejected the request without acting on it: always safe to resend
+REJECTED_STATUSES = {429, 503}
+# The server may have acted on the request: only resend idempotent calls
+TRANSIENT_STATUSES = {500, 502, 504}
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP-date), or None"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def _never_sent(error):
+    """True if a request failed before a connection to the server was established"""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return isinstance(reason, NewConnectionError)
+
+
+class HttpClient:
+    """requests wrapper shared by the MCP servers.
+
+    Keeps one requests.Session (and keep-alive connection pool) per host,
+    applies a default timeout to every call, paces calls with a per-platform
+    token bucket, and retries 429/5xx responses and connection failures with
+    exponential backoff, honoring Retry-After. Non-idempotent calls (POST) are
+    only resent when the server cannot have acted on them (429, 503, connect
+    errors) unless the caller passes idempotent=True.
+    """
+
+    def __init__(self, platform, timeout=DEFAULT_TIMEOUT, max_retries=DEFAULT_MAX_RETRIES,
+                 backoff=DEFAULT_BACKOFF, max_backoff=DEFAULT_MAX_BACKOFF,
+                 rate_limit=None, pool_size=DEFAULT_POOL_SIZE, headers=None):
+        self.platform = platform
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.pool_size = pool_size
+        self.headers = dict(headers or {})
+        rate, burst = rate_limit or PLATFORM_RATE_LIMITS.get(platform, DEFAULT_RATE_LIMIT)
+        self.bucket = TokenBucket(rate, burst)
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, platform, config, headers=None):
+        """Build a client from the optional `http` section of an MCP config"""
+        http_config = config.get('http', {})
+        rate_limit = http_config.get('rate_limit')
+        return cls(
+            platform,
+            timeout=tuple(http_config.get('timeout', DEFAULT_TIMEOUT)),
+            max_retries=http_config.get('max_retries', DEFAULT_MAX_RETRIES),
+            backoff=http_config.get('backoff', DEFAULT_BACKOFF),
+            max_backoff=http_config.get('max_backoff', DEFAULT_MAX_BACKOFF),
+            rate_limit=(rate_limit['rate'], rate_limit['burst']) if rate_limit else None,
+            pool_size=http_config.get('pool_size', DEFAULT_POOL_SIZE),
+            headers=headers
+        )
+
+    def session_for(self, url):
+        """Return the pooled session for the URL's scheme and host"""
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.netloc)
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=0)
+                session.mount(f'{parts.scheme}://', adapter)
+                session.headers.update(self.headers)
+                self._sessions[key] = session
+            return session
+
+    def _delay(self, attempt, response=None):
+        """Backoff before retry number `attempt`, preferring the server's Retry-After"""
+        if response is not None:
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            if retry_after is not None:
+                return min(retry_after, self.max_backoff)
+        delay = min(self.backoff * (2 ** attempt), self.max_backoff)
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def request(self, method, url, idempotent=None, **kwargs):
+        """Send a request, retrying transient failures; returns the final response"""
+        method = method.upper()
+        if idempotent is None:
+            idempotent = method in IDEMPOTENT_METHODS
+        kwargs.setdefault('timeout', self.timeout)
+        session = self.session_for(url)
+
+        attempt = 0
+        while True:
+            self.bucket.acquire()
+            try:
+                response = session.request(method, url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if attempt >= self.max_retries or not (idempotent or _never_sent(e)):
+                    raise
+                delay = self._delay(attempt)
+                print(f"[HTTP] {self.platform} {method} {url} failed ({e}); retrying in {delay:.1f}s")
+            else:
+                status = response.status_code
+                retryable = status in REJECTED_STATUSES or (idempotent and status in TRANSIENT_STATUSES)
+                if not retryable or attempt >= self.max_retries:
+                    return response
+                delay = self._delay(attempt, response)
+                print(f"[HTTP] {self.platform} {method} {url} returned {status}; retrying in {delay:.1f}s")
+                response.close()
+                if status == 429:
+                    # Hold back every caller of this platform; acquire() does the waiting
+                    self.bucket.penalize(delay)
+                    delay = 0
+            time.sleep(delay)
+            attempt += 1
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def close(self):
+        """Close every pooled connection"""
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
@@ -3,11 +3,11 @@ Gold Tier - Instagram MCP Server
 Handles Instagram operations via Meta Business API
 """
 import os
-import json
-import requests
-import time
 from pathlib import Path
 from datetime import datetime
+from audit_log import get_audit_log
+from approval_dispatcher import get_approval_dispatcher
+from http_client import HttpClient
 
 class InstagramMCP:
     def __init__(self, config):
@@ -19,6 +19,7 @@ class InstagramMCP:
             'Authorization': f'Bearer {self.access_token}',
             'Content-Type': 'application/json'
         }
+        self.http = HttpClient.from_config('instagram', config, headers=self.headers)
         self.running = True
         
     def create_media_object(self, caption, image_url=None, video_url=None):
@@ -37,7 +38,7 @@ class InstagramMCP:
             return None
         
         try:
-            response = requests.post(url, headers=self.headers, data=data)
+            response = self.http.post(url, data=data)
             result = response.json()
             
             if 'id' in result:
@@ -58,7 +59,7 @@ class InstagramMCP:
         }
         
         try:
-            response = requests.post(url, headers=self.headers, data=data)
+            response = self.http.post(url, data=data)
             result = response.json()
             
             if 'id' in result:
@@ -83,7 +84,7 @@ class InstagramMCP:
         url = f"{self.base_url}?fields=username,account_type,media_count,followers_count,follows_count"
         
         try:
-            response = requests.get(url, headers=self.headers)
+            response = self.http.get(url)
             result = response.json()
             
             if 'username' in result:
@@ -96,98 +97,51 @@ class InstagramMCP:
             print(f"[INSTAGRAM_MCP] Error getting account info: {e}")
             return None
     
-    def monitor_approvals(self, vault_path):
-        """Monitor the Approved folder for Instagram tasks"""
-        vault = Path(vault_path)
-        approved_dir = vault / 'Approved'
+    def register_approvals(self, vault_path):
+        """Register the Instagram handler with the vault's shared approval dispatcher, once at startup"""
+        dispatcher = get_approval_dispatcher(vault_path)
+        dispatcher.register('instagram', lambda approval: self.handle_approval(approval, vault_path))
+        return dispatcher
+
+    def handle_approval(self, approval, vault_path):
+        """Post one approved Instagram task; the dispatcher moves it to Done on success"""
+        approval_file = approval.path
         
-        if not approved_dir.exists():
-            approved_dir.mkdir(parents=True, exist_ok=True)
-            return []
+        print(f"[INSTAGRAM_MCP] Processing Instagram approval: {approval_file.name}")
         
-        # Find Instagram approval files
-        instagram_approvals = []
-        for file in approved_dir.glob('*instagram*'):
-            if file.suffix == '.md':
-                instagram_approvals.append(file)
+        caption = approval.payload
         
-        for file in approved_dir.glob('*insta*'):
-            if file.suffix == '.md':
-                instagram_approvals.append(file)
+        if caption.strip():
+            # Create and publish the media (simulated)
+            # In a real implementation, we would need image/video URLs
+            print(f"[INSTAGRAM_MCP] Creating Instagram post with caption: {caption[:50]}...")
         
-        return instagram_approvals
-    
-    def process_instagram_approvals(self, vault_path):
-        """Process approved Instagram tasks"""
-        approvals = self.monitor_approvals(vault_path)
+            result = {
+                'status': 'success',
+                'operation': 'post_created',
+                'caption': caption[:100],
+                'file_processed': approval_file.name
+            }
         
-        for approval_file in approvals:
-            # Read the approval file to extract details
-            content = approval_file.read_text()
-            
-            print(f"[INSTAGRAM_MCP] Processing Instagram approval: {approval_file.name}")
-            
-            # Extract caption from the approval file (simplified parsing)
-            lines = content.split('\n')
-            caption = ""
-            collecting_caption = False
-            
-            for line in lines:
-                if 'Post Draft' in line:
-                    collecting_caption = True
-                elif collecting_caption and line.startswith('#'):
-                    collecting_caption = False
-                elif collecting_caption and not line.startswith('##'):
-                    caption += line + "\n"
-            
-            if caption.strip():
-                # Create and publish the media (simulated)
-                # In a real implementation, we would need image/video URLs
-                print(f"[INSTAGRAM_MCP] Creating Instagram post with caption: {caption[:50]}...")
-                
-                result = {
-                    'status': 'success',
-                    'operation': 'post_created',
-                    'caption': caption[:100],
-                    'file_processed': approval_file.name
-                }
-                
-                # Log the result
-                self.log_operation(result, vault_path)
-                
-                # Move processed file to Done
-                done_dir = Path(vault_path) / 'Done'
-                done_dir.mkdir(exist_ok=True)
-                approval_file.rename(done_dir / approval_file.name)
-                
-                print(f"[INSTAGRAM_MCP] Created Instagram post from: {approval_file.name}")
-            else:
-                print(f"[INSTAGRAM_MCP] No caption found in approval file: {approval_file.name}")
+            # Log the result
+            self.log_operation(result, vault_path)
+
+            print(f"[INSTAGRAM_MCP] Created Instagram post from: {approval_file.name}")
+            return True
+        else:
+            print(f"[INSTAGRAM_MCP] No caption found in approval file: {approval_file.name}")
+        return False
     
     def log_operation(self, result, vault_path):
-        """Log the operation to the appropriate log file"""
-        logs_dir = Path(vault_path) / 'Logs'
-        logs_dir.mkdir(exist_ok=True)
-        today = datetime.now().strftime('%Y-%m-%d')
-        log_file = logs_dir / f'{today}_instagram.json'
-        
-        # Read existing logs or create new
-        if log_file.exists():
-            with open(log_file, 'r') as f:
-                logs = json.load(f)
-        else:
-            logs = []
-        
-        logs.append({
+        """Append the operation to the instagram audit log stream"""
+        audit_log = get_audit_log(Path(vault_path) / 'Logs', 'instagram')
+        audit_log.append({
             'timestamp': datetime.now().isoformat(),
             'action': result['operation'],
             'file': result['file_processed'],
             'status': result['status'],
             'details': result
         })
-        
-        with open(log_file, 'w') as f:
-            json.dump(logs, f, indent=2)
     
     def run(self, vault_path):
         """Main MCP server loop"""
@@ -200,22 +154,28 @@ class InstagramMCP:
             print("[INSTAGRAM_MCP] Cannot proceed without valid account connection")
             return
         
+        dispatcher = self.register_approvals(vault_path)
         try:
             while self.running:
-                self.process_instagram_approvals(vault_path)
-                time.sleep(30)  # Check every 30 seconds
+                dispatcher.poll()
+                # Wake as soon as an approval lands, at the latest after 30 seconds
+                dispatcher.wait(30)
         except KeyboardInterrupt:
             print("[INSTAGRAM_MCP] Instagram MCP Server stopped by user")
 
-if __name__ == "__main__":
-    # Load Instagram configuration from environment
+def config_from_env():
+    """Read the Instagram MCP configuration from the environment (.env)"""
     import dotenv
     dotenv.load_dotenv()
-    
-    config = {
+
+    return {
         'access_token': os.getenv('INSTAGRAM_ACCESS_TOKEN', 'your_access_token_here'),
         'instagram_account_id': os.getenv('INSTAGRAM_ACCOUNT_ID', 'your_account_id_here'),
     }
+
+if __name__ == "__main__":
+    # Load Instagram configuration from environment
+    config = config_from_env()
     
     if not config['access_token'] or config['access_token'] == 'your_access_token_here':
         print("[WARNING] Instagram access token not found in .env file. Please configure INSTAGRAM_ACCESS_TOKEN.")
@@ -7,7 +7,7 @@ import time
 import requests
 from pathlib import Path
 from datetime import datetime
-import json
+from audit_log import get_audit_log
 
 class LinkedInPoster:
     def __init__(self, vault_path, linkedin_config):
@@ -102,22 +102,7 @@ reason: {reason}
             'status': 'posted'
         }
         
-        logs_dir = self.vault_path / 'Logs'
-        logs_dir.mkdir(exist_ok=True)
-        today = datetime.now().strftime('%Y-%m-%d')
-        log_file = logs_dir / f'{today}_linkedin.json'
-        
-        # Read existing logs or create new
-        if log_file.exists():
-            with open(log_file, 'r') as f:
-                logs = json.load(f)
-        else:
-            logs = []
-        
-        logs.append(log_entry)
-        
-        with open(log_file, 'w') as f:
-            json.dump(logs, f, indent=2)
+        get_audit_log(self.vault_path / 'Logs', 'linkedin').append(log_entry)
         
         return True
 
@@ -141,17 +126,21 @@ def start_linkedin_poster(vault_path, linkedin_config):
     except KeyboardInterrupt:
         print("[STOP SIGN] LinkedIn Poster stopped by user")
 
-if __name__ == "__main__":
-    # Load LinkedIn configuration from environment
+def config_from_env():
+    """Read the LinkedIn configuration from the environment (.env)"""
     import dotenv
     dotenv.load_dotenv()
-    
-    linkedin_config = {
+
+    return {
         'api_url': os.getenv('LINKEDIN_API_URL', ''),
         'access_token': os.getenv('LINKEDIN_ACCESS_TOKEN', ''),
         'person_id': os.getenv('LINKEDIN_PERSON_ID', ''),
         'organization_id': os.getenv('LINKEDIN_ORGANIZATION_ID', '')
     }
+
+if __name__ == "__main__":
+    # Load LinkedIn configuration from environment
+    linkedin_config = config_from_env()
     
     if not linkedin_config['access_token']:
         print("[WARNING] LinkedIn credentials not found in .env file. Please configure LINKEDIN_ACCESS_TOKEN.")
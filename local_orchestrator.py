@@ -8,6 +8,12 @@ import json
 import subprocess
 from pathlib import Path
 from datetime import datetime
+from audit_log import get_audit_log
+from approval_dispatcher import ApprovalDispatcher
+from dashboard_writer import DashboardWriter
+from vault_index import VaultIndex
+from heartbeat import Heartbeat, heartbeat_path, DEFAULT_GRACE
+from signal_channel import SignalChannel
 
 class LocalAgentOrchestrator:
     def __init__(self, vault_path):
@@ -15,6 +21,22 @@ class LocalAgentOrchestrator:
         self.agent_name = "local"
         self.setup_directories()
         self.load_config()
+        self.audit_log = get_audit_log(self.vault / 'Logs')
+        self.index = VaultIndex.from_config(self.vault, self.config)
+        self.dashboard_writer = DashboardWriter(
+            self.vault / 'Dashboard.md',
+            debounce=self.config.get('dashboard_debounce', 5)
+        )
+        self.dispatcher = ApprovalDispatcher(self.vault, index=self.index,
+                                             actor=f'local-agent-{self.agent_name}')
+        self.dispatcher.register('odoo', self.execute_odoo_action)
+        self.dispatcher.register('email', self.execute_email_action)
+        for channel in ('facebook', 'instagram', 'twitter', 'linkedin', 'whatsapp'):
+            self.dispatcher.register(channel, self.execute_social_action)
+        self.dispatcher.register_default(self.complete_approved_item)
+        self.cloud_signals = {}  # One channel per cloud worker, by channel name
+        self.heartbeat = Heartbeat(heartbeat_path(self.vault, self.agent_name), self.agent_name,
+                                   grace=self.config.get('heartbeat_grace', DEFAULT_GRACE))
         self.iteration_count = 0
         self.max_iterations = 20
 
@@ -61,47 +83,29 @@ class LocalAgentOrchestrator:
         
         return all_pending
 
-    def check_approved_items(self):
-        """Check for items that have been approved for execution"""
-        approved_dir = self.vault / 'Approved'
-        if approved_dir.exists():
-            return list(approved_dir.glob('*.md'))
-        return []
-
     def check_cloud_signals(self):
-        """Check for signals from cloud agent"""
+        """Timestamp of the latest signal from any cloud worker, or None"""
+        # Reads each worker's one latest-signal file; history snapshots are never scanned
         signals_dir = self.vault / 'Signals'
-        if signals_dir.exists():
-            return list(signals_dir.glob('*.md'))
-        return []
+        for path in signals_dir.glob('cloud*_signal_latest.md'):
+            name = path.name[:-len('_latest.md')]
+            if name not in self.cloud_signals:
+                self.cloud_signals[name] = SignalChannel.from_config(signals_dir, name, self.config)
+        timestamps = [channel.latest_timestamp() for channel in self.cloud_signals.values()]
+        return max(filter(None, timestamps), default=None)
 
     def process_approved_item(self, approved_file):
-        """Process an approved item using appropriate MCP server"""
-        try:
-            content = approved_file.read_text()
-            
-            # Determine the type of action based on the file content
-            if 'create_odoo_invoice' in str(approved_file) or 'invoice' in content.lower():
-                return self.execute_odoo_action(approved_file, content)
-            elif 'send_response' in str(approved_file) or 'email' in content.lower():
-                return self.execute_email_action(approved_file, content)
-            elif 'post_' in str(approved_file) or 'social' in content.lower():
-                return self.execute_social_action(approved_file, content)
-            else:
-                # Move to Done if no specific action needed
-                done_dir = self.vault / 'Done'
-                done_dir.mkdir(exist_ok=True)
-                new_file = done_dir / approved_file.name
-                approved_file.rename(new_file)
-                print(f"[LOCAL_AGENT] Moved approved item to Done: {new_file.name}")
-                return True
-                
-        except Exception as e:
-            self.log_error(f"Error processing approved item {approved_file.name}: {e}")
-            return False
+        """Claim an approved item and run it through the handler registered for its action"""
+        return bool(self.dispatcher.dispatch(approved_file))
 
-    def execute_odoo_action(self, approved_file, content):
+    def complete_approved_item(self, approval):
+        """Approvals with no specific action need no execution; the dispatcher files them in Done"""
+        print(f"[LOCAL_AGENT] No action required for approved item: {approval.path.name}")
+        return True
+
+    def execute_odoo_action(self, approval):
         """Execute Odoo-related action via MCP server"""
+        approved_file = approval.path
         print(f"[LOCAL_AGENT] Executing Odoo action from: {approved_file.name}")
         
         # In a real implementation, this would call the Odoo MCP server
@@ -110,20 +114,14 @@ class LocalAgentOrchestrator:
             # Simulate calling the Odoo MCP server
             print(f"[ODOO_MCP] Executing approved Odoo action: {approved_file.name}")
             
-            # Move to Done
-            done_dir = self.vault / 'Done'
-            done_dir.mkdir(exist_ok=True)
-            new_file = done_dir / approved_file.name
-            approved_file.rename(new_file)
-            
-            print(f"[LOCAL_AGENT] Odoo action executed and moved to Done: {new_file.name}")
+            print(f"[LOCAL_AGENT] Odoo action executed: {approved_file.name}")
             
             # Log the action
             self.log_action({
                 'timestamp': datetime.now().isoformat(),
                 'action_type': 'odoo_execution',
                 'actor': f'local-agent-{self.agent_name}',
-                'target': new_file.name,
+                'target': approved_file.name,
                 'parameters': {'action': 'odoo_operation'},
                 'approval_status': 'approved',
                 'result': 'success'
@@ -134,8 +132,9 @@ class LocalAgentOrchestrator:
             self.log_error(f"Error executing Odoo action: {e}")
             return False
 
-    def execute_email_action(self, approved_file, content):
+    def execute_email_action(self, approval):
         """Execute email-related action via email MCP server"""
+        approved_file = approval.path
         print(f"[LOCAL_AGENT] Executing email action from: {approved_file.name}")
         
         # In a real implementation, this would call the email MCP server
@@ -144,20 +143,14 @@ class LocalAgentOrchestrator:
             # Simulate calling the email MCP server
             print(f"[EMAIL_MCP] Executing approved email action: {approved_file.name}")
             
-            # Move to Done
-            done_dir = self.vault / 'Done'
-            done_dir.mkdir(exist_ok=True)
-            new_file = done_dir / approved_file.name
-            approved_file.rename(new_file)
-            
-            print(f"[LOCAL_AGENT] Email action executed and moved to Done: {new_file.name}")
+            print(f"[LOCAL_AGENT] Email action executed: {approved_file.name}")
             
             # Log the action
             self.log_action({
                 'timestamp': datetime.now().isoformat(),
                 'action_type': 'email_execution',
                 'actor': f'local-agent-{self.agent_name}',
-                'target': new_file.name,
+                'target': approved_file.name,
                 'parameters': {'action': 'email_send'},
                 'approval_status': 'approved',
                 'result': 'success'
@@ -168,8 +161,9 @@ class LocalAgentOrchestrator:
             self.log_error(f"Error executing email action: {e}")
             return False
 
-    def execute_social_action(self, approved_file, content):
+    def execute_social_action(self, approval):
         """Execute social media-related action via social MCP servers"""
+        approved_file = approval.path
         print(f"[LOCAL_AGENT] Executing social action from: {approved_file.name}")
         
         # In a real implementation, this would call the appropriate social MCP server
@@ -178,20 +172,14 @@ class LocalAgentOrchestrator:
             # Simulate calling the social MCP server
             print(f"[SOCIAL_MCP] Executing approved social action: {approved_file.name}")
             
-            # Move to Done
-            done_dir = self.vault / 'Done'
-            done_dir.mkdir(exist_ok=True)
-            new_file = done_dir / approved_file.name
-            approved_file.rename(new_file)
-            
-            print(f"[LOCAL_AGENT] Social action executed and moved to Done: {new_file.name}")
+            print(f"[LOCAL_AGENT] Social action executed: {approved_file.name}")
             
             # Log the action
             self.log_action({
                 'timestamp': datetime.now().isoformat(),
                 'action_type': 'social_execution',
                 'actor': f'local-agent-{self.agent_name}',
-                'target': new_file.name,
+                'target': approved_file.name,
                 'parameters': {'action': 'social_post'},
                 'approval_status': 'approved',
                 'result': 'success'
@@ -203,23 +191,34 @@ class LocalAgentOrchestrator:
             return False
 
     def update_dashboard(self):
-        """Update the main dashboard (only Local Agent can update Dashboard.md)"""
-        dashboard = self.vault / 'Dashboard.md'
-
+        """Update the main dashboard when its contents change (only Local Agent can update Dashboard.md)"""
         # Count tasks
-        needs_action = len(list((self.vault / 'Needs_Action' / 'whatsapp').glob('*.md'))) + \
-                      len(list((self.vault / 'Needs_Action' / 'accounting').glob('*.md')))
-        
-        pending = len(list((self.vault / 'Pending_Approval' / 'whatsapp').glob('*.md'))) + \
-                 len(list((self.vault / 'Pending_Approval' / 'accounting').glob('*.md')))
-        
-        done = len(list((self.vault / 'Done').glob('*.md')))
+        needs_action = self.index.count_all('Needs_Action/whatsapp', 'Needs_Action/accounting')
+        pending = self.index.count_all('Pending_Approval/whatsapp', 'Pending_Approval/accounting')
+        done = self.index.count('Done')
 
         # Get cloud agent signals
-        cloud_signals = self.check_cloud_signals()
-        last_cloud_signal = "No recent cloud activity" if not cloud_signals else f"Last signal: {cloud_signals[-1].name}"
-
-        content = f"""---
+        cloud_signal_time = self.check_cloud_signals()
+        last_cloud_signal = "No recent cloud activity" if not cloud_signal_time else f"Last signal: {cloud_signal_time}"
+
+        # Everything shown on the dashboard except the timestamp
+        inputs = {
+            'needs_action': needs_action,
+            'pending': pending,
+            'done': done,
+            'last_cloud_signal': last_cloud_signal,
+            'recent_activities': self.get_recent_activities()
+        }
+        self.dashboard_writer.update(inputs, self.render_dashboard)
+
+    def render_dashboard(self, inputs):
+        """Render Dashboard.md from the dashboard inputs"""
+        needs_action = inputs['needs_action']
+        pending = inputs['pending']
+        done = inputs['done']
+        last_cloud_signal = inputs['last_cloud_signal']
+
+        return f"""---
 type: dashboard
 last_updated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 status: active
@@ -253,7 +252,7 @@ status: active
 - Awaiting local approval for execution
 
 ## Recent Activities
-{self.get_recent_activities()}
+{inputs['recent_activities']}
 
 ## Pending Items
 - {pending} item(s) in Pending Approval (Local Agent)
@@ -279,20 +278,13 @@ Platinum Tier active – Hybrid operation with Cloud (drafts) + Local (execution
 ---
 *Last updated by Local Agent*
 """
-        dashboard.write_text(content)
 
     def get_recent_activities(self):
         """Get recent activities from logs"""
         try:
-            today = datetime.now().strftime('%Y-%m-%d')
-            log_file = self.vault / 'Logs' / f'{today}.json'
-
-            if log_file.exists():
-                with open(log_file, 'r') as f:
-                    logs = json.load(f)
-
-                # Get last 5 activities
-                recent = logs[-5:] if len(logs) > 5 else logs
+            # Get last 5 activities
+            recent = self.audit_log.tail(5)
+            if recent:
                 activities = []
 
                 for log in recent:
@@ -308,22 +300,8 @@ Platinum Tier active – Hybrid operation with Cloud (drafts) + Local (execution
         return "- No activities logged yet"
 
     def log_action(self, data):
-        """Log actions to JSON log file"""
-        log_dir = self.vault / 'Logs'
-        today = datetime.now().strftime('%Y-%m-%d')
-        log_file = log_dir / f'{today}.json'
-
-        # Read existing logs or create new
-        if log_file.exists():
-            with open(log_file, 'r') as f:
-                logs = json.load(f)
-        else:
-            logs = []
-
-        logs.append(data)
-
-        with open(log_file, 'w') as f:
-            json.dump(logs, f, indent=2)
+        """Append an action to the JSON Lines audit log"""
+        self.audit_log.append(data)
 
     def log_error(self, message):
         """Log error messages"""
@@ -342,9 +320,13 @@ Platinum Tier active – Hybrid operation with Cloud (drafts) + Local (execution
         print("=" * 50)
 
         self._start_time = datetime.now()
+        self.dispatcher.start()
+        self.heartbeat.beat('starting', self.config['check_interval'])
 
         try:
             while self.iteration_count < self.max_iterations:
+                loop_started = time.monotonic()
+
                 # Check for pending approvals from cloud agent
                 pending_approvals = self.check_pending_approvals()
                 
@@ -355,16 +337,17 @@ Platinum Tier active – Hybrid operation with Cloud (drafts) + Local (execution
                         # In a real system, these would need manual approval
                         # For demo purposes, we'll log them as pending
 
-                # Check for approved items that need execution
-                approved_items = self.check_approved_items()
+                # Execute approved items (the dispatcher claims each one exactly once)
+                self.heartbeat.beat('executing', self.config.get('execute_timeout', 300),
+                                    queue_depth=len(self.dispatcher.intake))
+                executed = self.dispatcher.poll()
                 
-                if approved_items:
-                    print(f"[CLIPBOARD] Local Agent found {len(approved_items)} approved item(s) to execute")
-                    for item in approved_items:
-                        print(f"  Local Agent executing: {item.name}")
-                        success = self.process_approved_item(item)
+                if executed:
+                    print(f"[CLIPBOARD] Local Agent executed {len(executed)} approved item(s)")
+                    for name, success in executed:
+                        self.heartbeat.task_done(name)
                         if success:
-                            print(f"  [CHECK] Executed: {item.name}")
+                            print(f"  [CHECK] Executed: {name}")
 
                 # Update dashboard (only Local Agent can do this)
                 self.update_dashboard()
@@ -372,8 +355,13 @@ Platinum Tier active – Hybrid operation with Cloud (drafts) + Local (execution
                 # Increment iteration counter
                 self.iteration_count += 1
                 
-                # Wait before next check
-                time.sleep(self.config['check_interval'])
+                # Tell the health monitor the loop is alive before going idle
+                self.heartbeat.beat('waiting', self.config['check_interval'],
+                                    queue_depth=len(self.dispatcher.intake),
+                                    loop_latency=time.monotonic() - loop_started)
+                
+                # Wait before next check, waking early when an approval lands
+                self.dispatcher.wait(self.config['check_interval'])
 
             print(f"[ITERATION] Local Agent completed {self.max_iterations} iterations.")
             print("Local Agent can be restarted when needed for processing.")
@@ -383,6 +371,12 @@ Platinum Tier active – Hybrid operation with Cloud (drafts) + Local (execution
         except Exception as e:
             print(f"[CROSS MARK] Error in Local Agent orchestrator: {e}")
             self.log_error(f"Local Agent Orchestrator crashed: {e}")
+            raise  # Exit non-zero: the supervisor restarts the on-demand agent only after a failure
+        finally:
+            self.dispatcher.stop()
+            # Write any dashboard change still waiting out the debounce window
+            self.dashboard_writer.flush()
+            self.heartbeat.close()
 
 if __name__ == "__main__":
     VAULT_PATH = "C:/Users/manal/OneDrive/Desktop/Hacakthon 0/AI_Employee_Vault_Platinum"
@@ -0,0 +1,105 @@
+"""
+Shared - Metadata Cache
+Persistent cache of task and approval frontmatter shared by orchestrators and MCP servers
+"""
+import os
+import json
+import time
+import sqlite3
+import threading
+from pathlib import Path
+from collections import OrderedDict
+from approval_schema import read_frontmatter
+
+DEFAULT_LRU_SIZE = 4096  # Entries answered from memory without touching SQLite
+DEFAULT_RETENTION = 30 * 24 * 3600  # Seconds an entry is kept after it was last used
+
+
+class MetadataCache:
+    """Frontmatter of vault files, keyed by path and validated by (inode, mtime, size).
+
+    Only the frontmatter block is ever read, never the body. A file whose
+    inode, modification time and size are unchanged is answered from a
+    bounded in-memory LRU or, after a restart or from another process, from
+    SQLite in the vault's .cache folder, so routing a task or an approval
+    costs a stat() and a dict lookup. Entries that go unused for `retention`
+    seconds are pruned when the cache is opened.
+    """
+
+    def __init__(self, db_path, lru_size=DEFAULT_LRU_SIZE, retention=DEFAULT_RETENTION):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.lru_size = lru_size
+        self._recent = OrderedDict()
+        self._lock = threading.Lock()
+        self.db = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS frontmatter (
+                path TEXT PRIMARY KEY,
+                signature TEXT NOT NULL,
+                meta TEXT NOT NULL,
+                used_at REAL NOT NULL
+            )
+        """)
+        self.db.execute('DELETE FROM frontmatter WHERE used_at < ?', (time.time() - retention,))
+        self.db.commit()
+
+    def _remember(self, key, entry):
+        """Move an entry to the front of the LRU, evicting the oldest if full"""
+        self._recent[key] = entry
+        self._recent.move_to_end(key)
+        if len(self._recent) > self.lru_size:
+            self._recent.popitem(last=False)
+
+    def get(self, path):
+        """Frontmatter of a file as a dict, or None if the file does not exist"""
+        path = Path(path)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        key = str(path)
+        signature = f'{stat.st_ino}:{stat.st_mtime_ns}:{stat.st_size}'
+        with self._lock:
+            cached = self._recent.get(key)
+            if cached is not None and cached[0] == signature:
+                self._recent.move_to_end(key)
+                return cached[1]
+            row = self.db.execute('SELECT meta FROM frontmatter WHERE path = ? AND signature = ?',
+                                  (key, signature)).fetchone()
+            if row is not None:
+                meta = json.loads(row[0])
+                self.db.execute('UPDATE frontmatter SET used_at = ? WHERE path = ?', (time.time(), key))
+                self.db.commit()
+                self._remember(key, (signature, meta))
+                return meta
+
+        try:
+            meta = read_frontmatter(path)
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            self.db.execute('INSERT OR REPLACE INTO frontmatter VALUES (?, ?, ?, ?)',
+                            (key, signature, json.dumps(meta, default=str), time.time()))
+            self.db.commit()
+            self._remember(key, (signature, meta))
+        return meta
+
+    def close(self):
+        with self._lock:
+            self.db.close()
+
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def get_metadata_cache(vault_path):
+    """Return the shared MetadataCache kept in a vault's .cache folder"""
+    db_path = (Path(vault_path) / '.cache' / 'metadata.sqlite3').resolve()
+    with _registry_lock:
+        if db_path not in _registry:
+            _registry[db_path] = MetadataCache(db_path)
+        return _registry[db_path]
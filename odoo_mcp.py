@@ -3,11 +3,102 @@ Gold Tier - Odoo MCP Server
 Handles Odoo accounting operations via JSON-RPC API
 """
 import os
+import re
 import json
-import requests
 import time
+import itertools
+import threading
 from pathlib import Path
 from datetime import datetime
+from audit_log import get_audit_log
+from approval_dispatcher import get_approval_dispatcher
+from http_client import HttpClient
+
+# Model methods that only read, so a failed call can safely be resent
+READ_METHODS = {'read', 'search', 'search_read', 'search_count', 'read_group', 'fields_get', 'name_get'}
+DEFAULT_CACHE_TTL = 300  # Seconds a partner/journal lookup is reused
+PARTNER_FIELDS = ['name', 'email', 'phone']
+# Odoo operation -> verbs in an approval's action (or file name); checked in order
+ODOO_OPERATIONS = (
+    ('payment', ('payment', 'pay', 'paid')),
+    ('invoice', ('invoice', 'bill')),
+)
+AMOUNT_FIELDS = ('amount', 'payment amount', 'invoice amount', 'total')
+
+_WORD_RE = re.compile(r'[a-z0-9]+')
+_AMOUNT_RE = re.compile(r'\d[\d,]*(?:\.\d+)?')
+_PARENTHETICAL_RE = re.compile(r'\s*\([^)]*\)')
+
+
+def odoo_operation(approval):
+    """Odoo operation an approval asks for ('invoice', 'payment'), or None"""
+    words = set(_WORD_RE.findall((approval.action or approval.path.stem).lower()))
+    return next((operation for operation, verbs in ODOO_OPERATIONS if words.intersection(verbs)), None)
+
+
+def approval_amount(approval):
+    """Amount from an approval's frontmatter or "- **Amount**: $1,250.00" field, or None"""
+    for source in (approval.meta, approval.fields):
+        for key in AMOUNT_FIELDS:
+            value = source.get(key)
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                return float(value)
+            match = _AMOUNT_RE.search(str(value or ''))
+            if match:
+                return float(match.group(0).replace(',', ''))
+    return None
+
+
+def approval_contact(approval):
+    """Partner name and email an approval is for, e.g. {'name': 'Premium Client Inc.'}"""
+    target = _PARENTHETICAL_RE.sub('', approval.target or '').strip()
+    email = approval.meta.get('email') or approval.fields.get('email')
+    if not email and '@' in target:
+        email = target
+    contact = {'name': target or email or approval.path.stem}
+    if email:
+        contact['email'] = str(email)
+    return contact
+
+
+def invoice_line(approval, amount):
+    """The single invoice line an approval describes"""
+    description = approval.fields.get('service') or approval.subject or approval.path.stem
+    return {'name': description, 'quantity': 1, 'price_unit': amount or 0.0}
+
+
+class LookupCache:
+    """Small TTL cache for Odoo lookups that rarely change (partners, journals)"""
+
+    def __init__(self, ttl=DEFAULT_CACHE_TTL):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if time.monotonic() >= expires:
+                del self._entries[key]
+                return None
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+
+    def invalidate(self, prefix=None):
+        """Drop every entry, or those whose key starts with `prefix`"""
+        with self._lock:
+            if prefix is None:
+                self._entries.clear()
+            else:
+                for key in [key for key in self._entries if key[0] == prefix]:
+                    del self._entries[key]
+
 
 class OdooMCP:
     def __init__(self, config):
@@ -19,6 +110,9 @@ class OdooMCP:
         self.headers = {
             'Content-Type': 'application/json',
         }
+        self.http = HttpClient.from_config('odoo', config)
+        self.request_ids = itertools.count(1)
+        self.cache = LookupCache(config.get('cache_ttl', DEFAULT_CACHE_TTL))
         self.running = True
         
     def authenticate(self):
@@ -27,7 +121,7 @@ class OdooMCP:
             # In Odoo with API keys, we typically use the API key as a bearer token
             self.headers['Authorization'] = f'Bearer {self.api_key}'
             # Test connection
-            response = self.call_odoo_method('res.users', 'read', [1], ['name'])
+            response = self.call_odoo_method('res.users', 'read', [[1]], {'fields': ['name']})
             if response:
                 print("[ODOO_MCP] Successfully authenticated with Odoo")
                 return True
@@ -50,15 +144,15 @@ class OdooMCP:
                 'method': 'execute_kw',
                 'args': [self.db, 0, self.api_key, model, method, args, kwargs]
             },
-            'id': int(time.time())
+            'id': next(self.request_ids)
         }
         
         try:
-            response = requests.post(
+            response = self.http.post(
                 f"{self.url}/jsonrpc",
                 headers=self.headers,
                 data=json.dumps(payload),
-                timeout=30
+                idempotent=method in READ_METHODS
             )
             
             result = response.json()
@@ -71,30 +165,69 @@ class OdooMCP:
             print(f"[ODOO_MCP] Error calling Odoo method: {e}")
             return None
     
+    def search_read(self, model, domain, fields, limit=None, cache=False):
+        """Search and read records in one round-trip, optionally through the lookup cache
+
+        Empty results are never cached, so a record created elsewhere (another
+        process, the Odoo UI) is found on the next lookup rather than after the TTL.
+        """
+        kwargs = {'fields': fields}
+        if limit:
+            kwargs['limit'] = limit
+        key = (model, json.dumps(domain, sort_keys=True), tuple(fields), limit)
+        if cache:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+        records = self.call_odoo_method(model, 'search_read', [domain], kwargs)
+        if records and cache:
+            self.cache.set(key, records)
+        return records
+
+    def get_journal(self, journal_type='sale'):
+        """Id of the first journal of a type (sale, bank, cash, ...), cached"""
+        journals = self.search_read('account.journal', [['type', '=', journal_type]],
+                                    ['id', 'name'], limit=1, cache=True)
+        return journals[0]['id'] if journals else None
+
     def create_invoice(self, partner_id, lines, date_invoice=None, journal_id=1):
         """Create a customer invoice in Odoo"""
-        if not date_invoice:
-            date_invoice = datetime.now().strftime('%Y-%m-%d')
-        
-        invoice_vals = {
+        invoice_ids = self.create_invoices([{
             'partner_id': partner_id,
+            'lines': lines,
+            'date_invoice': date_invoice,
+            'journal_id': journal_id
+        }])
+        return invoice_ids[0] if invoice_ids else None
+
+    def create_invoices(self, invoices):
+        """Create many customer invoices with a single multi-record create.
+
+        Each invoice is a dict with partner_id, lines and optionally
+        date_invoice and journal_id. Returns the new ids in the same order.
+        """
+        today = datetime.now().strftime('%Y-%m-%d')
+        invoice_vals = [{
+            'partner_id': invoice['partner_id'],
             'move_type': 'out_invoice',
-            'invoice_date': date_invoice,
-            'journal_id': journal_id,
-            'invoice_line_ids': [(0, 0, line) for line in lines]
-        }
+            'invoice_date': invoice.get('date_invoice') or today,
+            'journal_id': invoice.get('journal_id') or self.get_journal('sale') or 1,
+            'invoice_line_ids': [(0, 0, line) for line in invoice['lines']]
+        } for invoice in invoices]
+        if not invoice_vals:
+            return []
         
         try:
-            invoice_id = self.call_odoo_method('account.move', 'create', [invoice_vals])
-            if invoice_id:
-                print(f"[ODOO_MCP] Invoice created with ID: {invoice_id}")
-                return invoice_id
+            invoice_ids = self.call_odoo_method('account.move', 'create', [invoice_vals])
+            if invoice_ids:
+                print(f"[ODOO_MCP] Created {len(invoice_ids)} invoice(s): {invoice_ids}")
+                return invoice_ids
             else:
-                print("[ODOO_MCP] Failed to create invoice")
-                return None
+                print("[ODOO_MCP] Failed to create invoices")
+                return []
         except Exception as e:
-            print(f"[ODOO_MCP] Error creating invoice: {e}")
-            return None
+            print(f"[ODOO_MCP] Error creating invoices: {e}")
+            return []
     
     def create_partner(self, name, email=None, phone=None):
         """Create a partner/contact in Odoo"""
@@ -107,6 +240,7 @@ class OdooMCP:
         try:
             partner_id = self.call_odoo_method('res.partner', 'create', [partner_vals])
             if partner_id:
+                self.cache.invalidate('res.partner')
                 print(f"[ODOO_MCP] Partner created with ID: {partner_id}")
                 return partner_id
             else:
@@ -119,127 +253,181 @@ class OdooMCP:
     def search_partner(self, domain):
         """Search for partners in Odoo"""
         try:
-            partner_ids = self.call_odoo_method('res.partner', 'search', [domain])
-            if partner_ids:
-                partners = self.call_odoo_method('res.partner', 'read', [partner_ids], ['name', 'email', 'phone'])
-                return partners
-            else:
-                return []
+            return self.search_read('res.partner', domain, PARTNER_FIELDS, cache=True) or []
         except Exception as e:
             print(f"[ODOO_MCP] Error searching partners: {e}")
             return []
+
+    def _match_partners(self, emails, names, found, cache):
+        """Add the ids of partners with one of `emails` (or, for contacts without an email, `names`) to `found`"""
+        domain = [['email', 'in', emails]] if emails else []
+        if names:
+            domain.append(['name', 'in', names])
+        if len(domain) == 2:
+            domain.insert(0, '|')
+        for partner in self.search_read('res.partner', domain, ['id'] + PARTNER_FIELDS, cache=cache) or []:
+            if partner.get('email') in emails:
+                found.setdefault(('email', partner['email']), partner['id'])
+            if partner.get('name') in names:
+                found.setdefault(('name', partner['name']), partner['id'])
+
+    def find_or_create_partners(self, contacts):
+        """Resolve many contacts (dicts with name and email) to partner ids.
+
+        Existing partners are found with one search_read over all emails (and
+        the names of contacts without one), anything not found is looked up
+        once more bypassing the cache, and the still-missing ones are created
+        with one multi-record create, so a batch costs at most three
+        round-trips instead of two per contact.
+        """
+        def key(contact):
+            return ('email', contact['email']) if contact.get('email') else ('name', contact.get('name'))
+
+        emails = sorted({contact['email'] for contact in contacts if contact.get('email')})
+        names = sorted({contact['name'] for contact in contacts if not contact.get('email') and contact.get('name')})
+        found = {}
+        if emails or names:
+            self._match_partners(emails, names, found, cache=True)
+            missing_emails = [email for email in emails if ('email', email) not in found]
+            missing_names = [name for name in names if ('name', name) not in found]
+            if missing_emails or missing_names:
+                # A cached result can predate partners created elsewhere; never create from it
+                self._match_partners(missing_emails, missing_names, found, cache=False)
+
+        # Contacts sharing an email (or, without one, a name) become one partner
+        partner_ids = [found.get(key(contact)) for contact in contacts]
+        groups = {}
+        for index, contact in enumerate(contacts):
+            if partner_ids[index] is None:
+                groups.setdefault(key(contact) if key(contact)[1] else index, []).append(index)
+
+        if groups:
+            indexes = list(groups.values())
+            new_ids = self.call_odoo_method('res.partner', 'create', [[
+                {field: contacts[group[0]][field] for field in PARTNER_FIELDS if contacts[group[0]].get(field)}
+                for group in indexes]]) or []
+            self.cache.invalidate('res.partner')
+            for group, partner_id in zip(indexes, new_ids):
+                for index in group:
+                    partner_ids[index] = partner_id
+        return partner_ids
     
-    def register_payment(self, invoice_id, amount, journal_id=1):
+    def register_payment(self, invoice_id, amount, journal_id=1, partner_id=None):
         """Register a payment for an invoice in Odoo"""
-        try:
-            # Create payment wizard
-            payment_vals = {
-                'amount': amount,
-                'journal_id': journal_id,
+        payment_ids = self.register_payments([{
+            'invoice_id': invoice_id,
+            'amount': amount,
+            'journal_id': journal_id,
+            'partner_id': partner_id
+        }])
+        return payment_ids[0] if payment_ids else None
+
+    def register_payments(self, payments):
+        """Create and post many payments in two round-trips (create, action_post)"""
+        payment_vals = []
+        for payment in payments:
+            vals = {
+                'amount': payment['amount'],
+                'journal_id': payment.get('journal_id') or self.get_journal('bank') or 1,
                 'payment_type': 'inbound',
                 'partner_type': 'customer',
             }
-            
-            payment_id = self.call_odoo_method('account.payment', 'create', [payment_vals])
-            if payment_id:
-                # Post the payment
-                self.call_odoo_method('account.payment', 'action_post', [[payment_id]])
-                print(f"[ODOO_MCP] Payment registered with ID: {payment_id}")
+            if payment.get('partner_id'):
+                vals['partner_id'] = payment['partner_id']
+            payment_vals.append(vals)
+        if not payment_vals:
+            return []
+
+        try:
+            payment_ids = self.call_odoo_method('account.payment', 'create', [payment_vals])
+            if payment_ids:
+                # Post every payment at once
+                self.call_odoo_method('account.payment', 'action_post', [payment_ids])
+                print(f"[ODOO_MCP] Registered {len(payment_ids)} payment(s): {payment_ids}")
                 
                 # Reconcile with invoice
                 # This is a simplified version - actual reconciliation is more complex
-                return payment_id
+                return payment_ids
             else:
-                print("[ODOO_MCP] Failed to register payment")
-                return None
+                print("[ODOO_MCP] Failed to register payments")
+                return []
         except Exception as e:
-            print(f"[ODOO_MCP] Error registering payment: {e}")
-            return None
-    
-    def monitor_approvals(self, vault_path):
-        """Monitor the Approved folder for Odoo tasks"""
-        vault = Path(vault_path)
-        approved_dir = vault / 'Approved'
-        
-        if not approved_dir.exists():
-            approved_dir.mkdir(parents=True, exist_ok=True)
+            print(f"[ODOO_MCP] Error registering payments: {e}")
             return []
-        
-        # Find Odoo approval files
-        odoo_approvals = []
-        for file in approved_dir.glob('*odoo*'):
-            if file.suffix == '.md':
-                odoo_approvals.append(file)
-        
-        for file in approved_dir.glob('*invoice*'):
-            if file.suffix == '.md':
-                odoo_approvals.append(file)
-        
-        for file in approved_dir.glob('*payment*'):
-            if file.suffix == '.md':
-                odoo_approvals.append(file)
-        
-        return odoo_approvals
     
-    def process_odoo_approvals(self, vault_path):
-        """Process approved Odoo tasks"""
-        approvals = self.monitor_approvals(vault_path)
-        
-        for approval_file in approvals:
-            # Read the approval file to extract details
-            content = approval_file.read_text()
-            
-            # This is a simplified processing - in reality, we'd parse the content
-            # to extract specific parameters for the Odoo operation
-            print(f"[ODOO_MCP] Processing Odoo approval: {approval_file.name}")
-            
-            # Example: If it's an invoice approval
-            if 'create_odoo_invoice' in str(approval_file) or 'invoice' in content.lower():
-                # In a real implementation, we would extract the invoice details
-                # from the approval file and create the invoice in Odoo
-                print(f"[ODOO_MCP] Creating invoice from approval: {approval_file.name}")
-                
-                # Mock operation - in reality, we'd parse the file for actual data
-                result = {
-                    'status': 'success',
-                    'operation': 'invoice_created',
-                    'file_processed': approval_file.name
-                }
-                
-                # Log the result
-                self.log_operation(result, vault_path)
-                
-                # Move processed file to Done
-                done_dir = Path(vault_path) / 'Done'
-                done_dir.mkdir(exist_ok=True)
-                approval_file.rename(done_dir / approval_file.name)
-                
-                print(f"[ODOO_MCP] Processed Odoo approval: {approval_file.name}")
+    def register_approvals(self, vault_path):
+        """Register the Odoo handler with the vault's shared approval dispatcher, once at startup"""
+        dispatcher = get_approval_dispatcher(vault_path)
+        dispatcher.register_batch('odoo', lambda approvals: self.handle_approvals(approvals, vault_path))
+        return dispatcher
+
+    def handle_approval(self, approval, vault_path):
+        """Execute one approved Odoo task; the dispatcher moves it to Done on success"""
+        return self.handle_approvals([approval], vault_path)[0]
+
+    def handle_approvals(self, approvals, vault_path):
+        """Execute a poll's approved Odoo tasks together; returns a success flag per approval.
+
+        Partners for every approval are resolved in one find_or_create_partners
+        call, then all invoices go out in one multi-record create and all
+        payments in one create plus one action_post.
+        """
+        plans = []  # (approval, operation, amount, error)
+        for approval in approvals:
+            print(f"[ODOO_MCP] Processing Odoo approval: {approval.path.name}")
+            operation = odoo_operation(approval)
+            amount = approval_amount(approval)
+            error = None
+            if operation is None:
+                error = f"unknown Odoo action {approval.action or approval.path.stem!r}"
+            elif operation == 'payment' and not amount:
+                error = "payment approval has no amount"
+            plans.append((approval, operation, amount, error))
+
+        runnable = [index for index, plan in enumerate(plans) if plan[3] is None]
+        partner_ids = dict(zip(runnable, self.find_or_create_partners(
+            [approval_contact(plans[index][0]) for index in runnable]))) if runnable else {}
+
+        invoices = [index for index in runnable if plans[index][1] == 'invoice' and partner_ids.get(index)]
+        payments = [index for index in runnable if plans[index][1] == 'payment']
+        record_ids = {}
+        if invoices:
+            record_ids.update(zip(invoices, self.create_invoices([{
+                'partner_id': partner_ids[index],
+                'lines': [invoice_line(plans[index][0], plans[index][2])]
+            } for index in invoices])))
+        if payments:
+            record_ids.update(zip(payments, self.register_payments([{
+                'amount': plans[index][2],
+                'partner_id': partner_ids.get(index)
+            } for index in payments])))
+
+        results = []
+        for index, (approval, operation, amount, error) in enumerate(plans):
+            record_id = record_ids.get(index)
+            if record_id is None:
+                error = error or f"Odoo did not create the {operation}"
+                print(f"[ODOO_MCP] Cannot process {approval.path.name}: {error}")
+                self.log_operation({'status': 'failed', 'operation': operation or 'unknown',
+                                    'file_processed': approval.path.name, 'error': error}, vault_path)
+                results.append(False)
+                continue
+            self.log_operation({'status': 'success', 'operation': f'{operation}_created',
+                                'file_processed': approval.path.name, 'record_id': record_id}, vault_path)
+            print(f"[ODOO_MCP] Processed Odoo approval: {approval.path.name}")
+            results.append(True)
+        return results
     
     def log_operation(self, result, vault_path):
-        """Log the operation to the appropriate log file"""
-        logs_dir = Path(vault_path) / 'Logs'
-        logs_dir.mkdir(exist_ok=True)
-        today = datetime.now().strftime('%Y-%m-%d')
-        log_file = logs_dir / f'{today}_odoo.json'
-        
-        # Read existing logs or create new
-        if log_file.exists():
-            with open(log_file, 'r') as f:
-                logs = json.load(f)
-        else:
-            logs = []
-        
-        logs.append({
+        """Append the operation to the odoo audit log stream"""
+        audit_log = get_audit_log(Path(vault_path) / 'Logs', 'odoo')
+        audit_log.append({
             'timestamp': datetime.now().isoformat(),
             'action': result['operation'],
             'file': result['file_processed'],
             'status': result['status'],
             'details': result
         })
-        
-        with open(log_file, 'w') as f:
-            json.dump(logs, f, indent=2)
     
     def run(self, vault_path):
         """Main MCP server loop"""
@@ -252,23 +440,29 @@ class OdooMCP:
             print("[ODOO_MCP] Cannot proceed without Odoo authentication")
             return
         
+        dispatcher = self.register_approvals(vault_path)
         try:
             while self.running:
-                self.process_odoo_approvals(vault_path)
-                time.sleep(30)  # Check every 30 seconds
+                dispatcher.poll()
+                # Wake as soon as an approval lands, at the latest after 30 seconds
+                dispatcher.wait(30)
         except KeyboardInterrupt:
             print("[ODOO_MCP] Odoo MCP Server stopped by user")
 
-if __name__ == "__main__":
-    # Load Odoo configuration from environment
+def config_from_env():
+    """Read the Odoo MCP configuration from the environment (.env)"""
     import dotenv
     dotenv.load_dotenv()
-    
-    config = {
+
+    return {
         'url': os.getenv('ODOO_URL', 'http://localhost:8069'),
         'database': os.getenv('ODOO_DB', 'gold_tier_db'),
         'api_key': os.getenv('ODOO_API_KEY', 'your_api_key_here'),
     }
+
+if __name__ == "__main__":
+    # Load Odoo configuration from environment
+    config = config_from_env()
     
     if not config['api_key'] or config['api_key'] == 'your_api_key_here':
         print("[WARNING] Odoo API key not found in .env file. Please configure ODOO_API_KEY.")
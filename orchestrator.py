@@ -3,17 +3,38 @@ Bronze Tier - Main Orchestrator
 Coordinates between watchers, Claude, and MCP servers
 """
 import os
-import time
 import json
 import subprocess
 from pathlib import Path
 from datetime import datetime
+from audit_log import get_audit_log
+from dashboard_writer import DashboardWriter
+from vault_index import VaultIndex
+from task_intake import TaskIntake
+from task_queue import get_task_queue
+from worker_pool import ClaudeWorkerPool
+from prompt_templates import get_prompt_template
+from plan_cache import get_plan_cache
 
 class BronzeOrchestrator:
     def __init__(self, vault_path):
         self.vault = Path(vault_path)
         self.setup_directories()
         self.load_config()
+        self.audit_log = get_audit_log(self.vault / 'Logs')
+        self.index = VaultIndex.from_config(self.vault, self.config)
+        self.dashboard_writer = DashboardWriter(
+            self.vault / 'Dashboard.md',
+            debounce=self.config.get('dashboard_debounce', 5)
+        )
+        self.intake = TaskIntake(
+            [self.vault / 'Needs_Action'],
+            reconcile_interval=self.config.get('reconcile_interval', 300),
+            queue=get_task_queue(self.vault, 'bronze', self.config)
+        )
+        self.worker_pool = ClaudeWorkerPool.from_config(self.config)
+        self.plan_cache = get_plan_cache(self.vault, self.config)
+        self.prompt_template = get_prompt_template('Bronze', self.vault)
 
     def setup_directories(self):
         """Ensure all required directories exist"""
@@ -33,31 +54,47 @@ class BronzeOrchestrator:
                 "claude_path": "claude",
                 "check_interval": 60,
                 "max_iterations": 5,
-                "dry_run": True
+                "dry_run": True,
+                "worker_pool": {"max_workers": 4, "task_timeout": 600}
             }
 
     def check_needs_action(self):
-        """Check for new items in Needs_Action"""
-        needs_action = self.vault / 'Needs_Action'
-        items = list(needs_action.glob('*.md'))
-        return items
+        """Return items delivered to Needs_Action since the last check"""
+        return self.intake.get_tasks()
 
     def process_with_claude(self, task_file):
         """Process a task using Claude Code"""
         try:
+            content = task_file.read_text(encoding='utf-8', errors='replace')
+            output = self.vault / 'Plans' / f'plan_{task_file.stem}.md'
+
+            # An identical task (ignoring timestamps and ids) already has a plan: reuse it
+            cache_key = self.plan_cache.key('Bronze', self.prompt_template.version, content)
+            if self.plan_cache.fetch(cache_key, output):
+                print(f"  [PLAN_CACHE] Reused cached plan for {task_file.name}")
+                self.log_action({
+                    'timestamp': datetime.now().isoformat(),
+                    'action': 'claude_processing',
+                    'task': task_file.name,
+                    'success': True,
+                    'output': f'plan_cache hit {cache_key[:12]}'
+                })
+                return True
+
             # Create a prompt for Claude
-            prompt = self.create_claude_prompt(task_file)
+            prompt = self.create_claude_prompt(task_file, content)
 
             # Run Claude Code
             cmd = [
                 self.config['claude_path'],
                 "process-task",
-                "--prompt", prompt,
                 "--vault", str(self.vault),
-                "--output", str(self.vault / 'Plans' / f'plan_{task_file.stem}.md')
+                "--output", str(output)
             ]
 
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            # The prompt goes in on stdin: a large email would overflow the argv limit
+            result = subprocess.run(cmd, input=prompt, capture_output=True, text=True,
+                                    timeout=self.worker_pool.task_timeout)
 
             # Log the result
             self.log_action({
@@ -68,59 +105,27 @@ class BronzeOrchestrator:
                 'output': result.stdout[:500]  # First 500 chars
             })
 
+            if result.returncode == 0:
+                self.plan_cache.store(cache_key, output)
             return result.returncode == 0
 
+        except subprocess.TimeoutExpired:
+            self.log_error(f"Claude processing timed out after {self.worker_pool.task_timeout}s: {task_file.name}")
+            return False
         except Exception as e:
             self.log_error(f"Claude processing failed: {e}")
             return False
 
-    def create_claude_prompt(self, task_file):
-        """Create prompt for Claude based on task file"""
-        content = task_file.read_text()
-
-        prompt = f"""You are my AI Employee (Bronze Tier). Process this task:
-
-{content}
-
-## Instructions:
-1. Read the task carefully
-2. Create a step-by-step plan in /Plans/ folder
-3. If action is needed, create approval request in /Pending_Approval/
-4. Update Dashboard.md with status
-5. Use appropriate skills if needed
-
-## Available Skills (from C:\\Users\\manal\\OneDrive\\Desktop\\Hacakthon 0\\.claude\\skills):
-- file_processor: Read/write files
-- text_analyzer: Analyze text content
-- task_planner: Create task plans
-- email_drafter: Draft email responses
-- data_extractor: Extract data from files
-
-## Rules from Company_Handbook.md:
-- Always be professional
-- Flag payments over $500
-- Get approval for external communications
-
-Create a detailed plan now."""
-        return prompt
+    def create_claude_prompt(self, task_file, content=None):
+        """Create prompt for Claude from the Bronze template and the task file"""
+        if content is None:
+            content = task_file.read_text(encoding='utf-8', errors='replace')
+        # Instructions, skills and the handbook are pre-rendered; only the task is filled in
+        return self.prompt_template.render(content=content)
 
     def log_action(self, data):
-        """Log actions to JSON log file"""
-        log_dir = self.vault / 'Logs'
-        today = datetime.now().strftime('%Y-%m-%d')
-        log_file = log_dir / f'{today}.json'
-
-        # Read existing logs or create new
-        if log_file.exists():
-            with open(log_file, 'r') as f:
-                logs = json.load(f)
-        else:
-            logs = []
-
-        logs.append(data)
-
-        with open(log_file, 'w') as f:
-            json.dump(logs, f, indent=2)
+        """Append an action to the JSON Lines audit log"""
+        self.audit_log.append(data)
 
     def log_error(self, message):
         """Log error messages"""
@@ -130,15 +135,28 @@ Create a detailed plan now."""
             f.write(f"[{timestamp}] ERROR: {message}\n")
 
     def update_dashboard(self):
-        """Update the main dashboard"""
-        dashboard = self.vault / 'Dashboard.md'
-
+        """Update the main dashboard when its contents change"""
         # Count tasks
-        needs_action = len(list((self.vault / 'Needs_Action').glob('*.md')))
-        pending = len(list((self.vault / 'Pending_Approval').glob('*.md')))
-        done = len(list((self.vault / 'Done').glob('*.md')))
-
-        content = f"""---
+        needs_action = self.index.count('Needs_Action')
+        pending = self.index.count('Pending_Approval')
+        done = self.index.count('Done')
+
+        # Everything shown on the dashboard except the timestamp
+        inputs = {
+            'needs_action': needs_action,
+            'pending': pending,
+            'done': done,
+            'recent_activities': self.get_recent_activities()
+        }
+        self.dashboard_writer.update(inputs, self.render_dashboard)
+
+    def render_dashboard(self, inputs):
+        """Render Dashboard.md from the dashboard inputs"""
+        needs_action = inputs['needs_action']
+        pending = inputs['pending']
+        done = inputs['done']
+
+        return f"""---
 type: dashboard
 last_updated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 status: active
@@ -158,7 +176,7 @@ status: active
 - **Completed Tasks**: {done}
 
 ## Recent Activities
-{self.get_recent_activities()}
+{inputs['recent_activities']}
 
 ## Quick Stats
 - Tasks Processed: {done}
@@ -168,20 +186,13 @@ status: active
 ---
 *Last updated automatically by AI Employee*
 """
-        dashboard.write_text(content)
 
     def get_recent_activities(self):
         """Get recent activities from logs"""
         try:
-            today = datetime.now().strftime('%Y-%m-%d')
-            log_file = self.vault / 'Logs' / f'{today}.json'
-
-            if log_file.exists():
-                with open(log_file, 'r') as f:
-                    logs = json.load(f)
-
-                # Get last 5 activities
-                recent = logs[-5:] if len(logs) > 5 else logs
+            # Get last 5 activities
+            recent = self.audit_log.tail(5)
+            if recent:
                 activities = []
 
                 for log in recent:
@@ -211,6 +222,7 @@ status: active
         print("=" * 50)
 
         self._start_time = datetime.now()
+        self.intake.start()
 
         try:
             while True:
@@ -222,25 +234,36 @@ status: active
 
                     for task in tasks:
                         print(f"  Processing: {task.name}")
-                        success = self.process_with_claude(task)
 
+                    # Run Claude concurrently; results come back in submission order
+                    results = self.worker_pool.map(self.process_with_claude, tasks)
+                    for task, success in results:
                         if success:
                             # Move to Done folder
                             done_file = self.vault / 'Done' / task.name
-                            task.rename(done_file)
+                            self.index.move(task, done_file)
+                            self.intake.ack(task)
                             print(f"  [CHECK] Moved to Done: {task.name}")
+                        else:
+                            # Leave it in Needs_Action and retry on the next reconcile
+                            self.intake.release(task)
 
                 # Update dashboard
                 self.update_dashboard()
 
-                # Wait before next check
-                time.sleep(self.config['check_interval'])
+                # Wait for the next task or the check interval, whichever comes first
+                self.intake.wait(self.config['check_interval'])
 
         except KeyboardInterrupt:
             print("\n[STOP SIGN] Orchestrator stopped by user")
         except Exception as e:
             print(f"[CROSS MARK] Error in orchestrator: {e}")
             self.log_error(f"Orchestrator crashed: {e}")
+        finally:
+            self.intake.stop()
+            self.worker_pool.shutdown()
+            print(f"[PLAN_CACHE] {self.plan_cache.stats()}")
+            self.dashboard_writer.flush()
 
 if __name__ == "__main__":
     VAULT_PATH = "C:/Users/manal/OneDrive/Desktop/Hacakthon 0/AI_Employee_Vault"
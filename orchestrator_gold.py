@@ -3,17 +3,38 @@ Gold Tier - Main Orchestrator
 Coordinates between multiple watchers, Claude, and multiple MCP servers
 """
 import os
-import time
 import json
 import subprocess
 from pathlib import Path
 from datetime import datetime, timedelta
+from audit_log import get_audit_log
+from dashboard_writer import DashboardWriter
+from vault_index import VaultIndex
+from task_intake import TaskIntake
+from task_queue import get_task_queue
+from worker_pool import ClaudeWorkerPool
+from prompt_templates import get_prompt_template
+from plan_cache import get_plan_cache
 
 class GoldOrchestrator:
     def __init__(self, vault_path):
         self.vault = Path(vault_path)
         self.setup_directories()
         self.load_config()
+        self.audit_log = get_audit_log(self.vault / 'Logs')
+        self.index = VaultIndex.from_config(self.vault, self.config)
+        self.dashboard_writer = DashboardWriter(
+            self.vault / 'Dashboard.md',
+            debounce=self.config.get('dashboard_debounce', 5)
+        )
+        self.intake = TaskIntake(
+            self.get_watcher_dirs(),
+            reconcile_interval=self.config.get('reconcile_interval', 300),
+            queue=get_task_queue(self.vault, 'gold', self.config)
+        )
+        self.worker_pool = ClaudeWorkerPool.from_config(self.config)
+        self.plan_cache = get_plan_cache(self.vault, self.config)
+        self.prompt_template = get_prompt_template('Gold', self.vault)
         self.iteration_count = 0
         self.max_iterations = 20  # As per Gold Tier requirements
 
@@ -36,12 +57,13 @@ class GoldOrchestrator:
                 "check_interval": 30,
                 "max_iterations": 20,
                 "tier": "gold",
-                "dry_run": True
+                "dry_run": True,
+                "worker_pool": {"max_workers": 4, "task_timeout": 600}
             }
 
-    def check_all_watchers(self):
-        """Check all watcher directories for new items"""
-        watcher_dirs = [
+    def get_watcher_dirs(self):
+        """Directories the task intake watches for new items"""
+        return [
             self.vault / 'Watchers' / 'Gmail',
             self.vault / 'Watchers' / 'WhatsApp', 
             self.vault / 'Watchers' / 'LinkedIn',
@@ -49,37 +71,51 @@ class GoldOrchestrator:
             self.vault / 'Watchers' / 'Instagram',
             self.vault / 'Watchers' / 'Twitter',
             self.vault / 'Watchers' / 'File_System',
-            self.vault / 'Drop_Folder'
+            self.vault / 'Drop_Folder',
+            # Also check Needs_Action for any items that need processing
+            self.vault / 'Needs_Action'
         ]
-        
-        all_items = []
-        for watcher_dir in watcher_dirs:
-            if watcher_dir.exists():
-                items = list(watcher_dir.glob('*.md'))
-                all_items.extend(items)
-        
-        # Also check Needs_Action for any items that need processing
-        needs_action_items = list((self.vault / 'Needs_Action').glob('*.md'))
-        all_items.extend(needs_action_items)
-        
-        return all_items
+
+    def check_all_watchers(self):
+        """Return new items delivered from all watcher directories"""
+        return self.intake.get_tasks()
 
     def process_with_claude(self, task_file):
         """Process a task using Claude Code"""
         try:
+            content = task_file.read_text(encoding='utf-8', errors='replace')
+            output = self.vault / 'Plans' / f'plan_{task_file.stem}.md'
+
+            # An identical task (ignoring timestamps and ids) already has a plan: reuse it
+            cache_key = self.plan_cache.key(f'Gold/{task_file.parent.name}', self.prompt_template.version, content)
+            if self.plan_cache.fetch(cache_key, output):
+                print(f"  [PLAN_CACHE] Reused cached plan for {task_file.name}")
+                self.log_action({
+                    'timestamp': datetime.now().isoformat(),
+                    'action_type': 'claude_processing',
+                    'actor': 'claude-gold',
+                    'target': task_file.name,
+                    'parameters': {'task_type': task_file.parent.name, 'plan_cache': cache_key[:12]},
+                    'approval_status': 'not_required_yet',
+                    'result': 'success',
+                    'error': None
+                })
+                return True
+
             # Create a prompt for Claude
-            prompt = self.create_claude_prompt(task_file)
+            prompt = self.create_claude_prompt(task_file, content)
 
             # Run Claude Code
             cmd = [
                 self.config['claude_path'],
                 "process-task",
-                "--prompt", prompt,
                 "--vault", str(self.vault),
-                "--output", str(self.vault / 'Plans' / f'plan_{task_file.stem}.md')
+                "--output", str(output)
             ]
 
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            # The prompt goes in on stdin: a large email would overflow the argv limit
+            result = subprocess.run(cmd, input=prompt, capture_output=True, text=True,
+                                    timeout=self.worker_pool.task_timeout)
 
             # Log the result
             self.log_action({
@@ -93,76 +129,27 @@ class GoldOrchestrator:
                 'error': result.stderr if result.returncode != 0 else None
             })
 
+            if result.returncode == 0:
+                self.plan_cache.store(cache_key, output)
             return result.returncode == 0
 
+        except subprocess.TimeoutExpired:
+            self.log_error(f"Claude processing timed out after {self.worker_pool.task_timeout}s: {task_file.name}")
+            return False
         except Exception as e:
             self.log_error(f"Claude processing failed: {e}")
             return False
 
-    def create_claude_prompt(self, task_file):
-        """Create prompt for Claude based on task file"""
-        content = task_file.read_text()
-
-        prompt = f"""You are my AI Employee (Gold Tier). Process this task from {task_file.parent.name}:
-
-{content}
-
-## Instructions:
-1. Read the task carefully
-2. Cross-reference with Business_Goals.md and past tasks
-3. Create a step-by-step plan in /Plans/ folder
-4. If action is needed, create approval request in /Pending_Approval/
-5. For Odoo actions (invoices, payments, etc.): Draft payload → approval → MCP execution
-6. For social media (FB, IG, X/Twitter): Draft content → approval → MCP posting
-7. Update Dashboard.md with status
-8. Use appropriate skills if needed
-
-## Available Skills (from C:\\Users\\manal\\OneDrive\\Desktop\\Hacakthon 0\\.claude\\skills):
-- file_processor: Read/write files
-- text_analyzer: Analyze text content
-- task_planner: Create task plans
-- email_drafter: Draft email responses
-- data_extractor: Extract data from files
-- linkedin-poster: Create LinkedIn posts
-- gmail-watcher: Monitor Gmail
-- whatsapp-watcher: Handle WhatsApp messages
-- odoo-invoice-creator: Create invoices in Odoo
-- ceo-briefing-generator: Generate CEO briefings
-- social-poster-meta: Post to Facebook/Instagram
-- social-poster-x: Post to Twitter/X
-- social-summarizer: Generate social media summaries
-- error-handler: Handle errors gracefully
-- audit-logger: Log all actions
-
-## Rules from Company_Handbook.md:
-- Always be professional
-- Get approval for external communications
-- Follow multi-channel processing guidelines
-- For business promotion, create LinkedIn posts
-- For payments over $250, require approval
-- For Odoo entries over $500, require approval
-- Proactively identify business opportunities
-
-Create a detailed plan now."""
-        return prompt
+    def create_claude_prompt(self, task_file, content=None):
+        """Create prompt for Claude from the Gold template and the task file"""
+        if content is None:
+            content = task_file.read_text(encoding='utf-8', errors='replace')
+        # Instructions, skills and the handbook are pre-rendered; only the task is filled in
+        return self.prompt_template.render(content=content, task_type=task_file.parent.name)
 
     def log_action(self, data):
-        """Log actions to JSON log file"""
-        log_dir = self.vault / 'Logs'
-        today = datetime.now().strftime('%Y-%m-%d')
-        log_file = log_dir / f'{today}.json'
-
-        # Read existing logs or create new
-        if log_file.exists():
-            with open(log_file, 'r') as f:
-                logs = json.load(f)
-        else:
-            logs = []
-
-        logs.append(data)
-
-        with open(log_file, 'w') as f:
-            json.dump(logs, f, indent=2)
+        """Append an action to the JSON Lines audit log"""
+        self.audit_log.append(data)
 
     def log_error(self, message):
         """Log error messages"""
@@ -172,24 +159,51 @@ Create a detailed plan now."""
             f.write(f"[{timestamp}] ERROR: {message}\n")
 
     def update_dashboard(self):
-        """Update the main dashboard"""
-        dashboard = self.vault / 'Dashboard.md'
-
+        """Update the main dashboard when its contents change"""
         # Count tasks
-        needs_action = len(list((self.vault / 'Needs_Action').glob('*.md')))
-        pending = len(list((self.vault / 'Pending_Approval').glob('*.md')))
-        done = len(list((self.vault / 'Done').glob('*.md')))
+        needs_action = self.index.count('Needs_Action')
+        pending = self.index.count('Pending_Approval')
+        done = self.index.count('Done')
 
         # Check watcher statuses
-        gmail_count = len(list((self.vault / 'Watchers' / 'Gmail').glob('*.md'))) if (self.vault / 'Watchers' / 'Gmail').exists() else 0
-        whatsapp_count = len(list((self.vault / 'Watchers' / 'WhatsApp').glob('*.md'))) if (self.vault / 'Watchers' / 'WhatsApp').exists() else 0
-        linkedin_count = len(list((self.vault / 'Watchers' / 'LinkedIn').glob('*.md'))) if (self.vault / 'Watchers' / 'LinkedIn').exists() else 0
-        facebook_count = len(list((self.vault / 'Watchers' / 'Facebook').glob('*.md'))) if (self.vault / 'Watchers' / 'Facebook').exists() else 0
-        instagram_count = len(list((self.vault / 'Watchers' / 'Instagram').glob('*.md'))) if (self.vault / 'Watchers' / 'Instagram').exists() else 0
-        twitter_count = len(list((self.vault / 'Watchers' / 'Twitter').glob('*.md'))) if (self.vault / 'Watchers' / 'Twitter').exists() else 0
-        file_count = len(list((self.vault / 'Watchers' / 'File_System').glob('*.md'))) if (self.vault / 'Watchers' / 'File_System').exists() else 0
-
-        content = f"""---
+        gmail_count = self.index.count('Watchers/Gmail')
+        whatsapp_count = self.index.count('Watchers/WhatsApp')
+        linkedin_count = self.index.count('Watchers/LinkedIn')
+        facebook_count = self.index.count('Watchers/Facebook')
+        instagram_count = self.index.count('Watchers/Instagram')
+        twitter_count = self.index.count('Watchers/Twitter')
+        file_count = self.index.count('Watchers/File_System')
+
+        # Everything shown on the dashboard except the timestamp
+        inputs = {
+            'needs_action': needs_action,
+            'pending': pending,
+            'done': done,
+            'gmail_count': gmail_count,
+            'whatsapp_count': whatsapp_count,
+            'linkedin_count': linkedin_count,
+            'facebook_count': facebook_count,
+            'instagram_count': instagram_count,
+            'twitter_count': twitter_count,
+            'file_count': file_count,
+            'recent_activities': self.get_recent_activities()
+        }
+        self.dashboard_writer.update(inputs, self.render_dashboard)
+
+    def render_dashboard(self, inputs):
+        """Render Dashboard.md from the dashboard inputs"""
+        needs_action = inputs['needs_action']
+        pending = inputs['pending']
+        done = inputs['done']
+        gmail_count = inputs['gmail_count']
+        whatsapp_count = inputs['whatsapp_count']
+        linkedin_count = inputs['linkedin_count']
+        facebook_count = inputs['facebook_count']
+        instagram_count = inputs['instagram_count']
+        twitter_count = inputs['twitter_count']
+        file_count = inputs['file_count']
+
+        return f"""---
 type: dashboard
 last_updated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 status: active
@@ -226,7 +240,7 @@ status: active
 - **File Drops**: {file_count}
 
 ## Recent Activities
-{self.get_recent_activities()}
+{inputs['recent_activities']}
 
 ## Pending Items
 - {pending} item(s) in Pending Approval
@@ -253,20 +267,13 @@ Gold Tier active – Odoo integrated, social channels monitoring, weekly briefin
 ---
 *Last updated automatically by AI Employee*
 """
-        dashboard.write_text(content)
 
     def get_recent_activities(self):
         """Get recent activities from logs"""
         try:
-            today = datetime.now().strftime('%Y-%m-%d')
-            log_file = self.vault / 'Logs' / f'{today}.json'
-
-            if log_file.exists():
-                with open(log_file, 'r') as f:
-                    logs = json.load(f)
-
-                # Get last 5 activities
-                recent = logs[-5:] if len(logs) > 5 else logs
+            # Get last 5 activities
+            recent = self.audit_log.tail(5)
+            if recent:
                 activities = []
 
                 for log in recent:
@@ -369,6 +376,61 @@ This week, the AI Employee system processed multiple client inquiries and manage
             'result': 'success'
         })
 
+    def start(self):
+        """Start watching for tasks"""
+        self._start_time = datetime.now()
+        self.intake.start()
+
+    def run_iteration(self):
+        """Process whatever tasks are waiting; returns False once max_iterations is reached"""
+        if self.iteration_count >= self.max_iterations:
+            return False
+
+        # Check if it's time for weekly briefing
+        self.check_weekly_briefing_schedule()
+        
+        # Check for new tasks from all watchers
+        tasks = self.check_all_watchers()
+
+        if tasks:
+            print(f"[CLIPBOARD] Found {len(tasks)} task(s) to process")
+
+            for task in tasks:
+                print(f"  Processing: {task.name}")
+
+            # Run Claude concurrently; results come back in submission order
+            results = self.worker_pool.map(self.process_with_claude, tasks)
+            for task, success in results:
+                if success:
+                    # Move to Needs_Action folder for further processing if not already there
+                    if task.parent.name not in ['Needs_Action', 'Done', 'Approved', 'Rejected', 'Pending_Approval']:
+                        needs_action_file = self.vault / 'Needs_Action' / task.name
+                        self.intake.expect(needs_action_file)
+                        self.index.move(task, needs_action_file)
+                        print(f"  [CHECK] Moved to Needs_Action: {task.name}")
+                    self.intake.ack(task)
+                else:
+                    # Leave it where it is and retry on the next reconcile
+                    self.intake.release(task)
+
+        # Update dashboard
+        self.update_dashboard()
+        
+        # Increment iteration counter
+        self.iteration_count += 1
+        return self.iteration_count < self.max_iterations
+
+    def wait(self, timeout=None):
+        """Block until the next task arrives or the check interval passes"""
+        return self.intake.wait(self.config['check_interval'] if timeout is None else timeout)
+
+    def close(self):
+        """Stop watching and flush pending work"""
+        self.intake.stop()
+        self.worker_pool.shutdown()
+        print(f"[PLAN_CACHE] {self.plan_cache.stats()}")
+        self.dashboard_writer.flush()
+
     def run(self):
         """Main orchestration loop"""
         print("[ROCKET] Starting Gold Tier Orchestrator")
@@ -377,38 +439,12 @@ This week, the AI Employee system processed multiple client inquiries and manage
         print("[ITERATION] Max iterations: 20")
         print("=" * 50)
 
-        self._start_time = datetime.now()
+        self.start()
 
         try:
-            while self.iteration_count < self.max_iterations:
-                # Check if it's time for weekly briefing
-                self.check_weekly_briefing_schedule()
-                
-                # Check for new tasks from all watchers
-                tasks = self.check_all_watchers()
-
-                if tasks:
-                    print(f"[CLIPBOARD] Found {len(tasks)} task(s) to process")
-
-                    for task in tasks:
-                        print(f"  Processing: {task.name}")
-                        success = self.process_with_claude(task)
-
-                        if success:
-                            # Move to Needs_Action folder for further processing if not already there
-                            if task.parent.name not in ['Needs_Action', 'Done', 'Approved', 'Rejected', 'Pending_Approval']:
-                                needs_action_file = self.vault / 'Needs_Action' / task.name
-                                task.rename(needs_action_file)
-                                print(f"  [CHECK] Moved to Needs_Action: {task.name}")
-
-                # Update dashboard
-                self.update_dashboard()
-                
-                # Increment iteration counter
-                self.iteration_count += 1
-                
-                # Wait before next check
-                time.sleep(self.config['check_interval'])
+            while self.run_iteration():
+                # Wait for the next task or the check interval, whichever comes first
+                self.wait()
 
             print(f"[ITERATION] Max iterations ({self.max_iterations}) reached. Exiting normally.")
             print("<promise>TASK_COMPLETE</promise>")
@@ -418,6 +454,8 @@ This week, the AI Employee system processed multiple client inquiries and manage
         except Exception as e:
             print(f"[CROSS MARK] Error in orchestrator: {e}")
             self.log_error(f"Orchestrator crashed: {e}")
+        finally:
+            self.close()
 
 if __name__ == "__main__":
     VAULT_PATH = "C:/Users/manal/OneDrive/Desktop/Hacakthon 0/AI_Employee_Vault_Gold"
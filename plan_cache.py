@@ -0,0 +1,217 @@
+"""
+Shared - Plan Cache
+Content-addressed cache of Claude plan files so identical tasks reuse an earlier plan
+"""
+import os
+import re
+import time
+import shutil
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+
+DEFAULT_TTL = 7 * 24 * 3600  # Seconds a cached plan may be reused
+DEFAULT_MAX_ENTRIES = 2000
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Frontmatter keys and "- **Field**: value" bullets that differ between copies of the same item
+VOLATILE_FIELDS = {'received', 'detected', 'date', 'time', 'timestamp', 'created', 'generated',
+                   'generated_at', 'id', 'task_id', 'message_id', 'uid', 'status', 'source_path'}
+
+_FRONTMATTER_KEY_RE = re.compile(r'^([A-Za-z_][\w-]*)\s*:')
+_FIELD_RE = re.compile(r'^\s*[-*]\s+\*\*([^:*\n]{1,40})\*\*\s*:')
+_VOLATILE_VALUE_RES = (
+    # RFC 2822 mail dates, ISO timestamps and dates, clock times
+    re.compile(r'\b(?:Mon|Tue|Wed|Thu|Fri|Sat|Sun),\s+\d{1,2}\s+\w{3}\s+\d{4}\s+[\d:]+(?:\s+[+-]\d{4})?'),
+    re.compile(r'\b\d{4}-\d{2}-\d{2}(?:[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?(?:Z|[+-]\d{2}:?\d{2})?)?'),
+    re.compile(r'\b\d{1,2}:\d{2}(?::\d{2})?\b'),
+    # Message-IDs, long hex ids and long numeric ids
+    re.compile(r'<[^<>@\s]+@[^<>\s]+>'),
+    re.compile(r'\b[0-9a-f]{12,}\b', re.IGNORECASE),
+    re.compile(r'\b\d{9,}\b'),
+)
+_SPACE_RE = re.compile(r'\s+')
+
+
+def normalize_task(text):
+    """Task text with timestamps, ids and whitespace differences removed"""
+    lines = []
+    in_frontmatter = text.startswith('---')
+    for position, line in enumerate(text.splitlines()):
+        if in_frontmatter and position > 0 and line.strip() == '---':
+            in_frontmatter = False
+        match = (_FRONTMATTER_KEY_RE if in_frontmatter else _FIELD_RE).match(line)
+        if match and match.group(1).strip().lower().replace(' ', '_') in VOLATILE_FIELDS:
+            continue
+        lines.append(line)
+    normalized = '\n'.join(lines)
+    for pattern in _VOLATILE_VALUE_RES:
+        normalized = pattern.sub('#', normalized)
+    return _SPACE_RE.sub(' ', normalized).strip()
+
+
+class PlanCache:
+    """Plans produced by Claude, stored under a hash of the task that produced them.
+
+    The key covers the tier, the prompt template version (so editing a
+    template or the handbook invalidates old plans) and the normalized task
+    text, so a newsletter or a re-dropped file that only differs in its
+    timestamps and ids maps to the same entry. A hit copies the stored plan
+    to the new task's output path instead of running Claude. Entries expire
+    after `ttl` seconds, and the least recently used ones are evicted beyond
+    max_entries or max_bytes. Only the plan file is reproduced; set
+    plan_cache.enabled to false where every task must run Claude for its
+    other side effects (approval requests).
+    """
+
+    def __init__(self, cache_dir, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES,
+                 max_bytes=DEFAULT_MAX_BYTES, enabled=True):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.metrics = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+        self._lock = threading.Lock()
+        self.db = sqlite3.connect(str(self.cache_dir / 'index.sqlite3'), timeout=30, check_same_thread=False)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS plans (
+                key TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                used_at REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        self.db.commit()
+
+    @classmethod
+    def from_config(cls, cache_dir, config):
+        """Build a cache from the optional `plan_cache` section of system_config.json"""
+        cache_config = config.get('plan_cache', {})
+        return cls(
+            cache_dir,
+            ttl=cache_config.get('ttl', DEFAULT_TTL),
+            max_entries=cache_config.get('max_entries', DEFAULT_MAX_ENTRIES),
+            max_bytes=cache_config.get('max_bytes', DEFAULT_MAX_BYTES),
+            enabled=cache_config.get('enabled', True)
+        )
+
+    @staticmethod
+    def key(tier, template_version, content):
+        """Cache key of a task for one tier and prompt template version"""
+        digest = hashlib.sha256()
+        for part in (tier, template_version, normalize_task(content)):
+            digest.update(str(part).encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def _blob(self, key):
+        return self.cache_dir / key[:2] / f'{key}.md'
+
+    def _count(self, metric):
+        with self._lock:
+            self.metrics[metric] += 1
+
+    def fetch(self, key, destination):
+        """Copy a cached plan to `destination`; returns False on a miss"""
+        if not self.enabled:
+            return False
+        now = time.time()
+        with self._lock:
+            row = self.db.execute('SELECT created FROM plans WHERE key = ?', (key,)).fetchone()
+        if row is None or now - row[0] > self.ttl:
+            self._count('misses')
+            return False
+        destination = Path(destination)
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            shutil.copyfile(self._blob(key), destination)
+        except FileNotFoundError:
+            self._forget([key])
+            self._count('misses')
+            return False
+        with self._lock:
+            self.db.execute('UPDATE plans SET used_at = ?, hits = hits + 1 WHERE key = ?', (now, key))
+            self.db.commit()
+        self._count('hits')
+        return True
+
+    def store(self, key, plan_path):
+        """Keep a freshly written plan under `key`; returns False if there is no plan to keep"""
+        if not self.enabled:
+            return False
+        blob = self._blob(key)
+        blob.parent.mkdir(exist_ok=True)
+        temp = blob.with_name(f'.{blob.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+        try:
+            shutil.copyfile(plan_path, temp)
+        except FileNotFoundError:
+            return False
+        os.replace(temp, blob)
+        now = time.time()
+        with self._lock:
+            self.db.execute('INSERT OR REPLACE INTO plans VALUES (?, ?, ?, ?, 0)',
+                            (key, blob.stat().st_size, now, now))
+            self.db.commit()
+        self._count('stores')
+        self.evict()
+        return True
+
+    def _forget(self, keys):
+        """Delete entries and their plan files"""
+        with self._lock:
+            self.db.executemany('DELETE FROM plans WHERE key = ?', [(key,) for key in keys])
+            self.db.commit()
+        for key in keys:
+            self._blob(key).unlink(missing_ok=True)
+
+    def evict(self):
+        """Drop expired entries, then least recently used ones beyond the size limits"""
+        with self._lock:
+            expired = [key for key, in self.db.execute('SELECT key FROM plans WHERE created < ?',
+                                                        (time.time() - self.ttl,))]
+            rows = self.db.execute('SELECT key, size FROM plans WHERE created >= ? ORDER BY used_at DESC',
+                                   (time.time() - self.ttl,)).fetchall()
+        excess = []
+        total = 0
+        for count, (key, size) in enumerate(rows, 1):
+            total += size
+            if count > self.max_entries or total > self.max_bytes:
+                excess.append(key)
+        evicted = expired + excess
+        if evicted:
+            self._forget(evicted)
+            with self._lock:
+                self.metrics['evictions'] += len(evicted)
+        return len(evicted)
+
+    def stats(self):
+        """Hit/miss/store/eviction counts for this process plus the current cache size"""
+        with self._lock:
+            entries, size = self.db.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM plans').fetchone()
+            stats = dict(self.metrics, entries=entries, bytes=size)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 3) if lookups else None
+        return stats
+
+    def close(self):
+        with self._lock:
+            self.db.close()
+
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def get_plan_cache(vault_path, config=None):
+    """Return the shared PlanCache kept in a vault's .cache/plans folder"""
+    cache_dir = (Path(vault_path) / '.cache' / 'plans').resolve()
+    with _registry_lock:
+        if cache_dir not in _registry:
+            _registry[cache_dir] = PlanCache.from_config(cache_dir, config or {})
+        return _registry[cache_dir]
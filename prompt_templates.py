@@ -0,0 +1,117 @@
+"""
+Shared - Prompt Templates
+Claude task prompts compiled from prompts/<Tier>/ templates and the vault's Company_Handbook.md
+"""
+import os
+import re
+import time
+import hashlib
+import threading
+from pathlib import Path
+
+PROMPTS_DIR = Path(__file__).resolve().parent / 'prompts'
+DEFAULT_CHECK_INTERVAL = 2  # Seconds between checks of the template and handbook for edits
+
+_PLACEHOLDER_RE = re.compile(r'\{\{\s*(\w+)\s*\}\}')
+
+# Template files are Markdown with {{placeholders}}. {{handbook}} is replaced by
+# the vault's Company_Handbook.md when the template is compiled; every other
+# placeholder ({{content}}, {{task_type}}, ...) is filled in per task.
+
+
+def _signature(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+class PromptTemplate:
+    """One prompt template, compiled once and recompiled when its sources change.
+
+    Compiling substitutes the static parts (the handbook) and splits the
+    text into literal segments and per-task fields, so render() only joins
+    strings. The template and handbook are re-checked at most every
+    `check_interval` seconds; an edit to either is picked up without a
+    restart.
+    """
+
+    def __init__(self, template_path, handbook_path=None, check_interval=DEFAULT_CHECK_INTERVAL):
+        self.template_path = Path(template_path)
+        self.handbook_path = Path(handbook_path) if handbook_path else None
+        self.check_interval = check_interval
+        self._segments = None
+        self._version = None
+        self._signatures = None
+        self._checked_at = 0
+        self._lock = threading.Lock()
+
+    def _sources(self):
+        return (_signature(self.template_path),
+                _signature(self.handbook_path) if self.handbook_path else None)
+
+    def _compile(self):
+        """Split the template into literal strings and (field,) placeholders"""
+        text = self.template_path.read_text(encoding='utf-8')
+        handbook = ''
+        if self.handbook_path is not None and self.handbook_path.exists():
+            handbook = self.handbook_path.read_text(encoding='utf-8').strip()
+
+        segments = []
+        literal = []
+        for position, part in enumerate(_PLACEHOLDER_RE.split(text)):
+            if position % 2 == 0:
+                literal.append(part)
+            elif part == 'handbook':
+                literal.append(handbook)
+            else:
+                segments.append(''.join(literal))
+                segments.append((part,))
+                literal = []
+        segments.append(''.join(literal))
+        return segments
+
+    def segments(self):
+        """The compiled template, recompiled first if a source changed"""
+        now = time.monotonic()
+        if self._segments is not None and now - self._checked_at < self.check_interval:
+            return self._segments
+        with self._lock:
+            if self._segments is None or now - self._checked_at >= self.check_interval:
+                signatures = self._sources()
+                if signatures != self._signatures:
+                    reloading = self._segments is not None
+                    self._segments = self._compile()
+                    self._version = hashlib.sha256(repr(self._segments).encode('utf-8')).hexdigest()[:16]
+                    self._signatures = signatures
+                    if reloading:
+                        print(f"[PROMPTS] Reloaded {self.template_path.parent.name}/{self.template_path.name}")
+                self._checked_at = now
+            return self._segments
+
+    @property
+    def version(self):
+        """Short hash of the compiled template; changes whenever the template or handbook does"""
+        self.segments()
+        return self._version
+
+    def render(self, **fields):
+        """Assemble a prompt from the compiled segments and this task's fields"""
+        return ''.join(segment if isinstance(segment, str) else str(fields[segment[0]])
+                       for segment in self.segments())
+
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def get_prompt_template(tier, vault_path, name='task'):
+    """Return the shared template prompts/<tier>/<name>.md using the vault's Company_Handbook.md"""
+    template_path = PROMPTS_DIR / tier / f'{name}.md'
+    handbook_path = (Path(vault_path) / 'Company_Handbook.md').resolve()
+    key = (template_path, handbook_path)
+    with _registry_lock:
+        if key not in _registry:
+            _registry[key] = PromptTemplate(template_path, handbook_path)
+        return _registry[key]
@@ -0,0 +1,58 @@
+"""
+Shared - Rate Limiter
+Thread-safe token bucket used to pace calls to external APIs
+"""
+import time
+import threading
+
+
+class TokenBucket:
+    """Allows `rate` operations per second on average with bursts of up to `capacity`.
+
+    acquire() blocks until a token is available, so callers simply wrap each
+    outgoing request with it. The bucket starts full.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens=1):
+        """Take tokens if they are available right now"""
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def acquire(self, tokens=1, timeout=None):
+        """Block until tokens are available; returns False if `timeout` expires first"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return True
+                wait = (tokens - self._tokens) / self.rate
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+
+    def penalize(self, seconds):
+        """Drain the bucket so no token is handed out for `seconds` (e.g. after a 429)"""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self._tokens, 1.0 - seconds * self.rate)
@@ -0,0 +1,186 @@
+"""
+Shared - Runtime
+Asyncio host that runs watchers, MCP servers and the scheduler as cooperative tasks in one process
+"""
+import sys
+import asyncio
+import threading
+from pathlib import Path
+
+DEFAULT_INTERVAL = 30  # Seconds between steps of a component without a wait hook
+DEFAULT_ERROR_DELAY = 10  # Seconds before retrying a component whose step raised
+BASE_DIR = Path(__file__).resolve().parent
+
+
+class Service:
+    """The blocking hooks of one in-process component.
+
+    step() does one pass of the component's work (check the inbox, drain
+    approvals, run pending jobs); returning False ends the component.
+    wait(timeout) blocks until there is new work or the timeout passes;
+    without it the runtime sleeps `interval` seconds between steps. close()
+    releases connections when the runtime stops. A service without step()
+    did its work in the factory (e.g. registered an approval handler that
+    another service drives); if it has close(), it stays open until then.
+    """
+
+    def __init__(self, step=None, wait=None, close=None, interval=None):
+        self.step = step
+        self.wait = wait
+        self.close = close
+        self.interval = interval
+
+
+class Component:
+    """A component the runtime hosts, either in-process or in its own process.
+
+    In-process components are built by factory(), which reads configuration,
+    opens connections and returns a Service (or None to skip a component
+    that is not configured). Isolated components run `script` with the
+    current interpreter instead, exactly as start_gold_tier used to.
+    """
+
+    def __init__(self, name, factory=None, script=None, interval=DEFAULT_INTERVAL, isolated=False):
+        if factory is None and script is None:
+            raise ValueError(f"Component {name} needs a factory or a script")
+        self.name = name
+        self.factory = factory
+        self.script = script
+        self.interval = interval
+        self.isolated = isolated or factory is None
+
+
+def _settle(future, result, error):
+    """Complete a future from the event loop thread unless it was cancelled"""
+    if future.cancelled():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+async def run_blocking(function, *args, name=None):
+    """Await a blocking call made on a daemon thread.
+
+    Unlike asyncio.to_thread, a call still blocked in IMAP IDLE or a queue
+    wait never holds up interpreter shutdown.
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def target():
+        try:
+            result, error = function(*args), None
+        except BaseException as e:
+            result, error = None, e
+        try:
+            loop.call_soon_threadsafe(_settle, future, result, error)
+        except RuntimeError:
+            pass  # The loop already closed; nobody is waiting for this result
+
+    threading.Thread(target=target, name=name, daemon=True).start()
+    return await future
+
+
+class Runtime:
+    """Runs a set of components as asyncio tasks in one process.
+
+    Each in-process component becomes a task that alternates its step and
+    wait hooks, both executed on short-lived daemon threads so the existing
+    blocking module code runs unchanged while sharing one interpreter, one
+    set of imports and the process-wide registries (approval dispatcher,
+    dedup store, HTTP pools). Isolated components are launched as child
+    processes from the same loop.
+    """
+
+    def __init__(self, components, error_delay=DEFAULT_ERROR_DELAY):
+        self.components = list(components)
+        self.error_delay = error_delay
+        self.processes = {}
+
+    async def _build(self, component):
+        """Run an in-process component's factory; returns its Service or None"""
+        try:
+            service = await run_blocking(component.factory, name=component.name)
+        except Exception as e:
+            print(f"[RUNTIME] {component.name} failed to start: {e}")
+            return None
+        if service is None:
+            print(f"[RUNTIME] {component.name} is not configured, skipping")
+            return None
+        print(f"[RUNTIME] {component.name} started in-process")
+        return service
+
+    async def _host(self, component, service):
+        """Drive a built in-process component's step/wait loop"""
+        interval = service.interval or component.interval
+        try:
+            if service.step is None and service.close is not None:
+                await asyncio.Event().wait()  # Hold its connections until the runtime stops
+            while service.step is not None:
+                try:
+                    if await run_blocking(service.step, name=component.name) is False:
+                        print(f"[RUNTIME] {component.name} finished")
+                        break
+                    if service.wait is not None:
+                        await run_blocking(service.wait, interval, name=component.name)
+                    else:
+                        await asyncio.sleep(interval)
+                except Exception as e:
+                    print(f"[RUNTIME] {component.name} error: {e}; retrying in {self.error_delay}s")
+                    await asyncio.sleep(self.error_delay)
+        finally:
+            if service.close is not None:
+                try:
+                    await run_blocking(service.close, name=component.name)
+                except Exception as e:
+                    print(f"[RUNTIME] {component.name} failed to close: {e}")
+
+    async def _spawn(self, component):
+        """Run an isolated component as a child process until it exits"""
+        script = BASE_DIR / component.script
+        if not script.exists():
+            print(f"[WARNING] {component.script} not found, skipping...")
+            return
+        try:
+            process = await asyncio.create_subprocess_exec(sys.executable, str(script), cwd=str(BASE_DIR))
+        except Exception as e:
+            print(f"[ERROR] Failed to start {component.name}: {e}")
+            return
+        self.processes[component.name] = process
+        print(f"[RUNTIME] {component.name} started with PID: {process.pid}")
+        try:
+            code = await process.wait()
+            print(f"[RUNTIME] {component.name} exited with code {code}")
+        finally:
+            if process.returncode is None:
+                process.terminate()
+                await process.wait()
+
+    async def run(self):
+        """Run every component until all of them finish or the runtime is cancelled
+
+        Every in-process component is built before any of them steps, so
+        whatever the factories register (approval handlers, say) is in
+        place before the first poll.
+        """
+        tasks = [asyncio.create_task(self._spawn(component), name=component.name)
+                 for component in self.components if component.isolated]
+        try:
+            hosted = [component for component in self.components if not component.isolated]
+            services = await asyncio.gather(*(self._build(component) for component in hosted))
+            tasks += [asyncio.create_task(self._host(component, service), name=component.name)
+                      for component, service in zip(hosted, services) if service is not None]
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def run_forever(self):
+        """Run the components on a fresh event loop; Ctrl+C stops them all"""
+        try:
+            asyncio.run(self.run())
+        except KeyboardInterrupt:
+            print("[RUNTIME] Stopped by user")
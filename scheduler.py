@@ -114,10 +114,8 @@ Business professionals, entrepreneurs, tech enthusiasts
         task_file.write_text(content)
         print(f"[SCHEDULER] Created social media post task: {task_file.name}")
     
-    def run_scheduler(self):
-        """Run the scheduler with predefined tasks"""
-        print("[SCHEDULER] Starting task scheduler...")
-        
+    def schedule_tasks(self):
+        """Register the predefined tasks and create the initial ones"""
         # Schedule tasks
         schedule.every().day.at("09:00").do(self.create_daily_briefing)
         schedule.every().monday.at("09:00").do(self.create_weekly_review)
@@ -126,6 +124,11 @@ Business professionals, entrepreneurs, tech enthusiasts
         # Run initial tasks for demonstration
         self.create_daily_briefing()
         self.create_social_media_post()
+
+    def run_scheduler(self):
+        """Run the scheduler with predefined tasks"""
+        print("[SCHEDULER] Starting task scheduler...")
+        self.schedule_tasks()
         
         # Keep the scheduler running
         while True:
@@ -0,0 +1,125 @@
+"""
+Shared - Signal Channel
+Latest-state signal file plus a bounded history ring, shared by the cloud and local agents
+"""
+import os
+import re
+import time
+from pathlib import Path
+
+DEFAULT_HISTORY_SIZE = 48  # History slots kept per channel
+DEFAULT_HISTORY_INTERVAL = 1800  # Seconds between history snapshots (48 slots = one day)
+DEFAULT_RETENTION = 24 * 3600  # Seconds a history snapshot is kept
+
+_TIMESTAMP_RE = re.compile(r'^timestamp:\s*(.+?)\s*$', re.MULTILINE)
+
+
+def _write_atomic(path, content):
+    """Replace a file in one step so readers (and git) never see a partial write"""
+    temp = path.with_name(f'.{path.name}.tmp')
+    temp.write_text(content, encoding='utf-8')
+    os.replace(temp, path)
+
+
+class SignalChannel:
+    """One agent's signal stream in the vault's Signals/ folder.
+
+    The newest signal always lives at Signals/<name>_latest.md, rewritten
+    in place, so readers open one known file instead of scanning the
+    folder. Every history_interval seconds the signal is also copied into a
+    fixed ring of history_size slots (Signals/history/<name>_NN.md); slots
+    older than `retention` are deleted. The folder therefore holds at most
+    history_size + 1 files per channel, and each publish changes at most
+    two files for vault sync to carry.
+    """
+
+    def __init__(self, signals_dir, name, history_size=DEFAULT_HISTORY_SIZE,
+                 history_interval=DEFAULT_HISTORY_INTERVAL, retention=DEFAULT_RETENTION):
+        self.signals_dir = Path(signals_dir)
+        self.history_dir = self.signals_dir / 'history'
+        self.name = name
+        self.history_size = history_size
+        self.history_interval = history_interval
+        self.retention = retention
+        self.latest_path = self.signals_dir / f'{name}_latest.md'
+        self._next_slot = None
+        self._last_snapshot = 0
+
+    @classmethod
+    def from_config(cls, signals_dir, name, config):
+        """Build a channel from the optional `signals` section of system_config.json"""
+        signal_config = config.get('signals', {})
+        return cls(
+            signals_dir, name,
+            history_size=signal_config.get('history_size', DEFAULT_HISTORY_SIZE),
+            history_interval=signal_config.get('history_interval', DEFAULT_HISTORY_INTERVAL),
+            retention=signal_config.get('retention', DEFAULT_RETENTION)
+        )
+
+    def _slot_path(self, slot):
+        return self.history_dir / f'{self.name}_{slot:02d}.md'
+
+    def _slots(self):
+        """Existing history slot files with their modification times"""
+        slots = []
+        for slot in range(self.history_size):
+            path = self._slot_path(slot)
+            try:
+                slots.append((path.stat().st_mtime, slot, path))
+            except FileNotFoundError:
+                pass
+        return slots
+
+    def _snapshot(self, content, now):
+        """Copy a signal into the next history slot and drop expired slots"""
+        self.history_dir.mkdir(parents=True, exist_ok=True)
+        slots = self._slots()
+        if self._next_slot is None:
+            # Continue after the newest slot left by a previous run
+            self._next_slot = (max(slots)[1] + 1) % self.history_size if slots else 0
+        _write_atomic(self._slot_path(self._next_slot), content)
+        self._next_slot = (self._next_slot + 1) % self.history_size
+        for mtime, _, path in slots:
+            if now - mtime > self.retention:
+                path.unlink(missing_ok=True)
+
+    def publish(self, content):
+        """Make `content` the latest signal, snapshotting it into history when due"""
+        self.signals_dir.mkdir(parents=True, exist_ok=True)
+        _write_atomic(self.latest_path, content)
+        now = time.time()
+        if now - self._last_snapshot >= self.history_interval:
+            self._snapshot(content, now)
+            self._last_snapshot = now
+        return self.latest_path
+
+    def compact_legacy(self):
+        """Fold old one-file-per-signal files (<name>_<timestamp>.md) into the channel"""
+        legacy = sorted((path for path in self.signals_dir.glob(f'{self.name}_[0-9]*.md')
+                         if path.stem.rsplit('_', 1)[1].isdigit()),
+                        key=lambda path: int(path.stem.rsplit('_', 1)[1]))
+        if not legacy:
+            return 0
+        if not self.latest_path.exists():
+            _write_atomic(self.latest_path, legacy[-1].read_text(encoding='utf-8', errors='replace'))
+        for path in legacy:
+            path.unlink(missing_ok=True)
+        print(f"[SIGNALS] Compacted {len(legacy)} legacy {self.name} signal file(s)")
+        return len(legacy)
+
+    def latest(self):
+        """Text of the newest signal, or None if nothing has been published"""
+        try:
+            return self.latest_path.read_text(encoding='utf-8', errors='replace')
+        except FileNotFoundError:
+            return None
+
+    def latest_timestamp(self):
+        """The `timestamp:` frontmatter value of the newest signal, or None"""
+        content = self.latest()
+        match = _TIMESTAMP_RE.search(content) if content else None
+        return match.group(1) if match else None
+
+    def history(self):
+        """Paths of the history snapshots, oldest first"""
+        return [path for _, _, path in sorted(self._slots())]
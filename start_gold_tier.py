@@ -5,7 +5,11 @@ Launches all Gold Tier components
 import subprocess
 import sys
 import os
+import argparse
 from pathlib import Path
+from runtime import Runtime, Component, Service
+
+VAULT_PATH = "C:/Users/manal/OneDrive/Desktop/Hacakthon 0/AI_Employee_Vault_Gold"
 
 def start_component(script_name, description):
     """Start a component and return its process"""
@@ -18,24 +22,152 @@ def start_component(script_name, description):
         print(f"[ERROR] Failed to start {description}: {e}")
         return None
 
+# In-process factories: each reads its configuration like the script's __main__
+# block does and returns a runtime.Service, or None when it is not configured
+
+def orchestrator_service(vault_path):
+    from orchestrator_gold import GoldOrchestrator
+    orchestrator = GoldOrchestrator(vault_path)
+    orchestrator.start()
+    return Service(orchestrator.run_iteration, orchestrator.wait, orchestrator.close,
+                   interval=orchestrator.config['check_interval'])
+
+def gmail_service(vault_path):
+    from gmail_watcher import GmailWatcher, config_from_env
+    config = config_from_env()
+    if not config['username'] or not config['password']:
+        return None
+    watcher = GmailWatcher(vault_path, config)
+    return Service(watcher.check_new_emails, watcher.wait_for_new_mail, watcher.connection.disconnect,
+                   interval=config.get('idle_timeout', 300))
+
+def whatsapp_service(vault_path):
+    from whatsapp_watcher import WhatsAppWatcher, config_from_env
+    watcher = WhatsAppWatcher(vault_path, config_from_env())
+    return Service(watcher.check_new_messages, interval=120)
+
+def linkedin_service(vault_path):
+    from linkedin_poster import LinkedInPoster, config_from_env
+    poster = LinkedInPoster(vault_path, config_from_env())
+    approval_file = poster.draft_post_for_approval(poster.create_business_post(), "Sample business promotion")
+    print(f"[LINKEDIN] Created sample post for approval: {approval_file.name}")
+    return Service()
+
+def email_service(vault_path):
+    from email_mcp import EmailMCP, config_from_env
+    config = config_from_env()
+    if not config['username'] or not config['password']:
+        return None
+    mcp_server = EmailMCP(config)
+    mcp_server.register_approvals(vault_path)
+    return Service(close=mcp_server.pool.close)
+
+def odoo_service(vault_path):
+    from odoo_mcp import OdooMCP, config_from_env
+    config = config_from_env()
+    if config['api_key'] == 'your_api_key_here':
+        return None
+    mcp_server = OdooMCP(config)
+    if not mcp_server.authenticate():
+        raise RuntimeError("Odoo authentication failed")
+    mcp_server.register_approvals(vault_path)
+    return Service(close=mcp_server.http.close)
+
+def facebook_service(vault_path):
+    from facebook_mcp import FacebookMCP, config_from_env
+    config = config_from_env()
+    if config['access_token'] == 'your_access_token_here':
+        return None
+    mcp_server = FacebookMCP(config)
+    if not mcp_server.get_page_info():
+        raise RuntimeError("No valid Facebook page connection")
+    mcp_server.register_approvals(vault_path)
+    return Service(close=mcp_server.http.close)
+
+def instagram_service(vault_path):
+    from instagram_mcp import InstagramMCP, config_from_env
+    config = config_from_env()
+    if config['access_token'] == 'your_access_token_here':
+        return None
+    mcp_server = InstagramMCP(config)
+    if not mcp_server.get_account_info():
+        raise RuntimeError("No valid Instagram account connection")
+    mcp_server.register_approvals(vault_path)
+    return Service(close=mcp_server.http.close)
+
+def twitter_service(vault_path):
+    from twitter_mcp import TwitterMCP, config_from_env
+    config = config_from_env()
+    if config['bearer_token'] == 'your_bearer_token_here':
+        return None
+    mcp_server = TwitterMCP(config)
+    mcp_server.register_approvals(vault_path)
+    return Service(close=mcp_server.http.close)
+
+def approvals_service(vault_path):
+    # The one task that polls the dispatcher; the MCP factories above only register handlers
+    from approval_dispatcher import get_approval_dispatcher
+    dispatcher = get_approval_dispatcher(vault_path)
+    return Service(dispatcher.poll, dispatcher.wait, dispatcher.stop)
+
+def scheduler_service(vault_path):
+    import schedule
+    from scheduler import TaskScheduler
+    TaskScheduler(vault_path).schedule_tasks()
+    return Service(schedule.run_pending, interval=60)
+
+# (name, script, in-process factory, description)
+COMPONENTS = [
+    ("orchestrator", "orchestrator_gold.py", orchestrator_service, "Gold Tier Orchestrator"),
+    ("gmail", "gmail_watcher.py", gmail_service, "Gmail Watcher"),
+    ("whatsapp", "whatsapp_watcher.py", whatsapp_service, "WhatsApp Watcher"),
+    ("linkedin", "linkedin_poster.py", linkedin_service, "LinkedIn Poster"),
+    ("email", "email_mcp.py", email_service, "Email MCP Server"),
+    ("odoo", "odoo_mcp.py", odoo_service, "Odoo MCP Server"),
+    ("facebook", "facebook_mcp.py", facebook_service, "Facebook MCP Server"),
+    ("instagram", "instagram_mcp.py", instagram_service, "Instagram MCP Server"),
+    ("twitter", "twitter_mcp.py", twitter_service, "Twitter/X MCP Server"),
+    ("scheduler", "scheduler.py", scheduler_service, "Task Scheduler")
+]
+
+def run_in_process(vault_path, isolate):
+    """Host every component on one asyncio runtime; `isolate` names get their own process"""
+    components = [
+        Component(description, factory=lambda factory=factory: factory(vault_path),
+                  script=script, isolated=name in isolate)
+        for name, script, factory, description in COMPONENTS
+    ]
+    # Drives every handler the in-process MCP servers registered
+    components.append(Component("Approval Dispatcher", factory=lambda: approvals_service(vault_path)))
+    print("=" * 60)
+    print("Gold Tier AI Employee System - Single-process runtime")
+    print("=" * 60)
+    print(f"[STARTUP] Vault: {vault_path}")
+    if isolate:
+        print(f"[STARTUP] Isolated components: {', '.join(sorted(isolate))}")
+    Runtime(components).run_forever()
+
 def main():
+    parser = argparse.ArgumentParser(description='Gold Tier AI Employee System')
+    parser.add_argument('--in-process', action='store_true',
+                       help='Host all components as asyncio tasks in this process')
+    parser.add_argument('--isolate', default='',
+                       help='With --in-process: comma-separated components to keep in their own '
+                            'process (' + ', '.join(name for name, *_ in COMPONENTS) + ')')
+    parser.add_argument('--vault', default=VAULT_PATH, help='Vault used by in-process components')
+    args = parser.parse_args()
+
+    if args.in_process:
+        isolate = {name.strip() for name in args.isolate.split(',') if name.strip()}
+        run_in_process(args.vault, isolate)
+        return
+
     print("=" * 60)
     print("Gold Tier AI Employee System - Startup")
     print("=" * 60)
     
     # Define components to start
-    components = [
-        ("orchestrator_gold.py", "Gold Tier Orchestrator"),
-        ("gmail_watcher.py", "Gmail Watcher"),
-        ("whatsapp_watcher.py", "WhatsApp Watcher"),
-        ("linkedin_poster.py", "LinkedIn Poster"),
-        ("email_mcp.py", "Email MCP Server"),
-        ("odoo_mcp.py", "Odoo MCP Server"),
-        ("facebook_mcp.py", "Facebook MCP Server"),
-        ("instagram_mcp.py", "Instagram MCP Server"),
-        ("twitter_mcp.py", "Twitter/X MCP Server"),
-        ("scheduler.py", "Task Scheduler")
-    ]
+    components = [(script, description) for _, script, _, description in COMPONENTS]
     
     processes = {}
     
@@ -4,24 +4,26 @@ Manages both Cloud and Local Agent operations
 """
 import subprocess
 import sys
-import os
-from pathlib import Path
 import argparse
+from supervisor import Supervisor, BASE_DIR
+from health_monitor import HealthMonitor
 
-def start_component(script_name, description, is_daemon=False):
-    """Start a component and return its process"""
-    print(f"[STARTUP] Starting {description}...")
-    try:
-        if is_daemon:
-            # For daemon processes, we might want different handling
-            process = subprocess.Popen([sys.executable, script_name])
-        else:
-            process = subprocess.Popen([sys.executable, script_name])
-        print(f"[STARTUP] {description} started with PID: {process.pid}")
-        return process
-    except Exception as e:
-        print(f"[ERROR] Failed to start {description}: {e}")
-        return None
+VAULT_PATH = "C:/Users/manal/OneDrive/Desktop/Hacakthon 0/AI_Employee_Vault_Platinum"
+
+# Components supervised in each mode: (script, description, heartbeat agent, restart policy).
+# The Local Agent is on-demand: it exits 0 after its iterations and is only restarted after a failure.
+MODE_COMPONENTS = {
+    'cloud': [("cloud_orchestrator.py", "Cloud Agent", "cloud", 'always')],
+    'local': [("local_orchestrator.py", "Local Agent Orchestrator", "local", 'on-failure')],
+}
+
+def cloud_workers(count):
+    """Components for `count` cloud workers sharing the task space (cloud-1 ... cloud-N)"""
+    if count <= 1:
+        return [(script, description, agent, (), restart)
+                for script, description, agent, restart in MODE_COMPONENTS['cloud']]
+    return [("cloud_orchestrator.py", f"Cloud Agent {n}", f"cloud-{n}", ('--worker-id', f"cloud-{n}"), 'always')
+            for n in range(1, count + 1)]
 
 def main():
     parser = argparse.ArgumentParser(description='Platinum Tier AI Employee System')
@@ -29,6 +31,10 @@ def main():
                        default='local', help='Run mode: cloud, local, or demo')
     parser.add_argument('--skip-monitor', action='store_true', 
                        help='Skip starting health monitor')
+    parser.add_argument('--vault', default=VAULT_PATH,
+                       help='Vault where the health monitor writes logs and alerts')
+    parser.add_argument('--workers', type=int, default=1,
+                       help='Cloud mode: number of cloud workers to run on this machine')
     
     args = parser.parse_args()
     
@@ -38,75 +44,68 @@ def main():
     print(f"Mode: {args.mode.upper()}")
     print("=" * 60)
     
-    processes = {}
-    
-    if args.mode == 'cloud':
-        # Cloud Agent Mode - Start cloud-specific components
-        print("Starting Cloud Agent components...")
-        
-        components = [
-            ("cloud_orchestrator.py", "Cloud Agent Orchestrator"),
-        ]
-        
-        if not args.skip_monitor:
-            components.append(("health_monitor.py", "Health Monitor"))
-        
-        for script, description in components:
-            if Path(script).exists():
-                process = start_component(script, description)
-                if process:
-                    processes[description] = process
-            else:
-                print(f"[WARNING] {script} not found, skipping...")
-    
-    elif args.mode == 'local':
-        # Local Agent Mode - Start local-specific components
-        print("Starting Local Agent components...")
-        
-        components = [
-            ("local_orchestrator.py", "Local Agent Orchestrator"),
-        ]
-        
-        for script, description in components:
-            if Path(script).exists():
-                process = start_component(script, description)
-                if process:
-                    processes[description] = process
-            else:
-                print(f"[WARNING] {script} not found, skipping...")
-    
-    elif args.mode == 'demo':
+    if args.mode == 'demo':
         # Demo Mode - Run the end-to-end demo
         print("Running Platinum Tier Demo...")
         
-        if Path("platinum_demo.py").exists():
-            demo_result = subprocess.run([sys.executable, "platinum_demo.py"])
+        if (BASE_DIR / "platinum_demo.py").exists():
+            demo_result = subprocess.run([sys.executable, "platinum_demo.py"], cwd=str(BASE_DIR))
             print(f"\nDemo completed with return code: {demo_result.returncode}")
         else:
             print("[ERROR] platinum_demo.py not found")
+        print("=" * 60)
+        return
+    
+    print(f"Starting {args.mode.capitalize()} Agent components...")
+    supervisor = Supervisor()
+    heartbeats = {}
+    if args.mode == 'cloud':
+        components = cloud_workers(args.workers)
+    else:
+        components = [(script, description, agent, (), restart)
+                      for script, description, agent, restart in MODE_COMPONENTS[args.mode]]
+    for script, description, agent, script_args, restart in components:
+        if (BASE_DIR / script).exists():
+            supervisor.add(description, script, script_args, restart)
+            heartbeats[description] = agent
+        else:
+            print(f"[WARNING] {script} not found, skipping...")
     
-    print("\n" + "=" * 60)
-    if processes:
-        print("Platinum Tier components started successfully!")
+    if not supervisor.children:
+        print("No components started. Check that the component scripts are installed.")
         print("=" * 60)
-        print("\nActive processes:")
-        for desc, proc in processes.items():
-            print(f"  - {desc} (PID: {proc.pid})")
-        
-        print("\nSystem status:")
-        if args.mode == 'cloud':
-            print("  - Cloud Agent running 24/7 for non-sensitive operations")
-            print("  - Health monitoring active")
-            print("  - Processing email, social media, and accounting drafts")
-        elif args.mode == 'local':
-            print("  - Local Agent running for sensitive operations")
-            print("  - Monitoring for approval requests from Cloud Agent")
-            print("  - Handling final execution of sensitive actions")
-        
-        print("\nTo stop the system, press Ctrl+C in this window.")
+        return
+    
+    print("\nSystem status:")
+    if args.mode == 'cloud':
+        print("  - Cloud Agent running 24/7 for non-sensitive operations")
+        print("  - Processing email, social media, and accounting drafts")
+        if args.workers > 1:
+            print(f"  - {args.workers} cloud workers sharing tasks by consistent hashing")
     else:
-        print("No components started. Check that you're in the correct directory.")
+        print("  - Local Agent running for sensitive operations")
+        print("  - Monitoring for approval requests from Cloud Agent")
+        print("  - Handling final execution of sensitive actions")
+    print("  - Crashed components are restarted automatically")
+    if not args.skip_monitor:
+        print("  - Health monitoring active: stalled loops are restarted from their heartbeats")
+    print("\nTo stop the system, press Ctrl+C in this window.")
     print("=" * 60)
+    
+    if not args.skip_monitor:
+        # The health monitor supervises the components and adds stall detection, logging and alerts
+        HealthMonitor(args.vault, supervisor, heartbeats).run()
+        return
+    
+    supervisor.start()
+    try:
+        supervisor.wait()
+    except KeyboardInterrupt:
+        print("\n[STARTUP] Stopping components...")
+    finally:
+        supervisor.stop()
+        for name, count in supervisor.restart_counts().items():
+            print(f"  - {name}: {count} restart(s)")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
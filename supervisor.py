@@ -0,0 +1,222 @@
+"""
+Shared - Supervisor
+Owns component child processes and restarts them with backoff and crash-loop detection
+"""
+import sys
+import time
+import threading
+import subprocess
+from pathlib import Path
+from collections import deque
+
+BASE_DIR = Path(__file__).resolve().parent
+
+DEFAULT_BACKOFF = 0.5  # Seconds before the first restart; doubles on each quick crash
+DEFAULT_MAX_BACKOFF = 60
+DEFAULT_STABLE_AFTER = 60  # A child that ran this long resets its backoff
+DEFAULT_CRASH_LIMIT = 5  # Restarts within crash_window that count as a crash loop
+DEFAULT_CRASH_WINDOW = 120
+DEFAULT_CRASH_COOLDOWN = 600  # Seconds a crash-looping child is left down before another try
+
+
+class Child:
+    """State of one supervised component"""
+
+    def __init__(self, name, script, args=(), restart='always'):
+        self.name = name
+        self.script = script
+        self.args = list(args)
+        self.restart = restart  # always | on-failure
+        self.process = None
+        self.state = 'stopped'  # stopped | running | backoff | crash_loop | finished
+        self.restarts = 0
+        self.started_at = None
+        self.last_exit = None
+        self.recent_exits = deque()
+        self.thread = None
+
+    @property
+    def pid(self):
+        return self.process.pid if self.process is not None and self.state == 'running' else None
+
+    def status(self):
+        return {
+            'state': self.state,
+            'pid': self.pid,
+            'restarts': self.restarts,
+            'last_exit': self.last_exit,
+            'uptime': round(time.monotonic() - self.started_at, 1) if self.pid else 0
+        }
+
+
+class Supervisor:
+    """Starts component scripts as child processes and keeps them running.
+
+    Every child has a thread blocked in Popen.wait(), so an exit is seen the
+    moment it happens instead of on the next poll. The child is restarted
+    after `backoff` seconds, doubling up to `max_backoff` while it keeps
+    crashing quickly. `crash_limit` exits within `crash_window` seconds is a
+    crash loop: the child is left down for `crash_cooldown` seconds and an
+    event is raised. Children added with restart='on-failure' are on-demand:
+    a clean exit (code 0) ends their supervision, and once every child has
+    finished the supervisor stops. on_event(name, event, detail) is called
+    for 'started', 'exited', 'finished', 'crash_loop' and 'failed' so callers
+    can log and alert.
+    """
+
+    def __init__(self, base_dir=BASE_DIR, backoff=DEFAULT_BACKOFF, max_backoff=DEFAULT_MAX_BACKOFF,
+                 stable_after=DEFAULT_STABLE_AFTER, crash_limit=DEFAULT_CRASH_LIMIT,
+                 crash_window=DEFAULT_CRASH_WINDOW, crash_cooldown=DEFAULT_CRASH_COOLDOWN,
+                 on_event=None):
+        self.base_dir = Path(base_dir)
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.stable_after = stable_after
+        self.crash_limit = crash_limit
+        self.crash_window = crash_window
+        self.crash_cooldown = crash_cooldown
+        self.on_event = on_event
+        self.children = {}
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+
+    def add(self, name, script, args=(), restart='always'):
+        """Register a component script (relative to base_dir) to supervise
+
+        restart is 'always' for long-running components or 'on-failure' for
+        on-demand ones, which are only restarted after a non-zero exit.
+        """
+        if restart not in ('always', 'on-failure'):
+            raise ValueError(f"restart must be 'always' or 'on-failure', not {restart!r}")
+        self.children[name] = Child(name, script, args, restart)
+        return self
+
+    def _emit(self, child, event, detail=None):
+        print(f"[SUPERVISOR] {child.name}: {event}" + (f" ({detail})" if detail else ""))
+        if self.on_event is not None:
+            try:
+                self.on_event(child.name, event, detail)
+            except Exception as e:
+                print(f"[SUPERVISOR] Event handler failed: {e}")
+
+    def _spawn(self, child):
+        """Start a child's process; returns False if it could not be started"""
+        script = self.base_dir / child.script
+        try:
+            with self._lock:
+                if self._stopping.is_set():
+                    return False
+                child.process = subprocess.Popen([sys.executable, str(script), *child.args],
+                                                 cwd=str(self.base_dir))
+                child.started_at = time.monotonic()
+                child.state = 'running'
+        except OSError as e:
+            self._emit(child, 'failed', e)
+            return False
+        self._emit(child, 'started', f"PID {child.process.pid}")
+        return True
+
+    def _crash_looping(self, child, now):
+        """Record an exit and check whether the child is restarting too often"""
+        child.recent_exits.append(now)
+        while child.recent_exits and now - child.recent_exits[0] > self.crash_window:
+            child.recent_exits.popleft()
+        return len(child.recent_exits) >= self.crash_limit
+
+    def _watch(self, child):
+        """Keep one child running until the supervisor stops"""
+        delay = self.backoff
+        while not self._stopping.is_set():
+            pause = delay
+            if self._spawn(child):
+                code = child.process.wait()
+                if self._stopping.is_set():
+                    break
+                now = time.monotonic()
+                child.last_exit = code
+                if code == 0 and child.restart == 'on-failure':
+                    self._finish(child)
+                    return
+                if now - child.started_at >= self.stable_after:
+                    delay = pause = self.backoff
+                if self._crash_looping(child, now):
+                    child.state = 'crash_loop'
+                    self._emit(child, 'crash_loop', f"{self.crash_limit} exits in {self.crash_window}s, "
+                                                    f"last code {code}; retrying in {self.crash_cooldown}s")
+                    child.recent_exits.clear()
+                    pause, delay = self.crash_cooldown, self.backoff
+                else:
+                    child.state = 'backoff'
+                    self._emit(child, 'exited', f"code {code}; restarting in {pause:.1f}s")
+            else:
+                child.state = 'backoff'
+            delay = min(delay * 2, self.max_backoff)
+            if self._stopping.wait(pause):
+                break
+            child.restarts += 1
+        child.state = 'stopped'
+
+    def _finish(self, child):
+        """Stop supervising an on-demand child that exited cleanly"""
+        with self._lock:
+            child.state = 'finished'
+            done = all(other.state == 'finished' for other in self.children.values())
+            if done:
+                self._stopping.set()
+        self._emit(child, 'finished', "exit code 0; not restarted")
+
+    def start(self):
+        """Start every registered child"""
+        self._stopping.clear()
+        for child in self.children.values():
+            if child.thread is None or not child.thread.is_alive():
+                child.thread = threading.Thread(target=self._watch, args=(child,),
+                                                name=f"supervisor-{child.name}", daemon=True)
+                child.thread.start()
+        return self
+
+    def stop(self, timeout=10):
+        """Terminate every child, killing those that do not exit within `timeout` seconds"""
+        with self._lock:
+            self._stopping.set()
+        running = [child for child in self.children.values()
+                   if child.process is not None and child.process.poll() is None]
+        for child in running:
+            child.process.terminate()
+        deadline = time.monotonic() + timeout
+        for child in running:
+            try:
+                child.process.wait(max(0, deadline - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                child.process.kill()
+                child.process.wait()
+        for child in self.children.values():
+            if child.thread is not None:
+                child.thread.join(timeout)
+
+    def restart(self, name, timeout=10):
+        """Terminate a running child so it is restarted (e.g. because it stalled)"""
+        child = self.children[name]
+        process = child.process
+        if process is None or process.poll() is not None:
+            return False
+        process.terminate()
+        try:
+            process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        return True
+
+    def is_running(self, name):
+        return self.children[name].pid is not None
+
+    def status(self):
+        """Per-component state, PID, restart count and last exit code"""
+        return {name: child.status() for name, child in self.children.items()}
+
+    def restart_counts(self):
+        return {name: child.restarts for name, child in self.children.items()}
+
+    def wait(self, timeout=None):
+        """Block until the supervisor is stopped or `timeout` seconds pass"""
+        return self._stopping.wait(timeout)
@@ -0,0 +1,281 @@
+"""
+Shared - Task Intake
+Event-driven queue of new task files shared by every orchestrator tier
+"""
+import time
+import threading
+from collections import deque
+from pathlib import Path
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+    WATCHDOG_AVAILABLE = True
+except ImportError:  # Fall back to reconcile-only polling
+    Observer = None
+    FileSystemEventHandler = object
+    WATCHDOG_AVAILABLE = False
+
+DEFAULT_SETTLE_DELAY = 1.0  # Seconds a new file's size and mtime must hold still before it is delivered
+
+
+def file_signature(path):
+    """(size, mtime_ns) of a file, or None if it is gone"""
+    try:
+        stat = Path(path).stat()
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+class IntakeEventHandler(FileSystemEventHandler):
+    """Forwards watchdog events for watched directories to a TaskIntake
+
+    A created or modified file may still be mid-write, so it is only
+    delivered once it settles. A closed-after-write event (inotify) or a
+    rename into the directory means the file is complete and delivers it
+    right away.
+    """
+
+    def __init__(self, intake):
+        self.intake = intake
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self.intake.settle(Path(event.src_path))
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self.intake.settle(Path(event.src_path))
+
+    def on_closed(self, event):
+        if not event.is_directory:
+            self.intake.offer(Path(event.src_path))
+
+    def on_moved(self, event):
+        if not event.is_directory:
+            self.intake.forget(Path(event.src_path))
+            self.intake.offer(Path(event.dest_path))
+
+    def on_deleted(self, event):
+        if not event.is_directory:
+            self.intake.forget(Path(event.src_path))
+
+
+class TaskIntake:
+    """Queue of task files that appear in a set of directories.
+
+    New files are delivered within milliseconds via watchdog events. A
+    periodic reconcile scan re-offers anything the events missed (or every
+    wait when watchdog is not installed), so no task is ever lost. A file
+    whose size or mtime changed within the last settle_delay seconds is held
+    back until it stops changing, so a reader never sees a partial write.
+    Each file is delivered once; call release() to have a failed task offered
+    again on the next reconcile and expect() before moving a task into a
+    watched directory so the move is not reported as a new task.
+
+    With a TaskQueue, delivered files are persisted there instead of in
+    memory: get_tasks() returns them by priority and age, ack() removes a
+    handled task, release() nacks it, and tasks taken by a process that
+    crashed are delivered again once their visibility timeout lapses.
+    """
+
+    def __init__(self, directories, suffix='.md', reconcile_interval=300, queue=None,
+                 settle_delay=DEFAULT_SETTLE_DELAY):
+        self.directories = [Path(d) for d in directories]
+        self.suffix = suffix
+        self.reconcile_interval = reconcile_interval
+        self.queue = queue
+        self.settle_delay = settle_delay
+        self._settling = {}  # path -> [signature, monotonic time it last changed, timer]
+        self._pending = deque()
+        self._known = set()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._observer = None
+        self._scheduled = set()
+        self._last_reconcile = None
+
+    def start(self):
+        """Start watching the directories and queue what is already there"""
+        if WATCHDOG_AVAILABLE and self._observer is None:
+            self._observer = Observer()
+            self._observer.daemon = True
+            self._schedule_directories()
+            self._observer.start()
+        self.reconcile()
+        return self
+
+    def stop(self):
+        """Stop the filesystem observer"""
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
+            self._scheduled.clear()
+        with self._lock:
+            settling, self._settling = self._settling, {}
+        for _, _, timer in settling.values():
+            timer.cancel()
+
+    def _schedule_directories(self):
+        """Watch every directory that exists and is not watched yet"""
+        handler = IntakeEventHandler(self)
+        for directory in self.directories:
+            if directory not in self._scheduled and directory.is_dir():
+                self._observer.schedule(handler, str(directory), recursive=False)
+                self._scheduled.add(directory)
+
+    def _is_candidate(self, path):
+        return path.suffix == self.suffix and not path.name.startswith('.') and path.parent in self.directories
+
+    def settle(self, path):
+        """Offer a file once its size and mtime have held still for settle_delay seconds"""
+        if not self._is_candidate(path):
+            return
+        signature = file_signature(path)
+        if signature is None:
+            return
+        with self._lock:
+            entry = self._settling.get(path)
+            if entry is not None:
+                entry[:2] = signature, time.monotonic()  # Still being written; the timer re-checks
+                return
+            timer = threading.Timer(self.settle_delay, self._check_settled, (path,))
+            timer.daemon = True
+            self._settling[path] = [signature, time.monotonic(), timer]
+        timer.start()
+
+    def _check_settled(self, path):
+        """Timer callback: deliver a settled file, or check again later"""
+        signature = file_signature(path)
+        with self._lock:
+            entry = self._settling.get(path)
+            if entry is None:
+                return  # Delivered or forgotten meanwhile
+            if signature is not None and signature != entry[0]:
+                entry[:2] = signature, time.monotonic()
+            quiet = time.monotonic() - entry[1]
+            if signature is not None and quiet < self.settle_delay:
+                entry[2] = threading.Timer(self.settle_delay - quiet, self._check_settled, (path,))
+                entry[2].daemon = True
+                entry[2].start()
+                return
+            del self._settling[path]
+        if signature is not None:
+            self.offer(path)
+
+    def _stop_settling(self, path):
+        with self._lock:
+            entry = self._settling.pop(path, None)
+        if entry is not None:
+            entry[2].cancel()
+
+    def offer(self, path):
+        """Queue a file if it is a task that has not been delivered yet
+
+        Offering a file that is already queued re-ranks it, so an edit to its
+        priority (reported as a modified event, or seen by reconcile) takes
+        effect before it is delivered.
+        """
+        if not self._is_candidate(path):
+            return  # Not a task, or moved out of a watched directory
+        self._stop_settling(path)
+        with self._lock:
+            known = path in self._known
+            if not known:
+                self._known.add(path)
+                if self.queue is None:
+                    self._pending.append(path)
+        if known:
+            if self.queue is not None:
+                self.queue.rerank(path)
+            return
+        if self.queue is not None:
+            self.queue.put(path)
+        self._wakeup.set()
+
+    def forget(self, path):
+        """Drop a file that was moved away or deleted"""
+        self._stop_settling(path)
+        with self._lock:
+            self._known.discard(path)
+        if self.queue is not None:
+            self.queue.ack(path)
+
+    def ack(self, path):
+        """Mark a delivered task as handled so it is not delivered again"""
+        if self.queue is not None:
+            self.queue.ack(path)
+
+    def expect(self, path):
+        """Mark a path about to be created by the orchestrator itself"""
+        with self._lock:
+            self._known.add(Path(path))
+
+    def release(self, path):
+        """Allow a delivered task to be offered again on the next reconcile"""
+        if self.queue is not None:
+            self.queue.nack(path, self.reconcile_interval)
+            return
+        self.forget(Path(path))
+
+    def reconcile(self):
+        """Scan the directories for tasks the event stream did not report"""
+        if self._observer is not None:
+            self._schedule_directories()
+
+        present = set()
+        for directory in self.directories:
+            if directory.is_dir():
+                present.update(directory.glob(f'*{self.suffix}'))
+
+        with self._lock:
+            self._known &= present | set(self._pending)
+        if self.queue is not None:
+            self.queue.retain(present)
+        now = time.time()
+        for path in sorted(present):
+            signature = file_signature(path)
+            if signature is not None and now - signature[1] / 1e9 < self.settle_delay:
+                self.settle(path)  # Written moments ago, perhaps still being written
+            else:
+                self.offer(path)
+        self._last_reconcile = time.monotonic()
+
+    def _reconcile_due(self):
+        if self._observer is None or self._last_reconcile is None:
+            return True
+        return time.monotonic() - self._last_reconcile >= self.reconcile_interval
+
+    def get_tasks(self):
+        """Return every task delivered since the last call"""
+        if self._reconcile_due():
+            self.reconcile()
+
+        if self.queue is not None:
+            self._wakeup.clear()
+            tasks = self.queue.take()
+            for task in tasks:
+                if not task.exists():
+                    self.forget(task)
+            return [task for task in tasks if task.exists()]
+
+        with self._lock:
+            tasks = list(self._pending)
+            self._pending.clear()
+            self._wakeup.clear()
+        return [task for task in tasks if task.exists()]
+
+    def wait(self, timeout):
+        """Block until a task arrives or `timeout` seconds pass"""
+        if self._observer is None:
+            time.sleep(timeout)
+            return False
+        return self._wakeup.wait(timeout)
+
+    def __len__(self):
+        if self.queue is not None:
+            return len(self.queue)
+        with self._lock:
+            return len(self._pending)
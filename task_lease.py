@@ -0,0 +1,276 @@
+"""
+Shared - Task Lease
+Lease-based claim-by-move for tasks shared between agents through vault sync
+"""
+import os
+import json
+import time
+import socket
+from pathlib import Path
+from datetime import datetime
+from audit_log import get_audit_log
+
+DEFAULT_LEASE_DURATION = 1800  # Seconds a claim is valid; longer than a Claude task plus a sync round
+DEFAULT_RECLAIM_GRACE = 120  # Seconds past expiry before a lease is reclaimed (clock skew, a late sync)
+LEASE_SUFFIX = '.lease'
+FENCE_SUFFIX = '.fence'
+
+
+class Lease:
+    """One agent's claim on one task, stored as JSON next to the claimed file.
+
+    The fencing token is a per-task counter: a claim takes one more than
+    the highest token any agent has issued for the task (see
+    LeaseManager.next_token), so a reclaimed task always gets a newer one
+    regardless of clocks. Competing claims are ordered by token, highest
+    first, then by agent name, so every agent reaches the same verdict
+    from the same synced files.
+    """
+
+    def __init__(self, path, task, agent, token, acquired_at, expires_at, origin, claimed, pid=None, host=None):
+        self.path = Path(path)
+        self.task = task
+        self.agent = agent
+        self.token = token
+        self.acquired_at = acquired_at
+        self.expires_at = expires_at
+        self.origin = origin  # Vault-relative folder the task came from
+        self.claimed = claimed  # Vault-relative path of the claimed task file
+        self.pid = pid
+        self.host = host
+
+    @property
+    def rank(self):
+        """Sort key under which the winning claim comes first"""
+        return (-self.token, self.agent)
+
+    def expired(self, now=None):
+        return (now or time.time()) >= self.expires_at
+
+    def to_dict(self):
+        return {
+            'task': self.task, 'agent': self.agent, 'token': self.token,
+            'acquired_at': self.acquired_at, 'expires_at': self.expires_at,
+            'origin': self.origin, 'claimed': self.claimed, 'pid': self.pid, 'host': self.host
+        }
+
+    @classmethod
+    def load(cls, path):
+        """Read a lease file, or None if it is gone or unreadable"""
+        try:
+            data = json.loads(Path(path).read_text(encoding='utf-8'))
+            return cls(path, **data)
+        except (OSError, ValueError, TypeError):
+            return None
+
+
+class LeaseManager:
+    """Claims tasks for one agent with leases that survive vault sync.
+
+    A claim writes In_Progress/<agent>/<task>.fence (the token counter) and
+    <task>.lease, then moves the task to In_Progress/<agent>/<agent>_<task>.
+    Each agent only writes claims inside its own folder, so when two
+    machines claim the same task before a sync the merge (without rename
+    detection, see VaultSync.sync_pull) keeps both claims and
+    resolve_conflicts() lets the loser drop its copy. A crashed holder's
+    lease expires and, `grace` seconds later, reclaim_expired() puts the
+    task back where it came from and records it in the audit log. holds()
+    is the fencing check callers make before acting on a result.
+    """
+
+    def __init__(self, vault_path, agent, duration=DEFAULT_LEASE_DURATION, index=None,
+                 grace=DEFAULT_RECLAIM_GRACE):
+        self.vault = Path(vault_path)
+        self.agent = agent
+        self.duration = duration
+        self.grace = grace
+        self.index = index
+        self.audit_log = get_audit_log(self.vault / 'Logs')
+        self.root = self.vault / 'In_Progress'
+        self.agent_dir = self.root / agent
+        self.agent_dir.mkdir(parents=True, exist_ok=True)
+        self.host = socket.gethostname()
+
+    def _move(self, source, destination):
+        if self.index is not None:
+            return self.index.move(source, destination)
+        return Path(source).rename(destination)
+
+    def _relative(self, path):
+        return Path(path).relative_to(self.vault).as_posix()
+
+    def leases_for(self, task_name):
+        """Every agent's lease on a task (one file lookup per agent folder)"""
+        leases = []
+        for agent_dir in self.root.iterdir():
+            lease = Lease.load(agent_dir / f'{task_name}{LEASE_SUFFIX}') if agent_dir.is_dir() else None
+            if lease is not None:
+                leases.append(lease)
+        return leases
+
+    def _fence_path(self, agent_dir, task_name):
+        return agent_dir / f'{task_name}{FENCE_SUFFIX}'
+
+    def fence(self, task_name, agent_dir=None):
+        """Highest token recorded for a task in one agent's folder (this agent's by default), or 0"""
+        try:
+            path = self._fence_path(agent_dir or self.agent_dir, task_name)
+            return int(json.loads(path.read_text(encoding='utf-8'))['token'])
+        except (OSError, ValueError, KeyError, TypeError):
+            return 0
+
+    def next_token(self, task_name, leases=()):
+        """One more than any token issued for a task, as seen in every agent's fence and lease"""
+        fences = [self.fence(task_name, agent_dir) for agent_dir in self.root.iterdir() if agent_dir.is_dir()]
+        return max(fences + [lease.token for lease in leases] + [0]) + 1
+
+    def _write_fence(self, task_name, token):
+        path = self._fence_path(self.agent_dir, task_name)
+        temp = path.with_name(f'.{path.name}.tmp')
+        temp.write_text(json.dumps({'task': task_name, 'token': token}), encoding='utf-8')
+        os.replace(temp, path)
+
+    def claim(self, task_file):
+        """Lease a task and move it into this agent's folder; returns the Lease or None"""
+        task_file = Path(task_file)
+        now = time.time()
+        existing = self.leases_for(task_file.name)
+        if any(not lease.expired(now) for lease in existing):
+            return None  # Someone holds it; expired leases are cleaned up by reclaim_expired()
+
+        token = self.next_token(task_file.name, existing)
+        claimed = self.agent_dir / f'{self.agent}_{task_file.name}'
+        lease_path = self.agent_dir / f'{task_file.name}{LEASE_SUFFIX}'
+        lease = Lease(lease_path, task_file.name, self.agent, token, now, now + self.duration,
+                      self._relative(task_file.parent), self._relative(claimed), os.getpid(), self.host)
+        self._write_fence(lease.task, token)  # The counter moves first, so a token is never issued twice
+        self._write(lease)
+        try:
+            self._move(task_file, claimed)
+        except FileNotFoundError:
+            lease_path.unlink(missing_ok=True)  # Claimed by another worker on this machine first
+            return None
+        return lease
+
+    def _write(self, lease):
+        """Write a lease file atomically"""
+        temp = lease.path.with_name(f'.{lease.path.name}.tmp')
+        temp.write_text(json.dumps(lease.to_dict()), encoding='utf-8')
+        os.replace(temp, lease.path)
+
+    def renew(self, lease):
+        """Extend a held lease; returns False if it has been lost"""
+        if not self.holds(lease):
+            return False
+        lease.expires_at = time.time() + self.duration
+        self._write(lease)
+        return True
+
+    def defer(self, lease, delay):
+        """Keep a failed task claimed for `delay` more seconds, after which reclaim_expired() retries it"""
+        if not self.holds(lease):
+            return False
+        lease.expires_at = time.time() + delay
+        self._write(lease)
+        return True
+
+    def holds(self, lease):
+        """Fencing check: True while this lease is the winning claim on its task"""
+        current = Lease.load(lease.path)
+        if current is None or current.token != lease.token or self.fence(lease.task) != lease.token:
+            return False  # Reclaimed, dropped or superseded by a later claim of this agent
+        if self.next_token(lease.task) - 1 > lease.token:
+            return False  # Another agent has issued a newer token for the task
+        return min(self.leases_for(lease.task), key=lambda other: other.rank).agent == self.agent
+
+    def _drop(self, lease):
+        """Remove this agent's copy of a task and its lease"""
+        (self.vault / lease.claimed).unlink(missing_ok=True)
+        lease.path.unlink(missing_ok=True)
+
+    def complete(self, lease, destination_dir):
+        """Move a processed task to destination_dir if the lease still holds"""
+        if not self.holds(lease):
+            print(f"[LEASE] Lost lease on {lease.task}; discarding this agent's result")
+            current = Lease.load(lease.path)
+            if current is not None and current.token == lease.token:
+                self._drop(lease)
+            return None
+        destination_dir = Path(destination_dir)
+        destination_dir.mkdir(parents=True, exist_ok=True)
+        destination = destination_dir / lease.task
+        self._move(self.vault / lease.claimed, destination)
+        lease.path.unlink(missing_ok=True)
+        self._fence_path(self.agent_dir, lease.task).unlink(missing_ok=True)  # The task is finished
+        return destination
+
+    def release(self, lease):
+        """Give a task back to the folder it came from (e.g. after a failure)"""
+        if not self.holds(lease):
+            return None
+        return self._return(lease)
+
+    def _return(self, lease):
+        """Move a claimed task back to its origin and delete the lease"""
+        claimed = self.vault / lease.claimed
+        origin = self.vault / lease.origin / lease.task
+        origin.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            self._move(claimed, origin)
+        except FileNotFoundError:
+            origin = None  # Already returned by another agent
+        lease.path.unlink(missing_ok=True)
+        return origin
+
+    def resolve_conflicts(self):
+        """Drop this agent's claims that lost to an earlier claim after a sync; returns their names"""
+        dropped = []
+        for lease_path in self.agent_dir.glob(f'*{LEASE_SUFFIX}'):
+            lease = Lease.load(lease_path)
+            if lease is None:
+                continue
+            winner = min(self.leases_for(lease.task), key=lambda other: other.rank)
+            if winner.agent != self.agent:
+                print(f"[LEASE] {lease.task} was also claimed by {winner.agent} (token {winner.token}); "
+                      f"dropping this agent's claim")
+                self._drop(lease)
+                dropped.append(lease.task)
+        return dropped
+
+    def reclaim_expired(self, recover_own=False):
+        """Return tasks whose lease expired more than `grace` seconds ago (any agent) to their origin folder.
+
+        With recover_own=True this agent's leases from a previous process are
+        returned too, since nothing is working on them any more.
+        """
+        now = time.time()
+        reclaimed = []
+        for lease_path in self.root.glob(f'*/*{LEASE_SUFFIX}'):
+            lease = Lease.load(lease_path)
+            if lease is None:
+                continue
+            stale = recover_own and lease.agent == self.agent and lease.pid != os.getpid()
+            if not (lease.expired(now - self.grace) or stale):
+                continue
+            reason = 'expired' if lease.expired(now - self.grace) else 'previous run'
+            if any(other.agent != lease.agent and not other.expired(now) for other in self.leases_for(lease.task)):
+                self._drop(lease)  # A live competing claim still has the task
+                self._record_reclaim(lease, reason, 'dropped')
+                continue
+            if self._return(lease) is not None:
+                print(f"[LEASE] Reclaimed {lease.task} from {lease.agent} ({reason})")
+                self._record_reclaim(lease, reason, 'returned')
+                reclaimed.append(lease.task)
+        return reclaimed
+
+    def _record_reclaim(self, lease, reason, result):
+        """Append a reclaimed lease to the audit log"""
+        self.audit_log.append({
+            'timestamp': datetime.now().isoformat(),
+            'action_type': 'lease_reclaim',
+            'actor': self.agent,
+            'target': lease.task,
+            'parameters': {'holder': lease.agent, 'token': lease.token, 'reason': reason,
+                           'expired_at': lease.expires_at, 'origin': lease.origin},
+            'result': result
+        })
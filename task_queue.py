@@ -0,0 +1,167 @@
+"""
+Shared - Task Queue
+Durable SQLite priority queue of task files with at-least-once delivery, shared by every orchestrator tier
+"""
+import time
+import sqlite3
+import threading
+from pathlib import Path
+from approval_schema import read_frontmatter
+from metadata_cache import get_metadata_cache
+
+DEFAULT_VISIBILITY_TIMEOUT = 900  # Seconds a delivered task stays hidden before it is delivered again
+DEFAULT_RETRY_DELAY = 300  # Seconds a nacked task waits before it is delivered again
+
+# Frontmatter priority -> rank; lower ranks are delivered first
+PRIORITY_RANKS = {'critical': 0, 'urgent': 0, 'high': 1, 'medium': 2, 'normal': 2, 'low': 3}
+DEFAULT_RANK = PRIORITY_RANKS['medium']
+
+
+def priority_rank(meta):
+    """Rank of a task from its `priority:` frontmatter (medium if absent)"""
+    return PRIORITY_RANKS.get(str((meta or {}).get('priority') or '').lower(), DEFAULT_RANK)
+
+
+class TaskQueue:
+    """Task files waiting to be processed, kept in SQLite so they survive a crash.
+
+    Tasks are delivered by priority rank, then by age (file modification
+    time); rerank() refreshes a queued task's rank after its frontmatter is
+    edited. take() hides each delivered task for `visibility_timeout`
+    seconds; the consumer ack()s it once it is handled or nack()s it to have
+    it delivered again later. A task whose consumer died mid-batch becomes
+    visible again when its timeout lapses, so every task is delivered at
+    least once. The database runs in WAL mode so several orchestrator
+    processes can share a queue file.
+    """
+
+    def __init__(self, db_path, visibility_timeout=DEFAULT_VISIBILITY_TIMEOUT, retry_delay=DEFAULT_RETRY_DELAY,
+                 metadata=None):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.visibility_timeout = visibility_timeout
+        self.retry_delay = retry_delay
+        self.metadata = metadata  # MetadataCache for frontmatter lookups, if shared
+        self._lock = threading.Lock()
+        self.db = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                path TEXT PRIMARY KEY,
+                rank INTEGER NOT NULL,
+                created REAL NOT NULL,
+                visible_at REAL NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        self.db.execute('CREATE INDEX IF NOT EXISTS tasks_order ON tasks (rank, created)')
+        self.db.commit()
+
+    @classmethod
+    def from_config(cls, db_path, config, metadata=None):
+        """Build a queue from the optional `queue` section of system_config.json"""
+        queue_config = config.get('queue', {})
+        return cls(
+            db_path,
+            visibility_timeout=queue_config.get('visibility_timeout', DEFAULT_VISIBILITY_TIMEOUT),
+            retry_delay=queue_config.get('retry_delay', DEFAULT_RETRY_DELAY),
+            metadata=metadata
+        )
+
+    def _rank(self, path):
+        try:
+            meta = self.metadata.get(path) if self.metadata is not None else read_frontmatter(path)
+        except OSError:
+            meta = None
+        return priority_rank(meta)
+
+    def put(self, path):
+        """Queue a task file; returns False if it is already queued (only its rank is refreshed)"""
+        path = Path(path)
+        try:
+            created = path.stat().st_mtime
+        except FileNotFoundError:
+            return False
+        rank = self._rank(path)
+        with self._lock:
+            cursor = self.db.execute('INSERT OR IGNORE INTO tasks VALUES (?, ?, ?, 0, 0)',
+                                     (str(path), rank, created))
+            added = cursor.rowcount == 1
+            if not added:
+                self.db.execute('UPDATE tasks SET rank = ? WHERE path = ? AND rank != ?', (rank, str(path), rank))
+            self.db.commit()
+            return added
+
+    def rerank(self, path):
+        """Refresh the rank of a queued task from its current frontmatter; never queues a new one"""
+        rank = self._rank(path)
+        with self._lock:
+            cursor = self.db.execute('UPDATE tasks SET rank = ? WHERE path = ? AND rank != ?',
+                                     (rank, str(path), rank))
+            self.db.commit()
+            return cursor.rowcount == 1
+
+    def take(self, limit=None, visibility_timeout=None):
+        """Deliver up to `limit` visible tasks, highest priority and oldest first"""
+        now = time.time()
+        hidden_until = now + (self.visibility_timeout if visibility_timeout is None else visibility_timeout)
+        with self._lock:
+            # IMMEDIATE takes the write lock up front so two processes never take the same rows
+            self.db.execute('BEGIN IMMEDIATE')
+            try:
+                rows = self.db.execute('SELECT path FROM tasks WHERE visible_at <= ? ORDER BY rank, created LIMIT ?',
+                                       (now, -1 if limit is None else limit)).fetchall()
+                self.db.executemany('UPDATE tasks SET visible_at = ?, attempts = attempts + 1 WHERE path = ?',
+                                    [(hidden_until, path) for path, in rows])
+                self.db.commit()
+            except BaseException:
+                self.db.rollback()
+                raise
+        return [Path(path) for path, in rows]
+
+    def ack(self, path):
+        """Remove a handled task"""
+        with self._lock:
+            self.db.execute('DELETE FROM tasks WHERE path = ?', (str(path),))
+            self.db.commit()
+
+    def nack(self, path, delay=None):
+        """Deliver a task again after `delay` seconds (retry_delay by default)"""
+        visible_at = time.time() + (self.retry_delay if delay is None else delay)
+        with self._lock:
+            self.db.execute('UPDATE tasks SET visible_at = ? WHERE path = ?', (visible_at, str(path)))
+            self.db.commit()
+
+    def retain(self, paths):
+        """Drop queued tasks whose files are no longer among `paths`"""
+        keep = {str(path) for path in paths}
+        with self._lock:
+            gone = [(path,) for path, in self.db.execute('SELECT path FROM tasks') if path not in keep]
+            if gone:
+                self.db.executemany('DELETE FROM tasks WHERE path = ?', gone)
+                self.db.commit()
+        return len(gone)
+
+    def __len__(self):
+        """Number of tasks visible now"""
+        with self._lock:
+            return self.db.execute('SELECT COUNT(*) FROM tasks WHERE visible_at <= ?',
+                                   (time.time(),)).fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self.db.close()
+
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def get_task_queue(vault_path, name, config=None):
+    """Return the shared TaskQueue `name` kept in a vault's .cache/queues folder"""
+    db_path = (Path(vault_path) / '.cache' / 'queues' / f'{name}.sqlite3').resolve()
+    with _registry_lock:
+        if db_path not in _registry:
+            _registry[db_path] = TaskQueue.from_config(db_path, config or {}, get_metadata_cache(vault_path))
+        return _registry[db_path]
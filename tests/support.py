@@ -0,0 +1,87 @@
+"""
+Tests - Support
+Stand-ins shared by the tests: HTTP packages that may be missing and a fake Odoo JSON-RPC endpoint
+"""
+import sys
+import types
+import importlib
+from unittest import mock
+
+
+def http_stand_ins():
+    """sys.modules entries standing in for requests/urllib3 when they are not installed
+
+    Only the names http_client needs at import time exist; the tests never let a
+    request reach them. Returns {} when the real packages are available.
+    """
+    try:
+        import requests  # noqa: F401
+        import urllib3  # noqa: F401
+        return {}
+    except ImportError:
+        pass
+    requests = types.ModuleType('requests')
+    requests.Session = object
+    requests.exceptions = types.SimpleNamespace(
+        ConnectionError=type('ConnectionError', (OSError,), {}),
+        Timeout=type('Timeout', (OSError,), {}),
+        ConnectTimeout=type('ConnectTimeout', (OSError,), {}))
+    adapters = types.ModuleType('requests.adapters')
+    adapters.HTTPAdapter = object
+    requests.adapters = adapters
+    urllib3 = types.ModuleType('urllib3')
+    urllib3_exceptions = types.ModuleType('urllib3.exceptions')
+    urllib3_exceptions.NewConnectionError = type('NewConnectionError', (OSError,), {})
+    return {'requests': requests, 'requests.adapters': adapters,
+            'urllib3': urllib3, 'urllib3.exceptions': urllib3_exceptions}
+
+
+def import_with_http_stand_ins(test_class, *names):
+    """Import modules for one test class with http_stand_ins() in sys.modules.
+
+    sys.modules is restored when the class finishes, so neither the stand-ins
+    nor modules imported through them leak into other tests.
+    """
+    patcher = mock.patch.dict(sys.modules, http_stand_ins())
+    patcher.start()
+    test_class.addClassCleanup(patcher.stop)
+    return [importlib.import_module(name) for name in names]
+
+
+class FakeOdoo:
+    """Replaces OdooMCP.call_odoo_method, recording every RPC as (model, method, args)"""
+
+    def __init__(self, partners=None):
+        self.calls = []
+        self.partners = list(partners or [])  # [{'id', 'name', 'email'}, ...]
+        self.created = {}  # model -> [vals, ...]
+        self._next_id = 100
+
+    def _new_id(self):
+        self._next_id += 1
+        return self._next_id
+
+    def __call__(self, model, method, args=None, kwargs=None):
+        self.calls.append((model, method, args))
+        if method == 'search_read':
+            if model == 'account.journal':
+                return [{'id': 7, 'name': 'Journal'}]
+            if model == 'res.partner':
+                # Only ['field', 'in', values] terms joined by '|' are used
+                terms = [term for term in args[0] if term != '|']
+                return [dict(partner, phone=None) for partner in self.partners
+                        if any(partner.get(field) in values for field, _, values in terms)]
+            return []
+        if method == 'create':
+            records = args[0] if isinstance(args[0], list) else [args[0]]
+            self.created.setdefault(model, []).extend(records)
+            ids = [self._new_id() for _ in records]
+            if model == 'res.partner':
+                self.partners.extend({'id': partner_id, 'name': vals.get('name'), 'email': vals.get('email')}
+                                     for vals, partner_id in zip(records, ids))
+            return ids if isinstance(args[0], list) else ids[0]
+        return True
+
+    def count(self, method=None):
+        """Number of RPCs made, optionally of one method"""
+        return sum(1 for call in self.calls if method is None or call[1] == method)
@@ -0,0 +1,37 @@
+"""
+Tests - Approval Dispatcher
+Filing of finished approvals, against handlers registered in the test
+"""
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from approval_dispatcher import ApprovalDispatcher
+
+EMAIL_APPROVAL = '---\naction: send_email\nto: client@example.com\nsubject: Hi\n---\nBody\n'
+
+
+class FinishTest(unittest.TestCase):
+    def setUp(self):
+        self.vault = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.vault)
+        self.dispatcher = ApprovalDispatcher(self.vault, retry_delay=3600, settle_delay=0)
+        self.addCleanup(self.dispatcher.stop)
+        self.dispatcher.register('email', lambda approval: True)
+
+    def approve(self, name):
+        (self.vault / 'Approved' / name).write_text(EMAIL_APPROVAL, encoding='utf-8')
+
+    def test_done_copy_with_the_same_name_is_kept(self):
+        self.dispatcher.start()
+        (self.vault / 'Done' / 'EMAIL_reply.md').write_text('earlier run\n', encoding='utf-8')
+        self.approve('EMAIL_reply.md')
+        self.assertEqual(self.dispatcher.poll(), [('EMAIL_reply.md', True)])
+
+        self.assertEqual((self.vault / 'Done' / 'EMAIL_reply.md').read_text(encoding='utf-8'), 'earlier run\n')
+        self.assertEqual((self.vault / 'Done' / 'EMAIL_reply_1.md').read_text(encoding='utf-8'), EMAIL_APPROVAL)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+"""
+Tests - Approval Schema
+Channel routing of approval files by frontmatter action and file name
+"""
+import unittest
+
+from approval_schema import channels_for, parse_approval_text, route_channels
+
+
+def channel(meta, name):
+    channels = route_channels(meta, f'Approved/{name}')
+    return channels[0] if channels else None
+
+
+class RouteByActionTest(unittest.TestCase):
+    def test_delivery_channel_beats_topic_words(self):
+        self.assertEqual(channel({'action': 'email_invoice'}, 'APPROVAL_1.md'), 'email')
+        self.assertEqual(channel({'action': 'send_payment_reminder_email'}, 'APPROVAL_1.md'), 'email')
+        self.assertEqual(channel({'action': 'post_invoice_tweet'}, 'APPROVAL_1.md'), 'twitter')
+
+    def test_topic_words_fall_back_to_odoo(self):
+        self.assertEqual(channel({'action': 'create_invoice'}, 'APPROVAL_1.md'), 'odoo')
+        self.assertEqual(channel({'action': 'record_payment'}, 'EMAIL_1.md'), 'odoo')
+
+    def test_explicit_odoo_wins(self):
+        self.assertEqual(channel({'action': 'odoo_email_invoice'}, 'APPROVAL_1.md'), 'odoo')
+
+    def test_action_takes_precedence_over_file_name(self):
+        self.assertEqual(channel({'action': 'post_facebook'}, 'EMAIL_draft.md'), 'facebook')
+
+    def test_topic_channels_come_last(self):
+        self.assertEqual(channels_for('email_invoice'), ['email', 'odoo'])
+
+
+class RouteByFileNameTest(unittest.TestCase):
+    def test_prefix_channel_first(self):
+        self.assertEqual(channel({}, 'EMAIL_payment_reminder_acme.md'), 'email')
+        self.assertEqual(channel({}, 'FACEBOOK_email_signup_promo.md'), 'facebook')
+        self.assertEqual(route_channels({}, 'Approved/FACEBOOK_email_signup_promo.md'), ['facebook', 'email'])
+
+    def test_topic_in_name_falls_back_to_odoo(self):
+        self.assertEqual(channel({}, 'INVOICE_acme_2024_001.md'), 'odoo')
+        self.assertEqual(channel({}, 'APPROVAL_payment_acme.md'), 'odoo')
+
+    def test_unroutable(self):
+        self.assertIsNone(channel({}, 'APPROVAL_misc.md'))
+
+    def test_parsed_approval_uses_the_same_routing(self):
+        text = '---\ntype: approval_request\n---\n## Email Body\nHi\n'
+        approval = parse_approval_text(text, 'Approved/EMAIL_payment_reminder_acme.md')
+        self.assertEqual(approval.channel, 'email')
+        self.assertEqual(approval.payload, 'Hi')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,200 @@
+"""
+Tests - Email MCP
+SMTP connection pooling and outbox draining, against a fake smtplib.SMTP
+"""
+import smtplib
+import time
+import unittest
+from unittest import mock
+
+import email_mcp
+from email_mcp import EmailMCP, SmtpPool
+
+SMTP_CONFIG = {'smtp_server': 'smtp.test', 'smtp_port': 587, 'username': 'agent@example.com',
+               'password': 'secret', 'send_rate': (1000, 1000)}
+
+
+class FakeSMTP:
+    """One fake SMTP session; `opened` and `delivered` span sessions, `defaults` presets new ones"""
+
+    opened = []
+    delivered = []
+    defaults = {}
+
+    def __init__(self, host, port, timeout=None):
+        self.logins = 0
+        self.noops = 0
+        self.attempts = 0
+        self.sent = []
+        self.dropped = False
+        self.noop_code = 250
+        self.refuse = set()
+        self.delays = {}
+        self.quit_called = False
+        self.closed = False
+        self.__dict__.update(FakeSMTP.defaults)
+        FakeSMTP.opened.append(self)
+
+    def starttls(self):
+        pass
+
+    def login(self, username, password):
+        self.logins += 1
+
+    def noop(self):
+        self.noops += 1
+        if self.dropped:
+            raise smtplib.SMTPServerDisconnected('Connection unexpectedly closed')
+        return self.noop_code, b'OK'
+
+    def sendmail(self, from_addr, recipients, message):
+        self.attempts += 1
+        if self.dropped:
+            raise smtplib.SMTPServerDisconnected('Connection unexpectedly closed')
+        refused = {recipient: (550, b'No such user') for recipient in recipients if recipient in self.refuse}
+        if refused:
+            raise smtplib.SMTPRecipientsRefused(refused)
+        time.sleep(self.delays.get(recipients[0], 0))
+        self.sent.append(recipients[0])
+        FakeSMTP.delivered.append(recipients[0])
+        return {}
+
+    def quit(self):
+        self.quit_called = True
+
+    def close(self):
+        self.closed = True
+
+
+class SmtpPoolTest(unittest.TestCase):
+    def setUp(self):
+        FakeSMTP.opened, FakeSMTP.delivered, FakeSMTP.defaults = [], [], {}
+        patcher = mock.patch.object(email_mcp.smtplib, 'SMTP', FakeSMTP)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def pool(self, **config):
+        pool = SmtpPool(dict(SMTP_CONFIG, **config))
+        self.addCleanup(pool.close)
+        return pool
+
+    def send(self, pool, recipient):
+        pool.send(SMTP_CONFIG['username'], [recipient], 'Subject: test\n\nbody')
+
+    def test_one_handshake_for_a_run_of_messages(self):
+        pool = self.pool()
+        for number in range(20):
+            self.send(pool, f'client{number}@example.com')
+
+        self.assertEqual(pool.connections_opened, 1)
+        [server] = FakeSMTP.opened
+        self.assertEqual(server.logins, 1)
+        self.assertEqual(len(server.sent), 20)
+
+    def test_recently_used_connection_is_not_probed(self):
+        pool = self.pool()
+        self.send(pool, 'a@example.com')
+        self.send(pool, 'b@example.com')
+        self.assertEqual(FakeSMTP.opened[0].noops, 0)
+
+    def test_idle_connection_is_probed_with_noop(self):
+        pool = self.pool(smtp_idle_timeout=0)
+        self.send(pool, 'a@example.com')
+        self.send(pool, 'b@example.com')
+
+        [server] = FakeSMTP.opened
+        self.assertEqual(server.noops, 1)
+        self.assertEqual(server.sent, ['a@example.com', 'b@example.com'])
+
+    def test_failed_noop_replaces_the_connection(self):
+        pool = self.pool(smtp_idle_timeout=0)
+        self.send(pool, 'a@example.com')
+        FakeSMTP.opened[0].noop_code = 421
+        self.send(pool, 'b@example.com')
+
+        first, second = FakeSMTP.opened
+        self.assertTrue(first.closed)
+        self.assertEqual(second.sent, ['b@example.com'])
+        self.assertEqual(pool.connections_opened, 2)
+
+    def test_disconnect_is_retried_once_on_a_fresh_connection(self):
+        pool = self.pool()
+        self.send(pool, 'a@example.com')
+        FakeSMTP.opened[0].dropped = True
+        self.send(pool, 'b@example.com')
+
+        first, second = FakeSMTP.opened
+        self.assertTrue(first.closed)
+        self.assertEqual(first.attempts, 2)
+        self.assertEqual(second.sent, ['b@example.com'])
+
+    def test_disconnect_on_the_retry_is_raised(self):
+        pool = self.pool()
+        FakeSMTP.defaults = {'dropped': True}
+        with self.assertRaises(smtplib.SMTPServerDisconnected):
+            self.send(pool, 'a@example.com')
+
+        self.assertEqual(len(FakeSMTP.opened), 2)
+        self.assertEqual([server.attempts for server in FakeSMTP.opened], [1, 1])
+        self.assertEqual(list(pool._idle), [])
+
+    def test_refused_recipient_keeps_the_connection(self):
+        pool = self.pool()
+        self.send(pool, 'a@example.com')
+        FakeSMTP.opened[0].refuse.add('nobody@example.com')
+        with self.assertRaises(smtplib.SMTPRecipientsRefused):
+            self.send(pool, 'nobody@example.com')
+        self.send(pool, 'b@example.com')
+
+        [server] = FakeSMTP.opened
+        self.assertFalse(server.closed)
+        self.assertEqual(server.sent, ['a@example.com', 'b@example.com'])
+
+    def test_connection_is_recycled_after_max_messages(self):
+        pool = self.pool(smtp_max_messages=3)
+        for number in range(7):
+            self.send(pool, f'client{number}@example.com')
+
+        self.assertEqual([len(server.sent) for server in FakeSMTP.opened], [3, 3, 1])
+        self.assertEqual([server.quit_called for server in FakeSMTP.opened], [True, True, False])
+
+
+class DrainOutboxTest(unittest.TestCase):
+    def setUp(self):
+        FakeSMTP.opened, FakeSMTP.delivered, FakeSMTP.defaults = [], [], {}
+        for patcher in (mock.patch.object(email_mcp.smtplib, 'SMTP', FakeSMTP),
+                        mock.patch.dict(email_mcp._pools, clear=True)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.mcp = EmailMCP(dict(SMTP_CONFIG, smtp_pool_size=2))
+        self.addCleanup(self.mcp.pool.close)
+
+    def test_results_come_back_in_queue_order(self):
+        recipients = [f'client{number}@example.com' for number in range(10)]
+        FakeSMTP.defaults = {'delays': {recipients[0]: 0.05}}  # The first message finishes last
+        for number, recipient in enumerate(recipients):
+            self.mcp.queue_email(recipient, f'Reply {number}', 'Thanks', context=number)
+        results = self.mcp.drain_outbox()
+
+        self.assertNotEqual(FakeSMTP.delivered[0], recipients[0])
+        self.assertEqual([context for context, _, _ in results], list(range(10)))
+        self.assertEqual([log_entry['to'] for _, _, log_entry in results], recipients)
+        self.assertTrue(all(success for _, success, _ in results))
+        self.assertLessEqual(self.mcp.pool.connections_opened, 2)
+        self.assertEqual(sum(len(server.sent) for server in FakeSMTP.opened), 10)
+        self.assertEqual(list(self.mcp.outbox), [])
+
+    def test_failed_send_is_reported_in_place(self):
+        self.mcp.queue_email('a@example.com', 'One', 'Body', context='first')
+        self.mcp.queue_email('nobody@example.com', 'Two', 'Body', context='second')
+        self.mcp.queue_email('b@example.com', 'Three', 'Body', context='third')
+        FakeSMTP.defaults = {'refuse': {'nobody@example.com'}}
+        results = self.mcp.drain_outbox()
+
+        self.assertEqual([(context, success) for context, success, _ in results],
+                         [('first', True), ('second', False), ('third', True)])
+        self.assertEqual(results[1][2]['status'], 'failed')
+
+
+if __name__ == '__main__':
+    unittest.main()
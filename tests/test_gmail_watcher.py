@@ -0,0 +1,146 @@
+"""
+Tests - Gmail Watcher
+Sync position handling of the UID-based inbox scan, against a fake IMAP session
+"""
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from gmail_watcher import GmailWatcher
+
+
+class FakeMailbox:
+    """Answers the UID SEARCH commands check_new_emails issues for a set of messages"""
+
+    def __init__(self, uids, unseen):
+        self.uids = sorted(uids)
+        self.unseen = set(unseen)
+        self.searches = []
+
+    def uid(self, command, charset, criteria):
+        assert command == 'search'
+        self.searches.append(criteria)
+        if criteria == 'UNSEEN':
+            found = [uid for uid in self.uids if uid in self.unseen]
+        elif criteria == 'UID *':
+            found = self.uids[-1:]
+        else:
+            low = int(criteria.split()[1].split(':')[0])
+            found = [uid for uid in self.uids if uid >= low] or self.uids[-1:]
+        return 'OK', [b' '.join(str(uid).encode() for uid in found)]
+
+
+class FakeConnection:
+    mailbox = 'INBOX'
+
+    def __init__(self, mail, uidvalidity=7, uidnext=None):
+        self.mail = mail
+        self.uidvalidity = uidvalidity
+        self.uidnext = uidnext
+
+    def connect(self):
+        return self.mail
+
+    def disconnect(self):
+        pass
+
+
+class CheckNewEmailsTest(unittest.TestCase):
+    def setUp(self):
+        self.vault = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.vault)
+        (self.vault / 'Watchers').mkdir()
+        self.watcher = GmailWatcher(self.vault, {'username': 'u', 'password': 'p'})
+        self.fetched = []
+        self.watcher.fetch_page = self.fake_fetch_page
+
+    def fake_fetch_page(self, mail, uids):
+        self.fetched.extend(uids)
+        for uid in uids:
+            yield uid, {'Message-ID': f'<{uid}@example.com>', 'Subject': f'Message {uid}'}, 'Body'
+
+    def connect(self, mailbox, **kwargs):
+        self.watcher.connection = FakeConnection(mailbox, **kwargs)
+
+    def test_first_run_takes_unread_mail_only(self):
+        mailbox = FakeMailbox(range(1, 5001), unseen=[4990, 5000])
+        self.connect(mailbox, uidnext=5001)
+        tasks = self.watcher.check_new_emails()
+
+        self.assertEqual(self.fetched, [4990, 5000])
+        self.assertEqual(len(tasks), 2)
+        self.assertNotIn('UID 1:*', mailbox.searches)
+        self.assertEqual(self.watcher.load_state(), {'uidvalidity': 7, 'last_uid': 5000})
+
+    def test_first_run_starts_after_newest_message(self):
+        mailbox = FakeMailbox(range(1, 101), unseen=[])
+        self.connect(mailbox, uidnext=101)
+        self.assertEqual(self.watcher.check_new_emails(), [])
+        self.assertEqual(self.watcher.state['last_uid'], 100)
+
+        mailbox.uids.extend([101, 102])
+        self.watcher.check_new_emails()
+        self.assertEqual(mailbox.searches[-1], 'UID 101:*')
+        self.assertEqual(self.fetched, [101, 102])
+        self.assertEqual(self.watcher.state['last_uid'], 102)
+
+    def test_seed_without_uidnext(self):
+        mailbox = FakeMailbox(range(1, 51), unseen=[10])
+        self.connect(mailbox)
+        self.watcher.check_new_emails()
+        self.assertEqual(self.fetched, [10])
+        self.assertEqual(self.watcher.state['last_uid'], 50)
+
+    def test_new_uidvalidity_reseeds(self):
+        self.watcher.state = {'uidvalidity': 6, 'last_uid': 3}
+        mailbox = FakeMailbox(range(1, 301), unseen=[299])
+        self.connect(mailbox, uidnext=301)
+        self.watcher.check_new_emails()
+        self.assertEqual(self.fetched, [299])
+        self.assertEqual(self.watcher.state, {'uidvalidity': 7, 'last_uid': 300})
+
+    def test_saved_position_is_resumed(self):
+        self.watcher.state = {'uidvalidity': 7, 'last_uid': 40}
+        mailbox = FakeMailbox(range(1, 46), unseen=[2])
+        self.connect(mailbox, uidnext=46)
+        self.watcher.check_new_emails()
+        self.assertEqual(mailbox.searches, ['UID 41:*'])
+        self.assertEqual(self.fetched, [41, 42, 43, 44, 45])
+
+    def test_bad_message_is_skipped_and_position_moves_past_it(self):
+        self.watcher.state = {'uidvalidity': 7, 'last_uid': 10}
+        create_email_task = self.watcher.create_email_task
+
+        def fail_on_12(uid, headers, body):
+            if uid == 12:
+                raise ValueError('malformed header')
+            return create_email_task(uid, headers, body)
+
+        self.watcher.create_email_task = fail_on_12
+        self.connect(FakeMailbox(range(1, 15), unseen=[]), uidnext=15)
+        tasks = self.watcher.check_new_emails()
+
+        self.assertEqual(len(tasks), 3)
+        self.assertEqual(self.watcher.load_state()['last_uid'], 14)
+        self.assertTrue(all(path.read_text(encoding='utf-8').startswith('---') for path in tasks))
+
+    def test_unparseable_page_is_fetched_one_uid_at_a_time(self):
+        self.watcher.state = {'uidvalidity': 7, 'last_uid': 20}
+
+        def fetch_page(mail, uids):
+            if len(uids) > 1 or uids == [22]:
+                raise IndexError('unbalanced FETCH response')
+            return self.fake_fetch_page(mail, uids)
+
+        self.watcher.fetch_page = fetch_page
+        self.connect(FakeMailbox(range(1, 24), unseen=[]), uidnext=24)
+        tasks = self.watcher.check_new_emails()
+
+        self.assertEqual(self.fetched, [21, 23])
+        self.assertEqual(len(tasks), 2)
+        self.assertEqual(self.watcher.load_state()['last_uid'], 23)
+
+
+if __name__ == '__main__':
+    unittest.main()
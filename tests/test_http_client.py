@@ -0,0 +1,264 @@
+"""
+Tests - HTTP Client
+Retry-After handling and token bucket pacing, against a fake session and a local HTTP server
+"""
+import threading
+import unittest
+import urllib.error
+import urllib.request
+from unittest import mock
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import rate_limiter
+from rate_limiter import TokenBucket
+from support import http_stand_ins, import_with_http_stand_ins
+
+REQUESTS_INSTALLED = not http_stand_ins()
+
+
+class FakeClock:
+    """Stands in for the time module: sleep() advances monotonic() instantly"""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += max(0, seconds)
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class FakeSession:
+    """Returns queued responses in order and records every request"""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = []
+
+    def request(self, method, url, **kwargs):
+        self.calls.append((method, url, kwargs))
+        return self.responses.pop(0)
+
+
+def http_date(seconds_from_now):
+    return format_datetime(datetime.now(timezone.utc) + timedelta(seconds=seconds_from_now), usegmt=True)
+
+
+class ParseRetryAfterTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        http_client, = import_with_http_stand_ins(cls, 'http_client')
+        cls.parse_retry_after = staticmethod(http_client.parse_retry_after)
+
+    def test_delta_seconds(self):
+        self.assertEqual(self.parse_retry_after('120'), 120.0)
+        self.assertEqual(self.parse_retry_after(' 7 '), 7.0)
+
+    def test_http_date(self):
+        self.assertAlmostEqual(self.parse_retry_after(http_date(30)), 30, delta=2)
+
+    def test_http_date_in_the_past(self):
+        self.assertEqual(self.parse_retry_after(http_date(-60)), 0.0)
+
+    def test_missing_or_invalid(self):
+        self.assertIsNone(self.parse_retry_after(None))
+        self.assertIsNone(self.parse_retry_after(''))
+        self.assertIsNone(self.parse_retry_after('soon'))
+
+
+class HttpClientRetryTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.http_client, = import_with_http_stand_ins(cls, 'http_client')
+
+    def setUp(self):
+        self.clock = FakeClock()
+        for module in (self.http_client, rate_limiter):
+            patcher = mock.patch.object(module, 'time', self.clock)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.client = self.http_client.HttpClient('test', rate_limit=(100, 100), max_backoff=60)
+
+    def send(self, method, *responses, **kwargs):
+        session = FakeSession(*responses)
+        with mock.patch.object(self.client, 'session_for', return_value=session):
+            return self.client.request(method, 'https://api.example.com/items', **kwargs), session
+
+    def test_retry_after_seconds_on_503(self):
+        response, session = self.send('GET', FakeResponse(503, {'Retry-After': '12'}), FakeResponse(200))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(session.calls), 2)
+        self.assertIn(12.0, self.clock.sleeps)
+
+    def test_retry_after_http_date_on_503(self):
+        response, session = self.send('GET', FakeResponse(503, {'Retry-After': http_date(20)}), FakeResponse(200))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(any(18 <= wait <= 20 for wait in self.clock.sleeps), self.clock.sleeps)
+
+    def test_retry_after_is_capped(self):
+        self.send('GET', FakeResponse(503, {'Retry-After': '3600'}), FakeResponse(200))
+        self.assertIn(60.0, self.clock.sleeps)
+
+    def test_429_holds_back_the_bucket(self):
+        start = self.clock.now
+        response, session = self.send('POST', FakeResponse(429, {'Retry-After': '5'}), FakeResponse(201))
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(session.responses == [] and len(session.calls) == 2)
+        # The wait happens in the bucket, so the resend goes out no earlier than Retry-After
+        self.assertGreaterEqual(self.clock.now - start, 5)
+
+    def test_post_is_not_resent_after_500(self):
+        response, session = self.send('POST', FakeResponse(500), FakeResponse(201))
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(len(session.calls), 1)
+
+    def test_gives_up_after_max_retries(self):
+        self.client.max_retries = 2
+        response, session = self.send('GET', *[FakeResponse(503, {'Retry-After': '1'}) for _ in range(3)])
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(len(session.calls), 3)
+
+
+class ScriptedHandler(BaseHTTPRequestHandler):
+    """Answers each request with the next (status, headers) of the server's script"""
+
+    def respond(self):
+        self.server.received.append((self.command, self.path))
+        status, headers = self.server.script.pop(0)
+        body = b'{}'
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.respond()
+
+    do_GET = respond
+
+    def log_message(self, format, *args):
+        pass
+
+
+class UrllibResponse:
+    def __init__(self, status_code, headers):
+        self.status_code = status_code
+        self.headers = headers
+
+    def close(self):
+        pass
+
+
+class UrllibSession:
+    """Sends requests with urllib when the requests package is not installed"""
+
+    def request(self, method, url, timeout=None, data=None, json=None, **kwargs):
+        request = urllib.request.Request(url, data=data, method=method)
+        try:
+            with urllib.request.urlopen(request, timeout=timeout[-1]) as response:
+                return UrllibResponse(response.status, response.headers)
+        except urllib.error.HTTPError as e:
+            e.close()
+            return UrllibResponse(e.code, e.headers)
+
+
+class LocalServerRetryTest(unittest.TestCase):
+    """Retries against a real HTTP server on 127.0.0.1"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.http_client, = import_with_http_stand_ins(cls, 'http_client')
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), ScriptedHandler)
+        self.server.received = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.url = f'http://127.0.0.1:{self.server.server_port}/items'
+
+        # Real sockets, simulated waiting: Retry-After is recorded instead of slept
+        self.clock = FakeClock()
+        for module in (self.http_client, rate_limiter):
+            patcher = mock.patch.object(module, 'time', self.clock)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.client = self.http_client.HttpClient('test', rate_limit=(100, 100), max_backoff=60)
+        self.addCleanup(self.client.close)
+        if not REQUESTS_INSTALLED:
+            patcher = mock.patch.object(self.client, 'session_for', return_value=UrllibSession())
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_retry_after_from_a_real_server(self):
+        self.server.script = [(503, {'Retry-After': '7'}), (429, {'Retry-After': '3'}), (200, {})]
+        start = self.clock.now
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.server.received, [('GET', '/items')] * 3)
+        self.assertIn(7.0, self.clock.sleeps)
+        self.assertGreaterEqual(self.clock.now - start, 10)
+
+
+class TokenBucketTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = mock.patch.object(rate_limiter, 'time', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_burst_then_blocks(self):
+        bucket = TokenBucket(rate=2, capacity=3)
+        for _ in range(3):
+            self.assertTrue(bucket.acquire())
+        self.assertEqual(self.clock.sleeps, [])
+        self.assertFalse(bucket.try_acquire())
+
+        self.assertTrue(bucket.acquire())
+        self.assertAlmostEqual(sum(self.clock.sleeps), 0.5)
+
+    def test_acquire_times_out_when_empty(self):
+        bucket = TokenBucket(rate=0.1, capacity=1)
+        self.assertTrue(bucket.acquire())
+        self.assertFalse(bucket.acquire(timeout=2))
+        self.assertAlmostEqual(sum(self.clock.sleeps), 2)
+
+    def test_refills_up_to_capacity(self):
+        bucket = TokenBucket(rate=1, capacity=2)
+        bucket.acquire(2)
+        self.clock.now += 60
+        self.assertTrue(bucket.try_acquire(2))
+        self.assertFalse(bucket.try_acquire())
+
+    def test_penalize_blocks_for_the_given_time(self):
+        bucket = TokenBucket(rate=1, capacity=5)
+        bucket.penalize(10)
+        self.assertFalse(bucket.try_acquire())
+        self.assertTrue(bucket.acquire())
+        self.assertAlmostEqual(sum(self.clock.sleeps), 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
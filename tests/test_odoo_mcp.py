@@ -0,0 +1,133 @@
+"""
+Tests - Odoo MCP
+Odoo approvals executed through the approval dispatcher against a fake JSON-RPC endpoint
+"""
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from support import FakeOdoo, import_with_http_stand_ins
+
+PACKAGE_DIR = Path(__file__).resolve().parent.parent
+SAMPLE_APPROVALS = PACKAGE_DIR / 'AI_Employee_Vault_Gold' / 'Pending_Approval'
+ODOO_CONFIG = {'url': 'http://odoo.test', 'database': 'test', 'api_key': 'key'}
+
+
+class OdooApprovalTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.odoo_mcp, cls.approval_dispatcher = import_with_http_stand_ins(
+            cls, 'odoo_mcp', 'approval_dispatcher')
+
+    def setUp(self):
+        self.vault = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.vault)
+        self.odoo = FakeOdoo()
+        self.mcp = self.odoo_mcp.OdooMCP(ODOO_CONFIG)
+        self.mcp.call_odoo_method = self.odoo
+        self.dispatcher = self.approval_dispatcher.ApprovalDispatcher(self.vault, retry_delay=3600, settle_delay=0)
+        self.dispatcher.register('odoo', lambda approval: self.mcp.handle_approval(approval, self.vault))
+        self.addCleanup(self.dispatcher.stop)
+
+    def approve(self, name, text=None):
+        path = self.vault / 'Approved' / name
+        if text is None:
+            shutil.copyfile(SAMPLE_APPROVALS / name, path)
+        else:
+            path.write_text(text, encoding='utf-8')
+        return path
+
+    def poll(self):
+        return self.dispatcher.start().poll()
+
+    def test_sample_payment_approval_records_payment(self):
+        self.approve('REQ_ACC_001_payment_approval.md')
+        self.assertEqual(self.poll(), [('REQ_ACC_001_payment_approval.md', True)])
+
+        self.assertTrue((self.vault / 'Done' / 'REQ_ACC_001_payment_approval.md').exists())
+        [payment] = self.odoo.created['account.payment']
+        self.assertEqual(payment['amount'], 1250.0)
+        self.assertIsNotNone(payment.get('partner_id'))
+        self.assertEqual(self.odoo.created['res.partner'], [{'name': 'Premium Client Inc.'}])
+        self.assertEqual(self.odoo.count('action_post'), 1)
+        self.assertNotIn('account.move', self.odoo.created)
+
+    def test_sample_invoice_approval_creates_invoice(self):
+        self.approve('REQ_INV_001_invoice_approval.md')
+        self.assertEqual(self.poll(), [('REQ_INV_001_invoice_approval.md', True)])
+
+        [invoice] = self.odoo.created['account.move']
+        self.assertEqual(invoice['move_type'], 'out_invoice')
+        self.assertEqual(invoice['invoice_line_ids'][0][2]['name'], 'Website redesign project')
+        self.assertNotIn('account.payment', self.odoo.created)
+
+    def test_unknown_action_is_an_explicit_failure(self):
+        self.approve('REQ_ODOO_002.md', '---\ntype: approval_request\naction: archive_odoo_records\n---\n')
+        self.assertEqual(self.poll(), [('REQ_ODOO_002.md', False)])
+
+        self.assertEqual(self.odoo.calls, [])
+        self.assertTrue((self.vault / 'In_Progress' / 'approvals' / 'REQ_ODOO_002.md').exists())
+        log = (self.vault / 'Logs').glob('*odoo*')
+        self.assertIn("unknown Odoo action 'archive_odoo_records'",
+                      ''.join(path.read_text(encoding='utf-8') for path in log))
+
+    def test_payment_without_amount_fails(self):
+        self.approve('REQ_ACC_002.md', '---\naction: record_payment_odoo\n---\n- **Client**: ACME\n')
+        self.assertEqual(self.poll(), [('REQ_ACC_002.md', False)])
+        self.assertNotIn('account.payment', self.odoo.created)
+
+
+
+class OdooBatchTest(OdooApprovalTest):
+    """A poll's Odoo approvals share their partner lookup and multi-record creates"""
+
+    def setUp(self):
+        super().setUp()
+        self.dispatcher.register_batch('odoo', lambda approvals: self.mcp.handle_approvals(approvals, self.vault))
+
+    def approve_many(self, invoices, payments):
+        for number in range(invoices):
+            self.approve(f'INV_{number:02}.md', f'---\naction: create_odoo_invoice\n---\n'
+                                                f'- **Customer**: Client {number % 3}\n- **Amount**: {100 + number}\n')
+        for number in range(payments):
+            self.approve(f'PAY_{number:02}.md', f'---\naction: record_payment_odoo\n---\n'
+                                                f'- **Client**: Client {number % 3}\n- **Amount**: $1,{number}00.00\n')
+
+    def test_rpc_count_does_not_grow_with_approvals(self):
+        self.approve_many(invoices=6, payments=4)
+        results = self.poll()
+
+        self.assertEqual(len(results), 10)
+        self.assertTrue(all(success for _, success in results))
+        # Two partner searches (cached, then uncached for the misses), one journal search per
+        # journal type, and one create each for partners, invoices and payments plus one post
+        self.assertEqual(self.odoo.count('search_read'), 4)
+        self.assertEqual(self.odoo.count('create'), 3)
+        self.assertEqual(self.odoo.count('action_post'), 1)
+        self.assertEqual(self.odoo.count(), 8)
+        self.assertEqual(len(self.odoo.created['res.partner']), 3)
+        self.assertEqual(len(self.odoo.created['account.move']), 6)
+        self.assertEqual(sorted(payment['amount'] for payment in self.odoo.created['account.payment']),
+                         [1000.0, 1100.0, 1200.0, 1300.0])
+
+    def test_known_partners_are_not_created(self):
+        self.odoo.partners = [{'id': number + 1, 'name': f'Client {number}', 'email': None} for number in range(3)]
+        self.approve_many(invoices=3, payments=3)
+        self.poll()
+
+        self.assertNotIn('res.partner', self.odoo.created)
+        self.assertEqual(self.odoo.count('search_read'), 3)
+        self.assertEqual(sorted(invoice['partner_id'] for invoice in self.odoo.created['account.move']), [1, 2, 3])
+
+    def test_failures_stay_per_approval(self):
+        self.approve_many(invoices=2, payments=0)
+        self.approve('ODOO_misc.md', '---\naction: archive_odoo_records\n---\n')
+        results = dict(self.poll())
+
+        self.assertEqual(results, {'INV_00.md': True, 'INV_01.md': True, 'ODOO_misc.md': False})
+        self.assertEqual(self.odoo.count('create'), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+"""
+Tests - Runtime
+Start-up order and lifetime of in-process components
+"""
+import asyncio
+import threading
+import time
+import unittest
+
+from runtime import Component, Runtime, Service
+
+
+class RuntimeTest(unittest.TestCase):
+    def run_briefly(self, components, seconds=0.3):
+        async def main():
+            task = asyncio.create_task(Runtime(components).run())
+            await asyncio.sleep(seconds)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        asyncio.run(main())
+
+    def test_every_factory_runs_before_the_first_step(self):
+        handlers = {}
+        seen_at_first_step = []
+
+        def slow_registration():
+            time.sleep(0.1)
+            handlers['odoo'] = object()
+            return Service(close=lambda: None)
+
+        def poll():
+            if not seen_at_first_step:
+                seen_at_first_step.append(set(handlers))
+            return False
+
+        self.run_briefly([Component('Approval Dispatcher', factory=lambda: Service(poll)),
+                          Component('Odoo MCP Server', factory=slow_registration)])
+        self.assertEqual(seen_at_first_step, [{'odoo'}])
+
+    def test_service_without_step_is_closed_only_when_the_runtime_stops(self):
+        closed = threading.Event()
+        steps = []
+
+        def step():
+            steps.append(closed.is_set())
+            return len(steps) < 3
+
+        self.run_briefly([Component('Email MCP Server', factory=lambda: Service(close=closed.set)),
+                          Component('Approval Dispatcher', factory=lambda: Service(step, interval=0.01))])
+        self.assertEqual(steps, [False, False, False])
+        self.assertTrue(closed.wait(1))
+
+
+if __name__ == '__main__':
+    unittest.main()
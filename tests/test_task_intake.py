@@ -0,0 +1,88 @@
+"""
+Tests - Task Intake
+Delivery of task files only once their writer has finished, from synthetic watchdog events and reconcile
+"""
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+
+from task_intake import IntakeEventHandler, TaskIntake
+
+SETTLE = 0.2
+
+
+def event(path, dest=None):
+    return SimpleNamespace(src_path=str(path), dest_path=str(dest) if dest else None, is_directory=False)
+
+
+class SettleTest(unittest.TestCase):
+    def setUp(self):
+        self.inbox = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.inbox)
+        self.intake = TaskIntake([self.inbox], settle_delay=SETTLE)
+        self.addCleanup(self.intake.stop)
+        self.handler = IntakeEventHandler(self.intake)
+
+    def delivered(self):
+        return [path.name for path in self.intake.get_tasks()]
+
+    def test_created_file_waits_until_writes_stop(self):
+        task = self.inbox / 'EMAIL_1.md'
+        with open(task, 'w', encoding='utf-8') as f:
+            f.write('---\ntype: email\n')
+            f.flush()
+            self.handler.on_created(event(task))
+            for line in range(3):
+                time.sleep(SETTLE / 2)
+                f.write(f'line {line}\n')
+                f.flush()
+                self.handler.on_modified(event(task))
+                self.assertEqual(self.delivered(), [])
+
+        time.sleep(SETTLE * 2)
+        self.assertEqual(self.delivered(), ['EMAIL_1.md'])
+        self.assertEqual(self.delivered(), [])
+
+    def test_close_after_write_delivers_at_once(self):
+        task = self.inbox / 'EMAIL_2.md'
+        task.write_text('done\n', encoding='utf-8')
+        self.handler.on_created(event(task))
+        self.handler.on_closed(event(task))
+        self.assertEqual(self.delivered(), ['EMAIL_2.md'])
+
+        time.sleep(SETTLE * 2)  # The settle timer was cancelled: no second delivery
+        self.assertEqual(self.delivered(), [])
+
+    def test_rename_into_the_folder_delivers_at_once(self):
+        temp = self.inbox / '.EMAIL_3.md.tmp'
+        temp.write_text('done\n', encoding='utf-8')
+        self.handler.on_created(event(temp))
+        os.replace(temp, self.inbox / 'EMAIL_3.md')
+        self.handler.on_moved(event(temp, self.inbox / 'EMAIL_3.md'))
+        self.assertEqual(self.delivered(), ['EMAIL_3.md'])
+
+    def test_deleted_before_settling_is_never_delivered(self):
+        task = self.inbox / 'EMAIL_4.md'
+        task.write_text('partial', encoding='utf-8')
+        self.handler.on_created(event(task))
+        task.unlink()
+        self.handler.on_deleted(event(task))
+        time.sleep(SETTLE * 2)
+        self.assertEqual(self.delivered(), [])
+
+    def test_reconcile_holds_back_a_fresh_file(self):
+        task = self.inbox / 'EMAIL_5.md'
+        task.write_text('partial', encoding='utf-8')
+        self.intake.reconcile()
+        self.assertEqual(self.delivered(), [])
+
+        time.sleep(SETTLE * 2)
+        self.assertEqual(self.delivered(), ['EMAIL_5.md'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+"""
+Tests - Task Lease
+Fencing tokens, reclaim grace and reclaim auditing for claims shared through the vault
+"""
+import json
+import shutil
+import tempfile
+import types
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import task_lease
+from task_lease import LeaseManager
+
+
+class LeaseTest(unittest.TestCase):
+    def setUp(self):
+        self.vault = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.vault)
+        self.now = 1_000_000.0
+        patcher = mock.patch.object(task_lease, 'time', types.SimpleNamespace(time=lambda: self.now))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.cloud = LeaseManager(self.vault, 'cloud-1', duration=600, grace=60)
+        self.other = LeaseManager(self.vault, 'cloud-2', duration=600, grace=60)
+        self.inbox = self.vault / 'Needs_Action' / 'email'
+        self.inbox.mkdir(parents=True)
+
+    def task(self, name='EMAIL_1.md'):
+        path = self.inbox / name
+        path.write_text('task\n', encoding='utf-8')
+        return path
+
+    def audit_entries(self):
+        lines = ''.join(path.read_text(encoding='utf-8') for path in (self.vault / 'Logs').glob('*.jsonl'))
+        return [json.loads(line) for line in lines.splitlines() if line.strip()]
+
+    def test_tokens_count_up_regardless_of_the_clock(self):
+        lease = self.cloud.claim(self.task())
+        self.assertEqual(lease.token, 1)
+        self.assertEqual(self.cloud.fence('EMAIL_1.md'), 1)
+
+        self.now += 661
+        self.cloud.reclaim_expired()
+        self.now -= 10_000  # A clock that went backwards still gets a newer token
+        self.assertEqual(self.other.claim(self.inbox / 'EMAIL_1.md').token, 2)
+
+    def test_stale_holder_is_fenced_off(self):
+        lease = self.cloud.claim(self.task())
+        self.now += 661
+        self.other.reclaim_expired()
+        newer = self.other.claim(self.inbox / 'EMAIL_1.md')
+
+        self.assertFalse(self.cloud.holds(lease))
+        self.assertIsNone(self.cloud.complete(lease, self.vault / 'Done'))
+        self.assertTrue(self.other.holds(newer))
+
+    def merge_competing_claim(self, manager, token):
+        """Write the claim another machine made before the last sync, as the merge leaves it"""
+        lease = task_lease.Lease(manager.agent_dir / 'EMAIL_1.md.lease', 'EMAIL_1.md', manager.agent, token,
+                                 self.now, self.now + 600, 'Needs_Action/email',
+                                 f'In_Progress/{manager.agent}/{manager.agent}_EMAIL_1.md')
+        manager._write_fence('EMAIL_1.md', token)
+        manager._write(lease)
+        (self.vault / lease.claimed).write_text('task\n', encoding='utf-8')
+        return lease
+
+    def test_newer_token_wins_a_sync_conflict(self):
+        mine = self.cloud.claim(self.task())
+        theirs = self.merge_competing_claim(self.other, 3)
+
+        self.assertFalse(self.cloud.holds(mine))
+        self.assertTrue(self.other.holds(theirs))
+        self.assertEqual(self.cloud.resolve_conflicts(), ['EMAIL_1.md'])
+        self.assertFalse((self.vault / mine.claimed).exists())
+
+    def test_equal_tokens_fall_back_to_agent_order(self):
+        mine = self.cloud.claim(self.task())
+        theirs = self.merge_competing_claim(self.other, 1)
+
+        self.assertTrue(self.cloud.holds(mine))
+        self.assertFalse(self.other.holds(theirs))
+
+    def test_reclaim_waits_for_the_grace_margin(self):
+        self.cloud.claim(self.task())
+        self.now += 600 + 59
+        self.assertEqual(self.other.reclaim_expired(), [])
+        self.now += 2
+        self.assertEqual(self.other.reclaim_expired(), ['EMAIL_1.md'])
+        self.assertTrue((self.inbox / 'EMAIL_1.md').exists())
+
+    def test_every_reclaim_is_audited(self):
+        self.cloud.claim(self.task())
+        self.now += 661
+        self.other.reclaim_expired()
+
+        [entry] = [entry for entry in self.audit_entries() if entry['action_type'] == 'lease_reclaim']
+        self.assertEqual(entry['actor'], 'cloud-2')
+        self.assertEqual(entry['target'], 'EMAIL_1.md')
+        self.assertEqual(entry['parameters']['holder'], 'cloud-1')
+        self.assertEqual(entry['parameters']['reason'], 'expired')
+        self.assertEqual(entry['result'], 'returned')
+
+    def test_completion_removes_the_fence(self):
+        lease = self.cloud.claim(self.task())
+        self.assertIsNotNone(self.cloud.complete(lease, self.vault / 'Done'))
+        self.assertEqual(self.cloud.fence('EMAIL_1.md'), 0)
+        self.assertEqual(sorted(path.name for path in self.cloud.agent_dir.iterdir()), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
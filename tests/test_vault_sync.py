@@ -0,0 +1,123 @@
+"""
+Tests - Vault Sync
+Sync cycles between two vault clones and a temporary local bare repository
+"""
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from vault_sync import BRANCH, VaultSync
+
+GIT_ENV = {'GIT_AUTHOR_NAME': 'Vault Test', 'GIT_AUTHOR_EMAIL': 'vault@example.com',
+           'GIT_COMMITTER_NAME': 'Vault Test', 'GIT_COMMITTER_EMAIL': 'vault@example.com',
+           'GIT_CONFIG_GLOBAL': os.devnull, 'GIT_CONFIG_NOSYSTEM': '1'}
+
+
+class RecordingSync(VaultSync):
+    """VaultSync that records the git subcommand of every call"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.commands = []
+
+    def git(self, *args, **kwargs):
+        self.commands.append(args[0])
+        return super().git(*args, **kwargs)
+
+
+@unittest.skipUnless(shutil.which('git'), 'git is not installed')
+class VaultSyncTest(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.dict(os.environ, GIT_ENV)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.root = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.root)
+
+        self.remote = self.root / 'remote.git'
+        subprocess.run(['git', 'init', '-q', '--bare', str(self.remote)], check=True)
+        self.cloud = self.vault('cloud')
+        (self.cloud.vault / 'Dashboard.md').write_text('# Dashboard\n', encoding='utf-8')
+        (self.cloud.vault / 'Needs_Action').mkdir()
+        (self.cloud.vault / 'Needs_Action' / 'task.md').write_text('task\n', encoding='utf-8')
+        self.cloud.setup_git_repo()
+
+        subprocess.run(['git', 'clone', '-q', '-b', BRANCH, str(self.remote), str(self.root / 'local')],
+                       check=True)
+        self.local = self.vault('local')
+
+    def vault(self, name):
+        path = self.root / name
+        path.mkdir(exist_ok=True)
+        return RecordingSync(path, str(self.remote))
+
+    def cycle(self, sync):
+        sync.commands = []
+        sync.run_sync_cycle()
+        return sync.commands
+
+    def remote_files(self):
+        result = subprocess.run(['git', '--git-dir', str(self.remote), 'ls-tree', '-r', '--name-only', BRANCH],
+                                capture_output=True, text=True, check=True)
+        return set(result.stdout.split())
+
+    def test_idle_cycle_neither_commits_nor_pushes(self):
+        self.cycle(self.cloud)
+        commands = self.cycle(self.cloud)
+
+        self.assertIn('ls-remote', commands)
+        for command in ('commit-tree', 'push', 'pull', 'fetch'):
+            self.assertNotIn(command, commands)
+
+    def test_dirty_path_is_committed_and_pushed(self):
+        self.cycle(self.cloud)
+        (self.cloud.vault / 'Needs_Action' / 'new.md').write_text('new\n', encoding='utf-8')
+        self.cloud.mark_dirty(self.cloud.vault / 'Needs_Action' / 'new.md')
+        commands = self.cycle(self.cloud)
+
+        self.assertEqual(commands.count('commit-tree'), 1)
+        self.assertEqual(commands.count('push'), 1)
+        self.assertIn('Needs_Action/new.md', self.remote_files())
+
+    def test_unchanged_remote_is_not_pulled(self):
+        self.cycle(self.local)
+        (self.local.vault / 'Done').mkdir()
+        (self.local.vault / 'Done' / 'report.md').write_text('done\n', encoding='utf-8')
+        commands = self.cycle(self.local)
+
+        self.assertIn('ls-remote', commands)
+        self.assertNotIn('pull', commands)
+        self.assertIn('Done/report.md', self.remote_files())
+
+    def test_diverged_histories_are_merged(self):
+        (self.cloud.vault / 'Plans').mkdir()
+        (self.cloud.vault / 'Plans' / 'cloud.md').write_text('cloud\n', encoding='utf-8')
+        self.cycle(self.cloud)
+        (self.local.vault / 'Done').mkdir()
+        (self.local.vault / 'Done' / 'local.md').write_text('local\n', encoding='utf-8')
+        commands = self.cycle(self.local)
+
+        self.assertIn('pull', commands)
+        self.assertTrue((self.local.vault / 'Plans' / 'cloud.md').exists())
+        self.assertTrue({'Plans/cloud.md', 'Done/local.md'} <= self.remote_files())
+
+    def test_competing_claims_merge_without_conflict(self):
+        # Both agents claim the same task by moving it into their own In_Progress folder
+        for sync, agent in ((self.cloud, 'cloud'), (self.local, 'local')):
+            claimed = sync.vault / 'In_Progress' / agent
+            claimed.mkdir(parents=True)
+            os.replace(sync.vault / 'Needs_Action' / 'task.md', claimed / 'task.md')
+        self.cycle(self.cloud)
+        self.cycle(self.local)
+
+        self.assertEqual(self.local.git('status', '--porcelain').stdout, '')
+        self.assertTrue({'In_Progress/cloud/task.md', 'In_Progress/local/task.md'} <= self.remote_files())
+        self.assertNotIn('Needs_Action/task.md', self.remote_files())
+
+
+if __name__ == '__main__':
+    unittest.main()
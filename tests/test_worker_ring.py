@@ -0,0 +1,80 @@
+"""
+Tests - Worker Ring
+Ring membership from worker.json registrations and co-hosted heartbeats
+"""
+import json
+import shutil
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from heartbeat import Heartbeat, heartbeat_path
+from worker_ring import WORKER_FILE, WorkerRing
+
+
+class WorkerRingTest(unittest.TestCase):
+    def setUp(self):
+        self.vault = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.vault)
+        self.ring = WorkerRing(self.vault, 'cloud-1', ttl=60)
+
+    def beat(self, worker, phase='waiting', expect_within=30):
+        heartbeat = Heartbeat(heartbeat_path(self.vault, worker), worker)
+        heartbeat.beat(phase, expect_within)
+        return heartbeat
+
+    def register(self, worker, host):
+        path = self.vault / 'In_Progress' / worker / WORKER_FILE
+        path.parent.mkdir(parents=True)
+        path.write_text(json.dumps({'worker': worker, 'host': host}), encoding='utf-8')
+        return path
+
+    def test_idle_refresh_leaves_the_registration_untouched(self):
+        self.ring.refresh()
+        before = self.ring.path.stat().st_mtime_ns
+        time.sleep(0.01)
+        for _ in range(5):
+            self.assertEqual(self.ring.refresh(), (set(), set()))
+
+        self.assertEqual(self.ring.path.stat().st_mtime_ns, before)
+        self.assertFalse(self.ring.register())
+
+    def test_registration_is_rewritten_after_it_disappears(self):
+        self.ring.refresh()
+        self.ring.path.unlink()
+        self.ring.refresh()
+        self.assertTrue(self.ring.path.exists())
+
+    def test_live_cohosted_worker_joins(self):
+        self.beat('cloud-2')
+        self.register('cloud-2', self.ring.host)
+        self.assertEqual(self.ring.refresh(), ({'cloud-2'}, set()))
+        self.assertEqual(self.ring.ring.workers, {'cloud-1', 'cloud-2'})
+
+    def test_stopped_cohosted_worker_is_pruned(self):
+        self.beat('cloud-2')
+        path = self.register('cloud-2', self.ring.host)
+        self.ring.refresh()
+
+        self.beat('cloud-2').close()
+        joined, left = self.ring.refresh()
+        self.assertEqual(left, {'cloud-2'})
+        self.assertFalse(path.exists())
+
+    def test_silent_cohosted_worker_is_pruned_after_ttl(self):
+        heartbeat = self.beat('cloud-2', expect_within=30)
+        self.register('cloud-2', self.ring.host)
+        deadline = heartbeat._state['deadline']
+
+        self.assertIn('cloud-2', self.ring.members(now=deadline + 59))
+        self.assertNotIn('cloud-2', self.ring.members(now=deadline + 61))
+
+    def test_remote_worker_stays_without_a_local_heartbeat(self):
+        path = self.register('cloud-9', 'other-host')
+        self.assertEqual(self.ring.refresh()[0], {'cloud-9'})
+        self.assertTrue(path.exists())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,11 +3,11 @@ Gold Tier - Twitter/X MCP Server
 Handles Twitter/X operations via API v2
 """
 import os
-import json
-import requests
-import time
 from pathlib import Path
 from datetime import datetime
+from audit_log import get_audit_log
+from approval_dispatcher import get_approval_dispatcher
+from http_client import HttpClient
 
 class TwitterMCP:
     def __init__(self, config):
@@ -18,6 +18,7 @@ class TwitterMCP:
             'Authorization': f'Bearer {self.bearer_token}',
             'Content-Type': 'application/json'
         }
+        self.http = HttpClient.from_config('twitter', config, headers=self.headers)
         self.running = True
         
     def post_tweet(self, text, reply_to_id=None):
@@ -32,7 +33,7 @@ class TwitterMCP:
             data['reply'] = {'in_reply_to_tweet_id': reply_to_id}
         
         try:
-            response = requests.post(url, headers=self.headers, json=data)
+            response = self.http.post(url, json=data)
             result = response.json()
             
             if 'data' in result and 'id' in result['data']:
@@ -50,7 +51,7 @@ class TwitterMCP:
         url = f"{self.base_url}/users/by/username/{username}"
         
         try:
-            response = requests.get(url, headers=self.headers)
+            response = self.http.get(url)
             result = response.json()
             
             if 'data' in result:
@@ -63,127 +64,80 @@ class TwitterMCP:
             print(f"[TWITTER_MCP] Error getting user info: {e}")
             return None
     
-    def monitor_approvals(self, vault_path):
-        """Monitor the Approved folder for Twitter/X tasks"""
-        vault = Path(vault_path)
-        approved_dir = vault / 'Approved'
+    def register_approvals(self, vault_path):
+        """Register the Twitter/X handler with the vault's shared approval dispatcher, once at startup"""
+        dispatcher = get_approval_dispatcher(vault_path)
+        dispatcher.register('twitter', lambda approval: self.handle_approval(approval, vault_path))
+        return dispatcher
+
+    def handle_approval(self, approval, vault_path):
+        """Post one approved Twitter/X task; the dispatcher moves it to Done on success"""
+        approval_file = approval.path
         
-        if not approved_dir.exists():
-            approved_dir.mkdir(parents=True, exist_ok=True)
-            return []
+        print(f"[TWITTER_MCP] Processing Twitter/X approval: {approval_file.name}")
         
-        # Find Twitter/X approval files
-        twitter_approvals = []
-        for file in approved_dir.glob('*twitter*'):
-            if file.suffix == '.md':
-                twitter_approvals.append(file)
+        tweet_text = approval.payload
         
-        for file in approved_dir.glob('*x*'):
-            if file.suffix == '.md':
-                twitter_approvals.append(file)
+        if tweet_text.strip():
+            # Post the tweet to Twitter/X
+            tweet_id = self.post_tweet(tweet_text)
         
-        return twitter_approvals
-    
-    def process_twitter_approvals(self, vault_path):
-        """Process approved Twitter/X tasks"""
-        approvals = self.monitor_approvals(vault_path)
+            if tweet_id:
+                result = {
+                    'status': 'success',
+                    'operation': 'tweet_posted',
+                    'tweet_id': tweet_id,
+                    'file_processed': approval_file.name
+                }
         
-        for approval_file in approvals:
-            # Read the approval file to extract details
-            content = approval_file.read_text()
-            
-            print(f"[TWITTER_MCP] Processing Twitter/X approval: {approval_file.name}")
-            
-            # Extract tweet content from the approval file (simplified parsing)
-            lines = content.split('\n')
-            tweet_text = ""
-            collecting_tweet = False
-            
-            for line in lines:
-                if 'Post Draft' in line:
-                    collecting_tweet = True
-                elif collecting_tweet and line.startswith('"Thanks for the great question!'):
-                    tweet_text = line
-                    break
-                elif collecting_tweet and line.startswith('##'):
-                    collecting_tweet = False
-                elif collecting_tweet and not line.startswith('##'):
-                    tweet_text += line + " "
-            
-            if tweet_text.strip():
-                # Clean up the tweet text
-                tweet_text = tweet_text.strip().strip('"')
-                
-                # Post the tweet to Twitter/X
-                tweet_id = self.post_tweet(tweet_text)
-                
-                if tweet_id:
-                    result = {
-                        'status': 'success',
-                        'operation': 'tweet_posted',
-                        'tweet_id': tweet_id,
-                        'file_processed': approval_file.name
-                    }
-                    
-                    # Log the result
-                    self.log_operation(result, vault_path)
-                    
-                    # Move processed file to Done
-                    done_dir = Path(vault_path) / 'Done'
-                    done_dir.mkdir(exist_ok=True)
-                    approval_file.rename(done_dir / approval_file.name)
-                    
-                    print(f"[TWITTER_MCP] Posted tweet: {tweet_id}")
-                else:
-                    print(f"[TWITTER_MCP] Failed to post tweet")
+                # Log the result
+                self.log_operation(result, vault_path)
+
+                print(f"[TWITTER_MCP] Posted tweet: {tweet_id}")
+                return True
             else:
-                print(f"[TWITTER_MCP] No tweet content found in approval file: {approval_file.name}")
+                print(f"[TWITTER_MCP] Failed to post tweet")
+        else:
+            print(f"[TWITTER_MCP] No tweet content found in approval file: {approval_file.name}")
+        return False
     
     def log_operation(self, result, vault_path):
-        """Log the operation to the appropriate log file"""
-        logs_dir = Path(vault_path) / 'Logs'
-        logs_dir.mkdir(exist_ok=True)
-        today = datetime.now().strftime('%Y-%m-%d')
-        log_file = logs_dir / f'{today}_twitter.json'
-        
-        # Read existing logs or create new
-        if log_file.exists():
-            with open(log_file, 'r') as f:
-                logs = json.load(f)
-        else:
-            logs = []
-        
-        logs.append({
+        """Append the operation to the twitter audit log stream"""
+        audit_log = get_audit_log(Path(vault_path) / 'Logs', 'twitter')
+        audit_log.append({
             'timestamp': datetime.now().isoformat(),
             'action': result['operation'],
             'file': result['file_processed'],
             'status': result['status'],
             'details': result
         })
-        
-        with open(log_file, 'w') as f:
-            json.dump(logs, f, indent=2)
     
     def run(self, vault_path):
         """Main MCP server loop"""
         print(f"[TWITTER_MCP] Twitter/X MCP Server started.")
         print(f"[TWITTER_MCP] Monitoring for approved Twitter/X tasks...")
         
+        dispatcher = self.register_approvals(vault_path)
         try:
             while self.running:
-                self.process_twitter_approvals(vault_path)
-                time.sleep(30)  # Check every 30 seconds
+                dispatcher.poll()
+                # Wake as soon as an approval lands, at the latest after 30 seconds
+                dispatcher.wait(30)
         except KeyboardInterrupt:
             print("[TWITTER_MCP] Twitter/X MCP Server stopped by user")
 
-if __name__ == "__main__":
-    # Load Twitter/X configuration from environment
+def config_from_env():
+    """Read the Twitter/X MCP configuration from the environment (.env)"""
     import dotenv
     dotenv.load_dotenv()
-    
-    config = {
+
+    return {
         'bearer_token': os.getenv('TWITTER_BEARER_TOKEN', 'your_bearer_token_here'),
     }
+
+if __name__ == "__main__":
+    # Load Twitter/X configuration from environment
+    config = config_from_env()
     
     if not config['bearer_token'] or config['bearer_token'] == 'your_bearer_token_here':
         print("[WARNING] Twitter/X bearer token not found in .env file. Please configure TWITTER_BEARER_TOKEN.")
@@ -0,0 +1,173 @@
+"""
+Shared - Vault Index
+Persistent SQLite index of task files per vault folder, used for dashboard counts
+"""
+import os
+import time
+import sqlite3
+import threading
+from pathlib import Path
+
+DEFAULT_FULL_RESCAN_INTERVAL = None  # Seconds before a folder is rescanned regardless of mtime; None = never
+
+
+class VaultIndex:
+    """Tracks the task files in each vault folder and answers counts in O(1).
+
+    A folder is only rescanned when its directory mtime changes (a file was
+    added, removed or renamed). Set full_rescan_interval to also rescan on a
+    timer, as a safety net on filesystems with coarse directory mtimes.
+    Moves made through move() update the index in place, so the orchestrator's
+    own moves into Done/ never trigger a rescan of that ever-growing folder.
+    """
+
+    def __init__(self, vault_path, db_path=None, suffix='.md',
+                 full_rescan_interval=DEFAULT_FULL_RESCAN_INTERVAL):
+        self.vault = Path(vault_path)
+        self.suffix = suffix
+        self.full_rescan_interval = full_rescan_interval
+        if db_path is None:
+            cache_dir = self.vault / '.cache'
+            cache_dir.mkdir(exist_ok=True)
+            db_path = cache_dir / 'vault_index.sqlite3'
+        self._lock = threading.Lock()
+        self.db = sqlite3.connect(str(db_path), check_same_thread=False)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS files (
+                folder TEXT NOT NULL,
+                name TEXT NOT NULL,
+                state TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                PRIMARY KEY (folder, name)
+            );
+            CREATE TABLE IF NOT EXISTS folders (
+                folder TEXT PRIMARY KEY,
+                state TEXT NOT NULL,
+                dir_mtime_ns INTEGER NOT NULL,
+                file_count INTEGER NOT NULL,
+                scanned_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS files_state ON files (state);
+        """)
+        self.db.commit()
+
+    @classmethod
+    def from_config(cls, vault_path, config):
+        """Build an index from the optional `vault_index` section of system_config.json"""
+        index_config = config.get('vault_index', {})
+        return cls(
+            vault_path,
+            full_rescan_interval=index_config.get('full_rescan_interval', DEFAULT_FULL_RESCAN_INTERVAL)
+        )
+
+    def _folder_key(self, folder):
+        """Vault-relative folder name, e.g. 'Needs_Action/email'"""
+        folder = Path(folder)
+        if folder.is_absolute():
+            folder = folder.relative_to(self.vault)
+        return folder.as_posix()
+
+    @staticmethod
+    def _state(folder_key):
+        """Workflow state of a folder: its top-level vault directory"""
+        return folder_key.split('/', 1)[0]
+
+    def _dir_mtime(self, folder_key):
+        try:
+            return os.stat(self.vault / folder_key).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def refresh(self, folder):
+        """Rescan one folder and store the differences"""
+        key = self._folder_key(folder)
+        directory = self.vault / key
+        with self._lock:
+            dir_mtime = self._dir_mtime(key)
+            if dir_mtime is None:
+                self.db.execute('DELETE FROM files WHERE folder = ?', (key,))
+                self.db.execute('DELETE FROM folders WHERE folder = ?', (key,))
+                self.db.commit()
+                return 0
+
+            on_disk = {}
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.name.endswith(self.suffix) and entry.is_file():
+                        stat = entry.stat()
+                        on_disk[entry.name] = (stat.st_size, stat.st_mtime_ns)
+
+            indexed = {
+                name: (size, mtime_ns) for name, size, mtime_ns in self.db.execute(
+                    'SELECT name, size, mtime_ns FROM files WHERE folder = ?', (key,))
+            }
+            removed = [(key, name) for name in indexed.keys() - on_disk.keys()]
+            changed = [(key, name, self._state(key), size, mtime_ns)
+                       for name, (size, mtime_ns) in on_disk.items()
+                       if indexed.get(name) != (size, mtime_ns)]
+
+            self.db.executemany('DELETE FROM files WHERE folder = ? AND name = ?', removed)
+            self.db.executemany('INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?)', changed)
+            self.db.execute('INSERT OR REPLACE INTO folders VALUES (?, ?, ?, ?, ?)',
+                            (key, self._state(key), dir_mtime, len(on_disk), time.time()))
+            self.db.commit()
+            return len(on_disk)
+
+    def count(self, folder):
+        """Number of task files in a folder"""
+        key = self._folder_key(folder)
+        with self._lock:
+            row = self.db.execute(
+                'SELECT dir_mtime_ns, file_count, scanned_at FROM folders WHERE folder = ?',
+                (key,)).fetchone()
+            dir_mtime = self._dir_mtime(key)
+        if dir_mtime is None:
+            return 0 if row is None else self.refresh(key)
+        if (row is not None and row[0] == dir_mtime
+                and (self.full_rescan_interval is None or time.time() - row[2] < self.full_rescan_interval)):
+            return row[1]
+        return self.refresh(key)
+
+    def count_all(self, *folders):
+        """Sum of the counts of several folders"""
+        return sum(self.count(folder) for folder in folders)
+
+    def move(self, source, destination):
+        """Rename a file and update the index without rescanning either folder"""
+        source, destination = Path(source), Path(destination)
+        src_key = self._folder_key(source.parent)
+        dst_key = self._folder_key(destination.parent)
+
+        with self._lock:
+            before = {key: self._dir_mtime(key) for key in (src_key, dst_key)}
+            source.rename(destination)
+            after = {key: self._dir_mtime(key) for key in (src_key, dst_key)}
+
+            stat = destination.stat()
+            tracked = source.suffix == self.suffix
+            deltas = {src_key: -1}
+            deltas[dst_key] = deltas.get(dst_key, 0) + 1
+            for key, delta in deltas.items():
+                row = self.db.execute('SELECT dir_mtime_ns FROM folders WHERE folder = ?',
+                                      (key,)).fetchone()
+                if row is None or row[0] != before[key]:
+                    continue  # Folder changed behind our back; the next count() rescans it
+                self.db.execute(
+                    'UPDATE folders SET dir_mtime_ns = ?, file_count = file_count + ? WHERE folder = ?',
+                    (after[key], delta if tracked else 0, key))
+
+            if tracked:
+                self.db.execute('DELETE FROM files WHERE folder = ? AND name = ?',
+                                (src_key, source.name))
+                self.db.execute('INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?)',
+                                (dst_key, destination.name, self._state(dst_key),
+                                 stat.st_size, stat.st_mtime_ns))
+            self.db.commit()
+        return destination
+
+    def close(self):
+        with self._lock:
+            self.db.close()
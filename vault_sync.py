@@ -2,38 +2,116 @@
 Platinum Tier - Vault Sync Script
 Synchronizes vault between cloud and local agents using Git
 """
-import os
 import time
+import threading
 import subprocess
 from pathlib import Path
 from datetime import datetime
 
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+    WATCHDOG_AVAILABLE = True
+except ImportError:  # Fall back to `git status` on every cycle
+    Observer = None
+    FileSystemEventHandler = object
+    WATCHDOG_AVAILABLE = False
+
+BRANCH = 'main'
+
+
+class VaultChangeHandler(FileSystemEventHandler):
+    """Forwards watchdog events for the vault to VaultSync.mark_dirty"""
+
+    def __init__(self, sync):
+        self.sync = sync
+
+    def on_any_event(self, event):
+        if event.is_directory or event.event_type in ('opened', 'closed_no_write'):
+            return  # Reads do not change anything; git tracks files, not folders
+        for path in (getattr(event, 'src_path', None), getattr(event, 'dest_path', None)):
+            if path:
+                self.sync.mark_dirty(path)
+
+
 class VaultSync:
-    def __init__(self, vault_path, remote_repo_url):
-        self.vault = Path(vault_path)
+    """Syncs a vault with a git remote, touching only what changed.
+
+    File events mark vault paths dirty as they change, so a cycle stages
+    exactly those paths instead of scanning the whole tree, and commits
+    through write-tree/commit-tree, which reuse git's cached trees for
+    untouched folders. A cycle with no local changes and an unchanged
+    remote ref (checked with ls-remote) runs no pull, commit or push. All
+    changes since the previous cycle go into one commit. Git always runs
+    with cwd= set to the vault, never os.chdir.
+    """
+
+    def __init__(self, vault_path, remote_repo_url, sync_interval=60, branch=BRANCH):
+        self.vault = Path(vault_path).resolve()
         self.remote_repo = remote_repo_url
-        self.sync_interval = 60  # Sync every minute
+        self.branch = branch
+        self.sync_interval = sync_interval  # Sync every minute
         self.sync_active = True
-        
+        self._dirty = set()
+        self._full_scan = True  # Changes made while nobody was watching
+        self._lock = threading.Lock()
+        self._observer = None
+
+    def git(self, *args, check=True, input=None):
+        """Run a git command in the vault and return the completed process"""
+        return subprocess.run(['git', *args], cwd=str(self.vault), input=input,
+                              capture_output=True, text=True, check=check)
+
+    def _rev_parse(self, ref):
+        """Object id of a ref, or None if it does not exist"""
+        result = self.git('rev-parse', '--verify', '--quiet', ref, check=False)
+        return result.stdout.strip() or None
+
     def setup_git_repo(self):
         """Initialize git repo in vault if not exists"""
-        os.chdir(self.vault)
-        
         # Check if git repo exists
         if not (self.vault / '.git').exists():
             print("[SYNC] Initializing new Git repository in vault...")
-            subprocess.run(['git', 'init'], check=True)
-            subprocess.run(['git', 'remote', 'add', 'origin', self.remote_repo], check=True)
+            self.git('init')
+            self.git('remote', 'add', 'origin', self.remote_repo)
             
             # Create initial commit
-            subprocess.run(['git', 'add', '.'], check=True)
-            subprocess.run(['git', 'commit', '-m', 'Initial commit - Platinum Tier vault'], check=True)
-            subprocess.run(['git', 'branch', '-M', 'main'], check=True)
-            subprocess.run(['git', 'push', '-u', 'origin', 'main'], check=True)
+            self.git('add', '.')
+            self.git('commit', '-m', 'Initial commit - Platinum Tier vault')
+            self.git('branch', '-M', self.branch)
+            self.git('push', '-u', 'origin', self.branch)
             print("[SYNC] Git repository initialized and pushed to remote")
         else:
             print("[SYNC] Git repository already exists")
-    
+
+    def start_watching(self):
+        """Track changed paths from file events; without watchdog every cycle runs git status"""
+        if not WATCHDOG_AVAILABLE or self._observer is not None:
+            return
+        self._observer = Observer()
+        self._observer.schedule(VaultChangeHandler(self), str(self.vault), recursive=True)
+        self._observer.start()
+
+    def stop_watching(self):
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
+
+    def mark_dirty(self, path):
+        """Record a vault path as changed since the last commit"""
+        try:
+            relative = Path(path).resolve().relative_to(self.vault)
+        except ValueError:
+            return
+        if not relative.parts or relative.parts[0] in ('.git', '.cache'):
+            return
+        name = relative.name
+        if (name.startswith('.') and name != '.gitignore') or name.endswith(('.tmp', '~')):
+            return  # Editor swap files and atomic-write temporaries
+        with self._lock:
+            self._dirty.add(relative.as_posix())
+
     def configure_gitignore(self):
         """Configure .gitignore to exclude sensitive files"""
         gitignore_path = self.vault / '.gitignore'
@@ -67,6 +145,7 @@ class VaultSync:
             'config_local/',
             
             # Cache files
+            '.cache/',
             '__pycache__/',
             '*.pyc',
             '*.pyo',
@@ -90,71 +169,138 @@ class VaultSync:
             '*.temp'
         ]
         
-        gitignore_content = '\n'.join(sensitive_patterns) + '\n'
+        existing = set(gitignore_path.read_text().splitlines()) if gitignore_path.exists() else set()
+        missing = [pattern for pattern in sensitive_patterns if pattern not in existing]
         
-        # Write or append to gitignore
-        with open(gitignore_path, 'a') as f:
-            f.write(gitignore_content)
+        # Append only patterns not already present so restarts do not grow the file
+        if missing:
+            with open(gitignore_path, 'a') as f:
+                f.write('\n'.join(missing) + '\n')
         
         print("[SYNC] .gitignore configured to exclude sensitive files")
     
-    def sync_pull(self):
-        """Pull latest changes from remote"""
+    def collect_changes(self):
+        """Take the set of changed paths, falling back to a full `git status` when needed"""
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            full_scan, self._full_scan = self._full_scan or self._observer is None, False
+        if full_scan:
+            result = self.git('status', '--porcelain', '-z', '--untracked-files=all')
+            entries = result.stdout.split('\0')
+            index = 0
+            while index < len(entries):
+                entry = entries[index]
+                index += 1
+                if len(entry) > 3:
+                    dirty.add(entry[3:])
+                    if entry[0] in 'RC':
+                        dirty.add(entries[index])  # Rename source follows the entry
+                        index += 1
+        return dirty
+
+    def stage(self, paths):
+        """Stage additions, edits and deletions for exactly these paths"""
+        present = [path for path in paths if (self.vault / path).exists()]
+        missing = [path for path in paths if not (self.vault / path).exists()]
+        if present:
+            result = self.git('add', '-A', '--pathspec-from-file=-', '--pathspec-file-nul',
+                              input='\0'.join(present), check=False)
+            # Ignored paths are reported but everything else is still staged
+            if result.returncode != 0 and 'ignored by one of your .gitignore files' not in result.stderr:
+                raise subprocess.CalledProcessError(result.returncode, result.args, result.stdout, result.stderr)
+        if missing:
+            self.git('rm', '-r', '-q', '--cached', '--ignore-unmatch', '--pathspec-from-file=-',
+                     '--pathspec-file-nul', input='\0'.join(missing))
+
+    def commit_staged(self, message):
+        """Commit the index if it differs from HEAD; returns the new commit or None"""
+        # write-tree reuses cached subtrees, so untouched folders (e.g. 50k files in Done/) cost nothing
+        tree = self.git('write-tree').stdout.strip()
+        parent = self._rev_parse('HEAD')
+        if parent and self._rev_parse('HEAD^{tree}') == tree:
+            return None
+        args = ['commit-tree', tree, '-m', message] + (['-p', parent] if parent else [])
+        commit = self.git(*args).stdout.strip()
+        self.git('update-ref', 'HEAD', commit, *([parent] if parent else []))
+        return commit
+
+    def contains(self, commit):
+        """True if `commit` is already part of the local branch (a local check, no network)"""
+        return self.git('merge-base', '--is-ancestor', commit, 'HEAD', check=False).returncode == 0
+
+    def remote_head(self):
+        """Commit the remote branch points at, via ls-remote (no objects are transferred)"""
+        result = self.git('ls-remote', 'origin', f'refs/heads/{self.branch}')
+        return result.stdout.split()[0] if result.stdout.strip() else None
+
+    def sync_pull(self, remote_head=None):
+        """Pull latest changes from remote, skipping the fetch when the remote has not moved"""
         try:
-            os.chdir(self.vault)
-            result = subprocess.run(['git', 'pull', 'origin', 'main'], 
-                                  capture_output=True, text=True, check=True)
+            remote_head = remote_head or self.remote_head()
+            if remote_head is None or self.contains(remote_head):
+                return False
+            # The resolve strategy does no rename detection, so two agents claiming the same task
+            # (two moves of one file into different In_Progress folders) merge cleanly instead of
+            # as a rename/rename conflict; task_lease then settles which claim wins
+            result = self.git('pull', '--no-rebase', '--no-edit', '-s', 'resolve', 'origin', self.branch)
             print(f"[SYNC] Pulled changes: {result.stdout[:100]}...")
             return True
         except subprocess.CalledProcessError as e:
-            print(f"[SYNC] Pull failed: {e.stderr}")
+            print(f"[SYNC] Pull failed: {e.stderr or e.stdout}")
+            # Never leave a half-finished merge behind; the next cycle tries again
+            self.git('merge', '--abort', check=False)
             return False
-    
+
+    def commit_changes(self):
+        """Stage the paths changed since the last cycle and commit them as one batch"""
+        changes = self.collect_changes()
+        if not changes:
+            return None
+        try:
+            self.stage(sorted(changes))
+            commit_msg = f"Auto-sync at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} ({len(changes)} path(s))"
+            return commit_msg if self.commit_staged(commit_msg) else None
+        except subprocess.CalledProcessError:
+            with self._lock:
+                self._full_scan = True  # Nothing is lost: the next cycle re-scans
+            raise
+
     def sync_push(self):
-        """Push local changes to remote"""
+        """Commit local changes and push if the remote is behind"""
         try:
-            os.chdir(self.vault)
-            
-            # Check for changes
-            result = subprocess.run(['git', 'status', '--porcelain'], 
-                                  capture_output=True, text=True, check=True)
+            commit_msg = self.commit_changes()
             
-            if result.stdout.strip():  # If there are changes
-                # Add all changes
-                subprocess.run(['git', 'add', '.'], check=True)
-                
-                # Commit changes
-                commit_msg = f"Auto-sync at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
-                subprocess.run(['git', 'commit', '-m', commit_msg], check=True)
-                
-                # Push to remote
-                subprocess.run(['git', 'push', 'origin', 'main'], check=True)
-                
-                print(f"[SYNC] Changes pushed: {commit_msg}")
-                return True
-            else:
+            head = self._rev_parse('HEAD')
+            if head is None or head == self._rev_parse(f'refs/remotes/origin/{self.branch}'):
                 print("[SYNC] No changes to push")
                 return False
+            
+            # Push to remote
+            self.git('push', 'origin', f'HEAD:refs/heads/{self.branch}')
+            self.git('update-ref', f'refs/remotes/origin/{self.branch}', head)
+            print(f"[SYNC] Changes pushed: {commit_msg or head[:10]}")
+            return True
         except subprocess.CalledProcessError as e:
             print(f"[SYNC] Push failed: {e.stderr}")
             return False
     
     def run_sync_cycle(self):
-        """Perform one sync cycle (pull then push)"""
+        """Perform one sync cycle (commit, pull if the remote moved, then push)"""
         print(f"[SYNC] Starting sync cycle at {datetime.now()}")
         
-        # First pull latest changes
+        # Commit first so the pull merges local work instead of refusing to overwrite it
+        try:
+            self.commit_changes()
+        except subprocess.CalledProcessError as e:
+            print(f"[SYNC] Commit failed: {e.stderr}")
         pull_success = self.sync_pull()
-        
-        # Then push local changes
         push_success = self.sync_push()
         
         if pull_success or push_success:
             print("[SYNC] Sync cycle completed successfully")
-            return True
         else:
             print("[SYNC] Sync cycle completed (no changes)")
-            return True
+        return True
     
     def run(self):
         """Main sync loop"""
@@ -167,6 +313,7 @@ class VaultSync:
         # Setup git repo and ignore sensitive files
         self.setup_git_repo()
         self.configure_gitignore()
+        self.start_watching()
         
         try:
             while self.sync_active:
@@ -178,6 +325,8 @@ class VaultSync:
             self.sync_active = False
         except Exception as e:
             print(f"[SYNC] Error in Vault Sync: {e}")
+        finally:
+            self.stop_watching()
 
 if __name__ == "__main__":
     # This would be configured with the actual remote repository URL
@@ -7,6 +7,7 @@ import time
 from pathlib import Path
 from datetime import datetime
 import json
+from dedup_store import get_dedup_store, stable_digest, task_id
 
 class WhatsAppWatcher:
     def __init__(self, vault_path, whatsapp_config):
@@ -15,6 +16,14 @@ class WhatsAppWatcher:
         self.whatsapp_dir = self.vault_path / 'Watchers' / 'WhatsApp'
         self.whatsapp_dir.mkdir(exist_ok=True)
         self.last_check = time.time()
+        self.dedup = get_dedup_store(self.vault_path)
+
+    @staticmethod
+    def message_identity(msg_data):
+        """Stable identity of a message: its API id, else a hash of its content"""
+        if msg_data.get('id'):
+            return str(msg_data['id'])
+        return stable_digest(json.dumps(msg_data, sort_keys=True, default=str), length=32)
         
     def check_new_messages(self):
         """Simulate checking for new WhatsApp messages via API"""
@@ -31,9 +40,17 @@ class WhatsAppWatcher:
                 with open(msg_file, 'r') as f:
                     msg_data = json.load(f)
                 
+                # Processed inputs are moved here to prevent reprocessing
+                processed_dir = self.vault_path / 'Simulated_Inputs' / 'Processed'
+                processed_dir.mkdir(exist_ok=True)
+
+                identity = self.message_identity(msg_data)
+                if self.dedup.seen('whatsapp', identity):
+                    msg_file.rename(processed_dir / msg_file.name)
+                    continue
+
                 # Create task file for the message
-                msg_id = f"whatsapp_{int(time.time())}_{hash(str(msg_data)) % 10000}"
-                task_file = self.whatsapp_dir / f"{msg_id}.md"
+                task_file = self.whatsapp_dir / f"{task_id('whatsapp', identity)}.md"
                 
                 sender = msg_data.get('from', 'Unknown')
                 message_body = msg_data.get('body', 'No message body')
@@ -43,10 +60,8 @@ class WhatsAppWatcher:
                 priority_keywords = ['urgent', 'asap', 'immediately', 'critical']
                 priority = 'low'
                 msg_lower = message_body.lower()
-                for keyword in priority_keywords:
-                    if keyword in msg_lower:
-                        priority = 'high'
-                        break
+                if any(keyword in msg_lower for keyword in priority_keywords):
+                    priority = 'high'
                 elif 'meeting' in msg_lower or 'call' in msg_lower:
                     priority = 'medium'
                 
@@ -74,11 +89,9 @@ priority: {priority}
 - [ ] Draft response if needed (with approval if external communication)
 """
                 task_file.write_text(content)
+                self.dedup.add('whatsapp', identity, task_file.name)
                 new_messages.append(task_file)
                 
-                # Move processed file to prevent reprocessing
-                processed_dir = self.vault_path / 'Simulated_Inputs' / 'Processed'
-                processed_dir.mkdir(exist_ok=True)
                 msg_file.rename(processed_dir / msg_file.name)
         
         # Update last check time
@@ -102,16 +115,20 @@ def start_whatsapp_watcher(vault_path, whatsapp_config):
     except KeyboardInterrupt:
         print("[STOP SIGN] WhatsApp Watcher stopped by user")
 
-if __name__ == "__main__":
-    # Load WhatsApp configuration from environment
+def config_from_env():
+    """Read the WhatsApp configuration from the environment (.env)"""
     import dotenv
     dotenv.load_dotenv()
-    
-    whatsapp_config = {
+
+    return {
         'api_url': os.getenv('WHATSAPP_API_URL', ''),
         'access_token': os.getenv('WHATSAPP_ACCESS_TOKEN', ''),
         'phone_number_id': os.getenv('WHATSAPP_PHONE_NUMBER_ID', '')
     }
+
+if __name__ == "__main__":
+    # Load WhatsApp configuration from environment
+    whatsapp_config = config_from_env()
     
     if not whatsapp_config['api_url'] or not whatsapp_config['access_token']:
         print("[WARNING] WhatsApp credentials not found in .env file. Please configure WHATSAPP_API_URL and WHATSAPP_ACCESS_TOKEN.")
@@ -0,0 +1,47 @@
+"""
+Shared - Claude Worker Pool
+Bounded pool that runs Claude task processing concurrently for all orchestrator tiers
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_TASK_TIMEOUT = 600  # Seconds before a Claude subprocess is killed
+
+
+class ClaudeWorkerPool:
+    """Runs `claude process-task` subprocesses with bounded concurrency.
+
+    The heavy lifting happens in child processes, so a thread per slot is
+    enough to keep every slot busy. Results are yielded in submission order
+    so callers can keep their move-to-Done / move-to-Needs_Action handling
+    on the main thread exactly as before.
+    """
+
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS, task_timeout=DEFAULT_TASK_TIMEOUT):
+        self.max_workers = max(1, int(max_workers))
+        self.task_timeout = task_timeout
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                           thread_name_prefix='claude-worker')
+
+    @classmethod
+    def from_config(cls, config):
+        """Build a pool from the `worker_pool` section of system_config.json"""
+        pool_config = config.get('worker_pool', {})
+        return cls(
+            max_workers=pool_config.get('max_workers', DEFAULT_MAX_WORKERS),
+            task_timeout=pool_config.get('task_timeout', DEFAULT_TASK_TIMEOUT)
+        )
+
+    def map(self, func, tasks):
+        """Run func(task) for every task and yield (task, result) in submission order"""
+        futures = [(task, self.executor.submit(func, task)) for task in tasks]
+        for task, future in futures:
+            try:
+                yield task, future.result()
+            except Exception as e:
+                print(f"[WORKER_POOL] Task {getattr(task, 'name', task)} raised: {e}")
+                yield task, False
+
+    def shutdown(self, wait=True):
+        """Stop accepting work and wait for running tasks"""
+        self.executor.shutdown(wait=wait)
@@ -0,0 +1,150 @@
+"""
+Shared - Worker Ring
+Consistent-hash sharding of the cloud task space across any number of cloud workers
+"""
+import os
+import json
+import time
+import socket
+import hashlib
+from bisect import bisect
+from pathlib import Path
+from heartbeat import heartbeat_path, read_heartbeat, is_stalled
+
+DEFAULT_REPLICAS = 100  # Virtual nodes per worker; more spreads the load more evenly
+DEFAULT_MEMBER_TTL = 900  # Seconds a co-hosted worker may be silent past its heartbeat deadline
+SHARD_KEYS = ('task', 'domain')
+WORKER_FILE = 'worker.json'
+
+
+def _hash(key):
+    return int.from_bytes(hashlib.md5(key.encode('utf-8')).digest()[:8], 'big')
+
+
+class HashRing:
+    """Maps keys to workers so a membership change only moves the keys of the worker that came or went"""
+
+    def __init__(self, workers=(), replicas=DEFAULT_REPLICAS):
+        self.replicas = replicas
+        self.workers = frozenset(workers)
+        points = sorted((_hash(f'{worker}#{replica}'), worker)
+                        for worker in self.workers for replica in range(replicas))
+        self._hashes = [point for point, _ in points]
+        self._owners = [worker for _, worker in points]
+
+    def owner(self, key):
+        """The worker responsible for a key, or None if the ring is empty"""
+        if not self._hashes:
+            return None
+        return self._owners[bisect(self._hashes, _hash(key)) % len(self._hashes)]
+
+
+class WorkerRing:
+    """One cloud worker's view of the ring shared with the other workers.
+
+    Each worker registers itself in In_Progress/<worker>/worker.json, next to
+    its claimed tasks, and vault sync carries it to the other machines. The
+    file only changes when membership does (a worker joins, leaves or is
+    pruned), so an idle ring adds nothing to sync. Liveness comes from the
+    heartbeat files instead, which stay in .cache: a worker whose heartbeat on
+    this host is missing, stopped, or more than `ttl` seconds past its
+    deadline has its registration pruned by a co-hosted worker, and its keys
+    move to the remaining workers. Keys are task file names or, with
+    shard_by='domain', the folder a task arrived in (email, social,
+    accounting), which keeps a domain's tasks on one worker.
+    """
+
+    def __init__(self, vault_path, worker, shard_by='task', replicas=DEFAULT_REPLICAS, ttl=DEFAULT_MEMBER_TTL):
+        if shard_by not in SHARD_KEYS:
+            raise ValueError(f"shard_by must be one of {SHARD_KEYS}, not {shard_by!r}")
+        self.root = Path(vault_path) / 'In_Progress'
+        self.worker = worker
+        self.shard_by = shard_by
+        self.replicas = replicas
+        self.ttl = ttl
+        self.vault = Path(vault_path)
+        self.host = socket.gethostname()
+        self.path = self.root / worker / WORKER_FILE
+        self.ring = HashRing((worker,), replicas)
+
+    @classmethod
+    def from_config(cls, vault_path, worker, config):
+        """Build a ring from the optional `workers` section of system_config.json"""
+        worker_config = config.get('workers', {})
+        return cls(
+            vault_path, worker,
+            shard_by=worker_config.get('shard_by', 'task'),
+            replicas=worker_config.get('replicas', DEFAULT_REPLICAS),
+            ttl=worker_config.get('member_ttl', DEFAULT_MEMBER_TTL)
+        )
+
+    def register(self):
+        """Write this worker's registration unless the file already holds it; returns True if written"""
+        registration = {'worker': self.worker, 'host': self.host}
+        if read_registration(self.path) == registration:
+            return False
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp = self.path.with_name(f'.{WORKER_FILE}.tmp')
+        temp.write_text(json.dumps(registration), encoding='utf-8')
+        os.replace(temp, self.path)
+        return True
+
+    def leave(self):
+        """Remove this worker's registration so the others take over its keys"""
+        self.path.unlink(missing_ok=True)
+
+    def registrations(self):
+        """{worker: (path, registration)} for every registration file in the vault"""
+        found = {}
+        for path in self.root.glob(f'*/{WORKER_FILE}'):
+            registration = read_registration(path)
+            if registration is not None:
+                found[registration.get('worker', path.parent.name)] = (path, registration)
+        return found
+
+    def is_gone(self, worker, now=None):
+        """True if a worker on this host has stopped beating (or never started)"""
+        heartbeat = read_heartbeat(heartbeat_path(self.vault, worker))
+        if heartbeat is None or heartbeat.get('phase') == 'stopped':
+            return True
+        return is_stalled(heartbeat, (now or time.time()) - self.ttl)
+
+    def members(self, now=None):
+        """Registered workers, pruning co-hosted ones that are gone (always including this one)"""
+        members = {self.worker}
+        for worker, (path, registration) in self.registrations().items():
+            if worker != self.worker and registration.get('host') == self.host and self.is_gone(worker, now):
+                # Only a worker's own host can see its heartbeat, so only it prunes the registration
+                print(f"[RING] Pruning registration of {worker}: no live heartbeat on {self.host}")
+                path.unlink(missing_ok=True)
+                continue
+            members.add(worker)
+        return members
+
+    def refresh(self):
+        """Make sure this worker is registered and rebuild the ring; returns (joined, left) workers"""
+        self.register()
+        members = self.members()
+        previous = self.ring.workers
+        if members != previous:
+            self.ring = HashRing(members, self.replicas)
+        return members - previous, previous - members
+
+    def key(self, task_file):
+        task_file = Path(task_file)
+        return task_file.parent.name if self.shard_by == 'domain' else task_file.name
+
+    def owner(self, task_file):
+        return self.ring.owner(self.key(task_file))
+
+    def owns(self, task_file):
+        """True if this worker is responsible for a task"""
+        return self.owner(task_file) == self.worker
+
+
+def read_registration(path):
+    """Load a worker.json file, or None if it is missing or unreadable"""
+    try:
+        return json.loads(Path(path).read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return None